@@ -56,6 +56,13 @@ class PerformanceTestConsumer(AsyncWebsocketConsumer):
                     'type': 'test_stats',
                     'data': stats
                 }))
+            elif message_type == 'get_stats_delta':
+                # 获取增量性能测试数据，since 为上一次返回的 sequence
+                stats = await self._get_test_stats_delta(text_data_json.get('since', 0))
+                await self.send(text_data=json.dumps({
+                    'type': 'test_stats_delta',
+                    'data': stats
+                }))
             elif message_type == 'stop_test':
                 # 停止性能测试
                 await self._stop_test()
@@ -83,12 +90,23 @@ class PerformanceTestConsumer(AsyncWebsocketConsumer):
             'data': event['data']
         }))
         
+    def _get_engine(self) -> PerformanceTestEngine:
+        """查找执行当前测试计划的引擎
+        
+        Raises:
+            RuntimeError: 测试计划没有正在运行的测试时抛出
+        """
+        engine = PerformanceTestEngine.get_running(self.plan_id)
+        if engine is None:
+            raise RuntimeError('测试计划没有正在运行的测试')
+        return engine
+        
     @sync_to_async
     def _get_test_stats(self):
         """获取测试统计数据"""
         try:
             plan = PerformanceTestPlan.objects.get(id=self.plan_id)
-            engine = PerformanceTestEngine()
+            engine = self._get_engine()
             
             # 获取测试数据
             test_stats = engine.get_test_stats()
@@ -104,12 +122,28 @@ class PerformanceTestConsumer(AsyncWebsocketConsumer):
                 'error': str(e)
             }
             
+    @sync_to_async
+    def _get_test_stats_delta(self, since):
+        """获取增量测试统计数据"""
+        try:
+            plan = PerformanceTestPlan.objects.get(id=self.plan_id)
+            engine = self._get_engine()
+            
+            return {
+                'test_stats': engine.get_test_stats_delta(int(since or 0)),
+                'status': plan.status
+            }
+        except Exception as e:
+            return {
+                'error': str(e)
+            }
+            
     @sync_to_async
     def _stop_test(self):
         """停止性能测试"""
         try:
             plan = PerformanceTestPlan.objects.get(id=self.plan_id)
-            engine = PerformanceTestEngine()
+            engine = self._get_engine()
             engine.stop_test()
             
             # 更新测试计划状态
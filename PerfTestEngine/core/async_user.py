@@ -0,0 +1,305 @@
+"""异步性能测试用户模块
+
+提供基于事件循环的测试用户实现，包括：
+- 单个Locust用户驱动多个协程虚拟用户
+- 进程共享的事件循环和有界连接池
+- 与同步用户一致的请求事件上报
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Any, Optional
+import gevent
+from locust import User, task, constant
+from .test_user import PerformanceTestUser, is_reported, mark_reported
+from .scheduler import AliasTable, ThinkTimeScheduler
+from .test_variable import VariableManager
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+class AsyncVirtualUser:
+    """协程虚拟用户
+
+    每个协程持有独立的变量空间，请求数据准备和脚本执行逻辑与同步用户共用。
+    """
+
+    _prepare_request_data = PerformanceTestUser._prepare_request_data
+    _build_script_namespace = PerformanceTestUser._build_script_namespace
+    _execute_script = PerformanceTestUser._execute_script
+    _extract_variables = PerformanceTestUser._extract_variables
+    _extract_value = staticmethod(PerformanceTestUser._extract_value)
+    _validate_response = PerformanceTestUser._validate_response
+
+    def __init__(self, host: str, global_variables: Dict[str, Any]):
+        """初始化虚拟用户
+
+        Args:
+            host: 目标主机地址
+            global_variables: 全局变量
+        """
+        self.host = host
+        self.variable_manager = VariableManager()
+        self._script_namespace = self._build_script_namespace()
+        for name, value in global_variables.items():
+            self.variable_manager.set_env_variable(name, value)
+
+class AsyncPerformanceTestUser(User):
+    """异步性能测试用户类
+
+    每个进程共用一个事件循环和有界连接池，事件循环在独立的greenlet中持续运行。
+    每个Locust用户在事件循环上启动 coroutines_per_user 个虚拟用户，
+    每个虚拟用户是独立的长期运行任务，各自循环执行测试流程，迭代之间互不等待。
+    """
+
+    abstract = True
+    test_flows: List[Dict] = []
+    global_variables: Dict[str, Any] = {}
+    coroutines_per_user: int = 10  # 每个Locust用户驱动的虚拟用户数
+    pool_size: int = 100           # 每个进程的连接池最大连接数
+    request_timeout: float = 30
+    flow_dispatch: str = 'sequential'
+    flow_table: Optional[AliasTable] = None
+    think_time_scheduler: Optional[ThinkTimeScheduler] = None
+    # 虚拟用户在事件循环上自行循环，Locust用户的任务只用于保持运行
+    wait_time = constant(0)
+
+    # 进程共享的事件循环、运行事件循环的greenlet和按证书校验配置区分的连接池
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _loop_greenlet: Optional[gevent.Greenlet] = None
+    _clients: Dict[Any, 'httpx.AsyncClient'] = {}
+    _active_users: int = 0
+
+    _select_flows = PerformanceTestUser._select_flows
+
+    def __init__(self, *args, **kwargs):
+        """初始化异步测试用户"""
+        super().__init__(*args, **kwargs)
+        if httpx is None:
+            raise RuntimeError('异步执行模式需要安装httpx')
+        self.virtual_users = [
+            AsyncVirtualUser(self.host, self.global_variables)
+            for _ in range(self.coroutines_per_user)
+        ]
+        self._futures = []
+
+    def on_start(self):
+        """在共享事件循环上启动虚拟用户任务"""
+        loop = self._get_loop()
+        AsyncPerformanceTestUser._active_users += 1
+        self._futures = [
+            asyncio.run_coroutine_threadsafe(self._run_virtual_user(virtual_user), loop)
+            for virtual_user in self.virtual_users
+        ]
+
+    def on_stop(self):
+        """取消虚拟用户任务，最后一个用户停止时关闭连接池和事件循环"""
+        for future in self._futures:
+            future.cancel()
+        self._futures = []
+        AsyncPerformanceTestUser._active_users -= 1
+        if AsyncPerformanceTestUser._active_users <= 0:
+            AsyncPerformanceTestUser._active_users = 0
+            self._shutdown_loop()
+
+    @task
+    def execute_test_flows(self):
+        """虚拟用户在事件循环上各自执行，Locust用户保持运行直到被停止"""
+        gevent.sleep(1)
+
+    @staticmethod
+    def _get_loop() -> asyncio.AbstractEventLoop:
+        """获取进程共享的事件循环，首次调用时创建并在独立的greenlet中运行
+
+        事件循环只由该greenlet驱动，其他greenlet通过线程安全接口提交任务，
+        不能在多个greenlet中分别运行事件循环。
+        """
+        cls = AsyncPerformanceTestUser
+        if cls._loop is None:
+            cls._loop = asyncio.new_event_loop()
+            cls._loop_greenlet = gevent.spawn(cls._loop.run_forever)
+        return cls._loop
+
+    @staticmethod
+    def _shutdown_loop(timeout: float = 10):
+        """取消剩余任务、关闭连接池并停止事件循环"""
+        cls = AsyncPerformanceTestUser
+        loop = cls._loop
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(cls._close_clients(), loop).result(timeout)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            cls._loop_greenlet.join(timeout)
+            loop.close()
+            cls._loop = None
+            cls._loop_greenlet = None
+
+    @staticmethod
+    async def _close_clients():
+        """在事件循环内取消剩余的虚拟用户任务并关闭所有连接池"""
+        tasks = [pending for pending in asyncio.all_tasks() if pending is not asyncio.current_task()]
+        for pending in tasks:
+            pending.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        clients = list(AsyncPerformanceTestUser._clients.values())
+        AsyncPerformanceTestUser._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+    @classmethod
+    def _get_client(cls, verify: Any = True) -> 'httpx.AsyncClient':
+        """获取进程共享的连接池
+
+        证书校验是httpx连接池级别的配置，按请求的 verify 配置分别创建连接池
+
+        Args:
+            verify: 证书校验配置，布尔值或CA证书路径
+        """
+        key = True if verify is None else verify
+        client = AsyncPerformanceTestUser._clients.get(key)
+        if client is None:
+            limits = httpx.Limits(
+                max_connections=cls.pool_size,
+                max_keepalive_connections=cls.pool_size
+            )
+            client = httpx.AsyncClient(limits=limits, timeout=cls.request_timeout, verify=key)
+            AsyncPerformanceTestUser._clients[key] = client
+        return client
+
+    async def _run_virtual_user(self, virtual_user: AsyncVirtualUser):
+        """虚拟用户主循环，持续执行测试流程直到任务被取消
+
+        Args:
+            virtual_user: 协程虚拟用户
+        """
+        while True:
+            await self._run_iteration(virtual_user)
+            # 流程在发出请求前失败时迭代不会等待，让出事件循环避免其他虚拟用户被饿死
+            await asyncio.sleep(0)
+
+    async def _run_iteration(self, virtual_user: AsyncVirtualUser):
+        """执行单个虚拟用户的一轮测试流程
+
+        Args:
+            virtual_user: 协程虚拟用户
+        """
+        iteration_start = time.perf_counter()
+        for flow in self._select_flows():
+            try:
+                await self._execute_flow(virtual_user, flow)
+            except Exception as e:
+                # 请求和流程事务的失败已在发生处上报，这里只上报流程脚本等其他失败
+                if not is_reported(e):
+                    self.environment.events.request_failure.fire(
+                        request_type='flow',
+                        name=flow.get('name', 'unknown'),
+                        response_time=0,
+                        exception=e
+                    )
+            finally:
+                virtual_user.variable_manager.clear_temp_variables()
+
+            if flow.get('think_time'):
+                await asyncio.sleep(flow['think_time'])
+
+        if self.think_time_scheduler:
+            await asyncio.sleep(self.think_time_scheduler.next_wait(iteration_start))
+
+    async def _execute_flow(self, virtual_user: AsyncVirtualUser, flow: Dict):
+        """执行单个测试流程
+
+        Args:
+            virtual_user: 协程虚拟用户
+            flow: 测试流程配置
+        """
+        virtual_user._execute_script(flow.get('setup_code') or flow.get('setup_script'))
+
+        if flow.get('requests'):
+            response = await self._execute_steps(virtual_user, flow)
+        else:
+            response = await self._send_request(virtual_user, flow)
+
+        virtual_user._execute_script(flow.get('teardown_code') or flow.get('teardown_script'), response)
+
+    async def _execute_steps(self, virtual_user: AsyncVirtualUser, flow: Dict) -> 'httpx.Response':
+        """按顺序执行流程中的所有步骤，并将整个流程作为一个事务上报
+
+        任一步骤失败时事务都上报失败，外层不再重复上报
+
+        Args:
+            virtual_user: 协程虚拟用户
+            flow: 测试流程配置
+
+        Returns:
+            httpx.Response: 最后一个步骤的响应对象
+        """
+        response = None
+        response_length = 0
+        start_time = time.perf_counter()
+
+        try:
+            for step in flow['requests']:
+                virtual_user._execute_script(step.get('setup_code') or step.get('setup_script'))
+                response = await self._send_request(virtual_user, step)
+                response_length += len(response.content)
+                virtual_user._extract_variables(step.get('extract'), response)
+                virtual_user._execute_script(step.get('teardown_code') or step.get('teardown_script'), response)
+        except Exception as e:
+            self.environment.events.request_failure.fire(
+                request_type='flow',
+                name=flow.get('name', 'unknown'),
+                response_time=int((time.perf_counter() - start_time) * 1000),
+                exception=e
+            )
+            raise mark_reported(e)
+
+        self.environment.events.request_success.fire(
+            request_type='flow',
+            name=flow.get('name', 'unknown'),
+            response_time=int((time.perf_counter() - start_time) * 1000),
+            response_length=response_length
+        )
+        return response
+
+    async def _send_request(self, virtual_user: AsyncVirtualUser, flow: Dict) -> 'httpx.Response':
+        """通过共享连接池发送HTTP请求
+
+        Args:
+            virtual_user: 协程虚拟用户
+            flow: 测试流程配置
+
+        Returns:
+            httpx.Response: 请求响应对象
+        """
+        request_data = virtual_user._prepare_request_data(flow)
+        method = request_data.pop('method')
+        url = request_data.pop('url')
+        # httpx的证书校验在连接池上配置，跳转参数名为 follow_redirects
+        client = self._get_client(request_data.pop('verify', True))
+        follow_redirects = request_data.pop('allow_redirects', True)
+        start_time = time.perf_counter()
+
+        try:
+            response = await client.request(
+                method, url, follow_redirects=follow_redirects, **request_data
+            )
+            virtual_user._validate_response(flow.get('validate') or (flow.get('request') or {}).get('validate'), response)
+            self.environment.events.request_success.fire(
+                request_type=method,
+                name=flow.get('name', url),
+                response_time=int((time.perf_counter() - start_time) * 1000),
+                response_length=len(response.content)
+            )
+            return response
+        except Exception as e:
+            self.environment.events.request_failure.fire(
+                request_type=method,
+                name=flow.get('name', url),
+                response_time=int((time.perf_counter() - start_time) * 1000),
+                exception=e
+            )
+            raise mark_reported(e)
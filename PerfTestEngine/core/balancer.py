@@ -0,0 +1,174 @@
+"""执行节点负载均衡模块
+
+为分布式执行提供并发用户分配策略，包括：
+- 轮询：按节点顺序平均分配
+- 权重：按节点分布配置的静态权重分配
+- 动态：根据执行节点上报的CPU使用率和事件循环延迟估算节点容量，
+  节点饱和时在运行过程中重新分配
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+def allocate_users(user_count: int, weights: List[float]) -> List[int]:
+    """按权重拆分用户数，使用最大余数法保证总数不变
+
+    Args:
+        user_count: 总用户数
+        weights: 各节点权重
+
+    Returns:
+        List[int]: 各节点分配的用户数
+    """
+    if not weights:
+        return []
+    total_weight = sum(weight for weight in weights if weight > 0)
+    if total_weight <= 0:
+        weights = [1] * len(weights)
+        total_weight = len(weights)
+    quotas = [user_count * max(weight, 0) / total_weight for weight in weights]
+    shares = [int(quota) for quota in quotas]
+    remainder = user_count - sum(shares)
+    for index in sorted(range(len(quotas)), key=lambda index: quotas[index] - shares[index], reverse=True)[:remainder]:
+        shares[index] += 1
+    return shares
+
+class LoadBalancer(ABC):
+    """负载均衡策略基类
+
+    workers 为协调节点维护的执行节点列表，每个节点提供 name、target_user_count
+    以及最近一次上报的 load（cpu_percent、loop_lag 等）。
+    """
+
+    def __init__(self, node_distribution: Optional[Dict] = None):
+        """初始化负载均衡策略
+
+        Args:
+            node_distribution: 可选，节点名称到权重的映射，未配置的节点权重为1
+        """
+        self.node_distribution = node_distribution or {}
+
+    def get_weights(self, workers: List) -> List[float]:
+        """获取各执行节点的静态权重"""
+        return [float(self.node_distribution.get(worker.name, 1)) for worker in workers]
+
+    @abstractmethod
+    def allocate(self, user_count: int, workers: List) -> Dict[str, int]:
+        """分配并发用户
+
+        Args:
+            user_count: 总并发用户数
+            workers: 在线的执行节点列表
+
+        Returns:
+            Dict[str, int]: 节点名称到用户数的映射
+        """
+        pass
+
+    def needs_rebalance(self, workers: List) -> bool:
+        """运行过程中是否需要重新分配，默认只在节点上下线时重新分配"""
+        return False
+
+class RoundRobinBalancer(LoadBalancer):
+    """轮询策略：按节点顺序逐个分配用户，各节点用户数最多相差1"""
+
+    def allocate(self, user_count: int, workers: List) -> Dict[str, int]:
+        base, remainder = divmod(user_count, len(workers)) if workers else (0, 0)
+        return {worker.name: base + (1 if index < remainder else 0) for index, worker in enumerate(workers)}
+
+class WeightBalancer(LoadBalancer):
+    """权重策略：按节点分布配置的静态权重分配用户"""
+
+    def allocate(self, user_count: int, workers: List) -> Dict[str, int]:
+        shares = allocate_users(user_count, self.get_weights(workers))
+        return {worker.name: share for worker, share in zip(workers, shares)}
+
+class DynamicBalancer(WeightBalancer):
+    """动态策略：根据执行节点上报的负载估算容量分配用户
+
+    假设节点负载与用户数成正比，节点容量 = 当前用户数 / 利用率，
+    利用率取 CPU使用率/目标CPU使用率 与 事件循环延迟/目标延迟 中的较大者。
+    尚无负载数据的节点按已知节点的平均单位权重容量估算；所有节点都无负载数据时退回静态权重。
+    """
+
+    def __init__(self, node_distribution: Optional[Dict] = None, cpu_target: float = 75.0,
+                 lag_target: float = 20.0, saturation: float = 1.2):
+        """初始化动态策略
+
+        Args:
+            node_distribution: 可选，节点名称到权重的映射，作为无负载数据时的初始权重
+            cpu_target: 目标CPU使用率(%)，单进程gevent只使用一个核心，按单核计算
+            lag_target: 目标事件循环延迟(ms)
+            saturation: 利用率超过该值时视为节点饱和，触发重新分配
+        """
+        super().__init__(node_distribution)
+        self.cpu_target = cpu_target
+        self.lag_target = lag_target
+        self.saturation = saturation
+
+    def get_utilization(self, worker) -> Optional[float]:
+        """计算节点相对目标负载的利用率，无负载数据时返回None"""
+        load = getattr(worker, 'load', None)
+        if not load:
+            return None
+        return max(
+            load.get('cpu_percent', 0) / self.cpu_target,
+            load.get('loop_lag', 0) / self.lag_target
+        )
+
+    def allocate(self, user_count: int, workers: List) -> Dict[str, int]:
+        weights = self.get_weights(workers)
+        capacities = []
+        for worker in workers:
+            utilization = self.get_utilization(worker)
+            if utilization and worker.target_user_count > 0:
+                capacities.append(worker.target_user_count / utilization)
+            else:
+                capacities.append(None)
+
+        known = [(capacity, weight) for capacity, weight in zip(capacities, weights) if capacity is not None]
+        if not known:
+            return super().allocate(user_count, workers)
+        per_weight = sum(capacity for capacity, _ in known) / sum(weight for _, weight in known)
+        capacities = [
+            capacity if capacity is not None else per_weight * weight
+            for capacity, weight in zip(capacities, weights)
+        ]
+        shares = allocate_users(user_count, capacities)
+        return {worker.name: share for worker, share in zip(workers, shares)}
+
+    def needs_rebalance(self, workers: List) -> bool:
+        return any(
+            (self.get_utilization(worker) or 0) >= self.saturation
+            for worker in workers if worker.target_user_count > 0
+        )
+
+class LoadBalancerFactory:
+    """负载均衡策略工厂类"""
+
+    _balancers = {
+        'round_robin': RoundRobinBalancer,
+        'weight': WeightBalancer,
+        'dynamic': DynamicBalancer
+    }
+
+    @classmethod
+    def create_balancer(cls, strategy_type: str, node_distribution: Optional[Dict] = None,
+                        **options) -> LoadBalancer:
+        """创建负载均衡策略实例
+
+        Args:
+            strategy_type: 策略类型，可选值：'round_robin'、'weight'、'dynamic'
+            node_distribution: 可选，节点名称到权重的映射
+            **options: 策略参数，如动态策略的 cpu_target、lag_target、saturation
+
+        Returns:
+            LoadBalancer: 负载均衡策略实例
+
+        Raises:
+            ValueError: 当指定的策略类型不支持时抛出
+        """
+        balancer_class = cls._balancers.get(strategy_type)
+        if not balancer_class:
+            raise ValueError(f'不支持的负载均衡策略: {strategy_type}')
+        return balancer_class(node_distribution, **options)
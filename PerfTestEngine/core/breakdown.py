@@ -0,0 +1,185 @@
+"""分接口统计模块
+
+按请求名称（接口 / 业务流步骤）拆分统计性能指标，包括：
+- URL模板归一化，避免路径参数导致统计项膨胀
+- 统计项数量上限，超出部分合并到溢出项
+- 每个统计项使用紧凑直方图记录响应时间
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from .histogram import LatencyHistogram
+
+OVERFLOW_NAME = '__other__'
+
+# 路径中的动态片段：UUID、长十六进制串、纯数字
+_UUID_PATTERN = re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')
+_HEX_PATTERN = re.compile(r'^[0-9a-fA-F]{16,}$')
+_NUMBER_PATTERN = re.compile(r'^\d+$')
+
+def normalize_name(name: str) -> str:
+    """将请求名称归一化为URL模板
+
+    去掉查询字符串，并把路径中的数字、UUID和长十六进制片段替换为占位符，
+    如 /user/123?x=1 归一化为 /user/{id}。
+
+    Args:
+        name: 请求名称或URL
+
+    Returns:
+        str: 归一化后的名称
+    """
+    if not name:
+        return 'unknown'
+    path = name.split('?', 1)[0].split('#', 1)[0]
+    if '/' not in path:
+        return path
+    segments = path.split('/')
+    for index, segment in enumerate(segments):
+        if _NUMBER_PATTERN.match(segment):
+            segments[index] = '{id}'
+        elif _UUID_PATTERN.match(segment):
+            segments[index] = '{uuid}'
+        elif _HEX_PATTERN.match(segment):
+            segments[index] = '{hash}'
+    return '/'.join(segments)
+
+class BreakdownEntry:
+    """单个请求名称的统计项"""
+
+    __slots__ = ('method', 'name', 'count', 'errors', 'bytes', 'histogram', 'last_seq')
+
+    def __init__(self, method: str, name: str, precision: float):
+        self.method = method
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.histogram = LatencyHistogram(precision=precision)
+        self.last_seq = 0
+
+    def to_dict(self, percentiles: Iterable[float]) -> Dict:
+        return {
+            'method': self.method,
+            'name': self.name,
+            'count': self.count,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'error_rate': self.errors / self.count if self.count else 0,
+            'response_time': self.histogram.summary(percentiles) if self.histogram.count else {}
+        }
+
+class StatsBreakdown:
+    """分接口统计表
+
+    统计项数量达到上限后，新出现的名称统一计入 __other__ 溢出项，保证内存有界。
+    """
+
+    def __init__(self, max_entries: int = 200, precision: float = 0.02, normalize: bool = True):
+        """初始化统计表
+
+        Args:
+            max_entries: 统计项数量上限（不含溢出项）
+            precision: 每个统计项直方图的相对精度
+            normalize: 是否对请求名称做URL模板归一化
+        """
+        self.max_entries = max_entries
+        self.precision = precision
+        self.normalize = normalize
+        self.entries: Dict[Tuple[str, str], BreakdownEntry] = {}
+        self._name_cache: Dict[str, str] = {}
+
+    def _normalize(self, name: str) -> str:
+        # 归一化结果缓存同样受数量上限约束
+        normalized = self._name_cache.get(name)
+        if normalized is None:
+            normalized = normalize_name(name)
+            if len(self._name_cache) < self.max_entries * 10:
+                self._name_cache[name] = normalized
+        return normalized
+
+    def _get_entry(self, method: str, name: str) -> BreakdownEntry:
+        if self.normalize:
+            name = self._normalize(name)
+        key = (method, name)
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry
+        if len(self.entries) >= self.max_entries:
+            key = ('', OVERFLOW_NAME)
+            entry = self.entries.get(key)
+            if entry is not None:
+                return entry
+            method, name = key
+        entry = self.entries[key] = BreakdownEntry(method, name, self.precision)
+        return entry
+
+    def record(self, method: str, name: str, response_time: float, is_success: bool,
+               response_length: int = 0, seq: int = 0) -> None:
+        """记录一次请求
+
+        Args:
+            method: 请求方法或请求类型
+            name: 请求名称
+            response_time: 响应时间（毫秒）
+            is_success: 是否成功
+            response_length: 响应字节数
+            seq: 可选，变更序号，用于增量查询
+        """
+        entry = self._get_entry(method or '', name)
+        entry.last_seq = seq
+        entry.count += 1
+        entry.bytes += response_length
+        if is_success:
+            entry.histogram.record(response_time)
+        else:
+            entry.errors += 1
+
+    def export(self) -> List[Dict]:
+        """导出全部统计项及其直方图，供其他统计表合并"""
+        return [
+            {
+                'method': entry.method,
+                'name': entry.name,
+                'count': entry.count,
+                'errors': entry.errors,
+                'bytes': entry.bytes,
+                'histogram': entry.histogram.to_dict()
+            }
+            for entry in self.entries.values()
+        ]
+
+    def merge(self, entries: List[Dict], seq: int = 0) -> None:
+        """合并其他统计表 export 导出的统计项，用于汇总多个执行节点的数据
+
+        Args:
+            entries: export 输出的统计项列表
+            seq: 可选，变更序号，用于增量查询
+        """
+        for data in entries:
+            entry = self._get_entry(data['method'], data['name'])
+            entry.last_seq = seq
+            entry.count += data['count']
+            entry.errors += data['errors']
+            entry.bytes += data['bytes']
+            entry.histogram.merge(LatencyHistogram.from_dict(data['histogram']))
+
+    def snapshot(self, percentiles: Iterable[float] = (50, 90, 95, 99),
+                 limit: Optional[int] = None, since_seq: Optional[int] = None) -> List[Dict]:
+        """获取分接口统计结果
+
+        Args:
+            percentiles: 需要输出的百分位列表
+            limit: 可选，只返回请求数最多的前 limit 项
+            since_seq: 可选，只返回变更序号大于该值的统计项
+
+        Returns:
+            List[Dict]: 统计结果列表，按请求数降序排列
+        """
+        entries = self.entries.values()
+        if since_seq is not None:
+            entries = [entry for entry in entries if entry.last_seq > since_seq]
+        entries = sorted(entries, key=lambda entry: entry.count, reverse=True)
+        if limit is not None:
+            entries = entries[:limit]
+        return [entry.to_dict(percentiles) for entry in entries]
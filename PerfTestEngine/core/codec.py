@@ -0,0 +1,98 @@
+"""性能数据编码模块
+
+提供性能测试采样数据的紧凑二进制编码，包括：
+- 带版本号的定长头部
+- 时间戳以浮点数存储，解码时还原为ISO字符串
+- msgpack序列化（未安装时退回JSON）
+- 超过阈值的数据使用zlib压缩
+- 兼容旧版JSON文本数据
+"""
+
+import json
+import struct
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CODEC_VERSION = 1
+
+# 头部：版本号、标志位、时间戳
+_HEADER = struct.Struct('>BBd')
+
+FLAG_ZLIB = 0x01
+FLAG_MSGPACK = 0x02
+FLAG_TIMESTAMP = 0x04
+
+# 小于该字节数的数据压缩收益不明显，不做压缩
+COMPRESS_THRESHOLD = 256
+
+def encode_sample(data: Dict[str, Any], compress_threshold: int = COMPRESS_THRESHOLD) -> bytes:
+    """编码采样数据
+
+    Args:
+        data: 采样数据字典，timestamp 字段为ISO格式字符串时以浮点数存储
+        compress_threshold: 序列化结果超过该字节数时使用zlib压缩
+
+    Returns:
+        bytes: 编码后的数据
+    """
+    flags = 0
+    timestamp = 0.0
+    body = dict(data)
+    if isinstance(body.get('timestamp'), str):
+        try:
+            timestamp = datetime.fromisoformat(body['timestamp']).timestamp()
+        except ValueError:
+            pass
+        else:
+            del body['timestamp']
+            flags |= FLAG_TIMESTAMP
+
+    if msgpack is not None:
+        payload = msgpack.packb(body, use_bin_type=True, default=str)
+        flags |= FLAG_MSGPACK
+    else:
+        payload = json.dumps(body, separators=(',', ':'), default=str).encode('utf-8')
+
+    if len(payload) > compress_threshold:
+        payload = zlib.compress(payload)
+        flags |= FLAG_ZLIB
+    return _HEADER.pack(CODEC_VERSION, flags, timestamp) + payload
+
+def decode_sample(raw: Union[bytes, str]) -> Dict[str, Any]:
+    """解码采样数据，兼容旧版JSON文本
+
+    Args:
+        raw: encode_sample 生成的数据或JSON文本
+
+    Returns:
+        Dict: 采样数据字典
+
+    Raises:
+        ValueError: 编码版本不支持时抛出
+    """
+    if isinstance(raw, str):
+        return json.loads(raw)
+    if raw[:1] == b'{':
+        return json.loads(raw.decode('utf-8'))
+
+    version, flags, timestamp = _HEADER.unpack_from(raw)
+    if version != CODEC_VERSION:
+        raise ValueError(f'不支持的数据编码版本: {version}')
+    payload = raw[_HEADER.size:]
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    if flags & FLAG_MSGPACK:
+        if msgpack is None:
+            raise ValueError('数据使用msgpack编码，请先安装msgpack')
+        data = msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    else:
+        data = json.loads(payload.decode('utf-8'))
+    if flags & FLAG_TIMESTAMP:
+        data['timestamp'] = datetime.fromtimestamp(timestamp).isoformat()
+    return data
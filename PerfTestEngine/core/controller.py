@@ -0,0 +1,163 @@
+"""负载闭环控制模块
+
+为自适应模式提供负载调节控制器，根据目标指标计算下一个控制周期的负载（用户数或到达率），包括：
+- AIMD：慢启动倍增，违反目标后乘性减少、加性增加
+- PID：按归一化误差的比例、积分、微分项调整负载
+
+目标指标分为两类：
+- 上限指标（p50/p90/p95/p99/avg_response_time/error_rate）：实测值不应超过目标值
+- 下限指标（rps）：实测值达到目标值后不再增加负载
+"""
+
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+# 上限指标，实测值超过目标值表示负载过高
+CEILING_METRICS = ('p50', 'p90', 'p95', 'p99', 'avg_response_time', 'error_rate')
+# 下限指标，实测值低于目标值表示负载不足
+FLOOR_METRICS = ('rps',)
+TARGET_METRICS = CEILING_METRICS + FLOOR_METRICS
+
+def normalized_error(targets: Dict[str, float], metrics: Dict[str, Optional[float]]) -> Optional[float]:
+    """计算多个目标中最受约束的归一化误差
+
+    误差为正表示还有余量可以增加负载，为负表示负载过高（上限指标）或已超过目标（下限指标）。
+
+    Args:
+        targets: 指标名到目标值的映射
+        metrics: 当前控制周期的实测指标
+
+    Returns:
+        Optional[float]: 归一化误差，所有目标指标都没有数据时返回None
+    """
+    errors = []
+    for metric, target in targets.items():
+        value = metrics.get(metric)
+        if value is None:
+            continue
+        scale = target if target > 0 else 1
+        errors.append((target - value) / scale)
+    return min(errors) if errors else None
+
+class LoadController(ABC):
+    """负载控制器基类"""
+
+    def __init__(self, initial: float, minimum: float, maximum: float, tolerance: float = 0.05):
+        """初始化控制器
+
+        Args:
+            initial: 初始负载
+            minimum: 最小负载
+            maximum: 最大负载
+            tolerance: 归一化误差在 ±tolerance 内视为达到目标，保持当前负载
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.load = self.clamp(initial)
+
+    def clamp(self, load: float) -> float:
+        return min(max(load, self.minimum), self.maximum)
+
+    @abstractmethod
+    def update(self, error: float, interval: float) -> float:
+        """根据本周期的归一化误差计算下一周期负载
+
+        Args:
+            error: 归一化误差，见 normalized_error
+            interval: 控制周期(秒)
+
+        Returns:
+            float: 下一周期负载
+        """
+        pass
+
+class AIMDController(LoadController):
+    """AIMD控制器
+
+    首次违反目标前按 slow_start 倍数增长以快速逼近容量，之后每周期加性增加 increase，
+    违反目标时乘以 decrease 减少。
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float, tolerance: float = 0.05,
+                 increase: Optional[float] = None, decrease: float = 0.7, slow_start: float = 2.0):
+        """初始化AIMD控制器
+
+        Args:
+            increase: 可选，加性增加步长，默认为最大负载的2%（至少为1）
+            decrease: 乘性减少系数
+            slow_start: 慢启动阶段的增长倍数
+        """
+        super().__init__(initial, minimum, maximum, tolerance)
+        self.increase = increase or max(1.0, maximum * 0.02)
+        self.decrease = decrease
+        self.slow_start = slow_start
+        self.in_slow_start = True
+
+    def update(self, error: float, interval: float) -> float:
+        if error < -self.tolerance:
+            self.in_slow_start = False
+            self.load = self.clamp(self.load * self.decrease)
+        elif error > self.tolerance:
+            if self.in_slow_start:
+                self.load = self.clamp(self.load * self.slow_start)
+            else:
+                self.load = self.clamp(self.load + self.increase)
+        return self.load
+
+class PIDController(LoadController):
+    """PID控制器
+
+    输出为负载的相对调整量，增益与负载规模无关：
+    下一周期负载 = 当前负载 × (1 + kp·e + ki·∫e + kd·de/dt)。误差限制在 [-1, 1]，
+    单周期调整幅度限制在 [-30%, +50%]，避免响应时间在容量拐点后陡增时来回振荡。
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float, tolerance: float = 0.05,
+                 kp: float = 0.3, ki: float = 0.02, kd: float = 0.02, integral_limit: float = 2.0):
+        """初始化PID控制器
+
+        Args:
+            kp: 比例增益
+            ki: 积分增益
+            kd: 微分增益
+            integral_limit: 积分项绝对值上限，防止积分饱和
+        """
+        super().__init__(initial, minimum, maximum, tolerance)
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.integral_limit = integral_limit
+        self.integral = 0.0
+        self.previous_error: Optional[float] = None
+
+    def update(self, error: float, interval: float) -> float:
+        error = min(max(error, -1.0), 1.0)
+        if abs(error) <= self.tolerance:
+            error = 0.0
+        self.integral = min(max(self.integral + error * interval, -self.integral_limit), self.integral_limit)
+        derivative = (error - self.previous_error) / interval if self.previous_error is not None else 0.0
+        self.previous_error = error
+        adjustment = self.kp * error + self.ki * self.integral + self.kd * derivative
+        adjustment = min(max(adjustment, -0.3), 0.5)
+        self.load = self.clamp(self.load * (1 + adjustment))
+        return self.load
+
+def create_controller(algorithm: str, initial: float, minimum: float, maximum: float,
+                      options: Optional[Dict] = None) -> LoadController:
+    """创建负载控制器
+
+    Args:
+        algorithm: 控制算法，aimd 或 pid
+        initial: 初始负载
+        minimum: 最小负载
+        maximum: 最大负载
+        options: 可选，控制器参数（tolerance、increase/decrease/slow_start 或 kp/ki/kd）
+
+    Raises:
+        ValueError: 控制算法不支持时抛出
+    """
+    controllers = {'aimd': AIMDController, 'pid': PIDController}
+    if algorithm not in controllers:
+        raise ValueError(f'不支持的控制算法: {algorithm}')
+    return controllers[algorithm](initial, minimum, maximum, **(options or {}))
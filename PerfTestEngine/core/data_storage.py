@@ -5,15 +5,22 @@
 - 数据批量写入MySQL
 - 增量数据更新
 - 数据分片管理
+- Redis写入缓冲与管道批量提交
+- 基于有序集合的时间索引，避免 KEYS 扫描
+- 后台刷写线程，持久化不阻塞调用方；使用原生线程，Redis和MySQL的阻塞调用不占用gevent事件循环
+- 采样数据紧凑二进制编码
+- 时间桶指标定期批量写入
 """
 
-from typing import Dict, List, Any, Optional
-import json
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from collections import deque
 import time
 from datetime import datetime
 import redis
-from django.db import connection
+from django.db import connection, transaction
 from django.conf import settings
+from .codec import encode_sample, decode_sample
+from .native import NativeThread, allocate_lock, get_ident, sleep as native_sleep
 
 class PerformanceDataStorage:
     """性能测试数据存储管理类
@@ -25,27 +32,86 @@ class PerformanceDataStorage:
     - 管理数据分片和归档
     """
     
-    def __init__(self, test_id: str):
+    def __init__(self, test_id: str, flush_size: int = 50, flush_interval: float = 1.0,
+                 max_buffer_size: int = 10000,
+                 rollup_writer: Optional[Callable[[List[Dict]], Any]] = None):
         """初始化数据存储管理器
         
         Args:
             test_id: 测试任务ID，用于区分不同测试任务的数据
+            flush_size: 写入缓冲达到该条数时提交到Redis
+            flush_interval: 距上次提交超过该秒数时提交到Redis
+            max_buffer_size: 写入缓冲上限，Redis不可用时超出部分丢弃最旧数据
+            rollup_writer: 可选，时间桶批量写入函数，如写入 PerformanceMetrics
         """
         self.test_id = test_id
-        self.redis_client = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=settings.REDIS_DB,
-            decode_responses=True
-        )
+        # 刷写线程与事件循环线程各自使用独立的Redis客户端，连接不跨线程共享
+        self._redis_clients: Dict[int, redis.Redis] = {}
         self.last_mysql_write = time.time()
         self.mysql_write_interval = 60  # 每60秒写入一次MySQL
         self.data_expire_time = 3600  # Redis数据过期时间（1小时）
+        self.fetch_batch_size = 500  # 按索引批量读取的条数
+        self.mysql_chunk_size = 500  # 每个MySQL写入事务的数据条数
+        
+        # 按时间戳索引数据键的有序集合，score为写入时间戳
+        self.index_key = f"perf_test:{self.test_id}:index"
+        self.latest_key = f"perf_test:{self.test_id}:latest"
+        self._sequence = 0
+        
+        # Redis写入缓冲，按条数或时间阈值通过管道一次提交
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._buffer: deque = deque(maxlen=max_buffer_size)
+        self._latest: Optional[bytes] = None
+        self._latest_dirty = False
+        self.last_flush = time.time()
+        # 原生锁，事件循环线程与刷写线程之间同步，持有时间很短
+        self._buffer_lock = allocate_lock()
+        
+        # 已关闭的时间桶，每 rollup_write_interval 秒批量写入一次
+        self.rollup_writer = rollup_writer
+        self.rollup_write_interval = 10
+        self.last_rollup_write = time.time()
+        self._rollups: List[Dict] = []
+        
+        # 后台刷写线程，启动后由该线程负责Redis提交和MySQL写入
+        self._flusher: Optional[NativeThread] = None
+        self._flusher_wakeup = False
+        self._stop_flusher = False
+        self.write_metrics = {
+            'buffered': 0,
+            'max_buffered': 0,
+            'written': 0,
+            'dropped': 0,
+            'flushes': 0,
+            'flush_errors': 0,
+            'round_trips': 0,
+            'last_flush_size': 0,
+            'last_flush_time': 0.0,
+            'max_flush_time': 0.0,
+            'rollups_written': 0
+        }
+        
+    @property
+    def redis_client(self) -> redis.Redis:
+        """当前线程的Redis客户端"""
+        ident = get_ident()
+        client = self._redis_clients.get(ident)
+        if client is None:
+            client = self._redis_clients[ident] = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                # 采样数据为二进制编码，不自动解码响应
+                decode_responses=False
+            )
+        return client
         
     def store_test_data(self, data: Dict[str, Any]) -> None:
         """存储测试数据
         
-        将数据存储到Redis，并在适当时机批量写入MySQL
+        数据先写入进程内缓冲，达到条数或时间阈值时批量提交到Redis，
+        并在适当时机批量写入MySQL
         
         Args:
             data: 测试数据字典
@@ -53,34 +119,210 @@ class PerformanceDataStorage:
         # 添加时间戳
         data['timestamp'] = datetime.now().isoformat()
         
-        # 存储到Redis
-        key = f"perf_test:{self.test_id}:data:{int(time.time())}"
-        self.redis_client.setex(
-            key,
-            self.data_expire_time,
-            json.dumps(data)
-        )
+        # 写入缓冲，缓冲已满时 deque 自动丢弃最旧数据
+        # 数据键附带进程内序号，同一秒内的多条数据不会相互覆盖
+        timestamp = time.time()
+        payload = encode_sample(data)
+        with self._buffer_lock:
+            self._sequence += 1
+            key = f"perf_test:{self.test_id}:data:{int(timestamp)}:{self._sequence}"
+            if len(self._buffer) == self._buffer.maxlen:
+                self.write_metrics['dropped'] += 1
+            self._buffer.append((key, timestamp, payload))
+            
+            # 最新数据的快照只保留最后一条
+            self._latest = payload
+            self._latest_dirty = True
+            self._update_buffer_metrics()
+            buffered = len(self._buffer)
         
-        # 更新最新数据的快照
-        self.redis_client.set(
-            f"perf_test:{self.test_id}:latest",
-            json.dumps(data)
-        )
+        # 后台刷写线程运行时只负责唤醒，不在调用方执行任何持久化操作
+        if self._flusher:
+            if buffered >= self.flush_size:
+                self._flusher_wakeup = True
+            return
+            
+        current_time = time.time()
+        if buffered >= self.flush_size or current_time - self.last_flush >= self.flush_interval:
+            self.flush()
         
         # 检查是否需要写入MySQL
-        current_time = time.time()
         if current_time - self.last_mysql_write >= self.mysql_write_interval:
             self._batch_write_to_mysql()
             self.last_mysql_write = current_time
             
+    def store_rollups(self, buckets: List[Dict]) -> None:
+        """缓存已关闭的时间桶，由后台刷写线程定期批量写入
+        
+        未配置 rollup_writer 时忽略。
+        
+        Args:
+            buckets: 时间桶聚合结果列表（RollupAggregator 输出格式）
+        """
+        if not buckets or self.rollup_writer is None:
+            return
+        with self._buffer_lock:
+            self._rollups.extend(buckets)
+        if not self._flusher and time.time() - self.last_rollup_write >= self.rollup_write_interval:
+            self._write_rollups()
+            
+    def _write_rollups(self) -> None:
+        """批量写入缓存的时间桶，写入失败时保留等待下次重试"""
+        self.last_rollup_write = time.time()
+        with self._buffer_lock:
+            buckets, self._rollups = self._rollups, []
+        if not buckets:
+            return
+        try:
+            self.rollup_writer(buckets)
+        except Exception:
+            with self._buffer_lock:
+                self._rollups = buckets + self._rollups
+                self.write_metrics['flush_errors'] += 1
+            return
+        with self._buffer_lock:
+            self.write_metrics['rollups_written'] += len(buckets)
+            
+    def start_flusher(self) -> None:
+        """启动后台刷写线程
+        
+        启动后 store_test_data 只写入缓冲，Redis提交和MySQL写入均由后台线程完成。
+        gevent猴子补丁下 threading.Thread 是greenlet，mysqlclient等阻塞调用会阻塞事件循环，
+        因此刷写使用原生线程。
+        """
+        if self._flusher:
+            return
+        self._stop_flusher = False
+        self._flusher_wakeup = False
+        self._flusher = NativeThread(self._run_flusher)
+        self._flusher.start()
+        
+    def stop_flusher(self, timeout: Optional[float] = None) -> None:
+        """停止后台刷写线程，等待缓冲中的数据全部提交
+        
+        Args:
+            timeout: 可选，等待线程结束的最长秒数
+        """
+        if not self._flusher:
+            return
+        self._stop_flusher = True
+        self._flusher.join(timeout)
+        self._flusher = None
+        
+    def _wait_flush(self) -> None:
+        """等待 flush_interval 秒，缓冲达到 flush_size 或停止时提前返回"""
+        deadline = time.time() + self.flush_interval
+        while not (self._flusher_wakeup or self._stop_flusher) and time.time() < deadline:
+            native_sleep(0.05)
+        self._flusher_wakeup = False
+        
+    def _run_flusher(self) -> None:
+        """后台刷写线程主循环"""
+        try:
+            while not self._stop_flusher:
+                self._wait_flush()
+                self.flush()
+                current_time = time.time()
+                if current_time - self.last_rollup_write >= self.rollup_write_interval:
+                    self._write_rollups()
+                if current_time - self.last_mysql_write >= self.mysql_write_interval:
+                    self.last_mysql_write = current_time
+                    try:
+                        self._batch_write_to_mysql()
+                    except Exception:
+                        # 写入失败的数据仍保留在Redis中，下个周期重试
+                        self.write_metrics['flush_errors'] += 1
+            # 退出前提交剩余缓冲
+            self.flush()
+            self._write_rollups()
+        finally:
+            # 线程使用独立的数据库连接和Redis客户端，退出时关闭
+            connection.close()
+            client = self._redis_clients.pop(get_ident(), None)
+            if client is not None:
+                client.close()
+            
+    def _update_buffer_metrics(self) -> None:
+        buffered = len(self._buffer)
+        self.write_metrics['buffered'] = buffered
+        if buffered > self.write_metrics['max_buffered']:
+            self.write_metrics['max_buffered'] = buffered
+            
+    def flush(self) -> int:
+        """将写入缓冲通过Redis管道一次提交
+        
+        提交失败时数据保留在缓冲中等待下次重试，并记录失败次数
+        
+        Returns:
+            int: 本次提交的数据条数
+        """
+        with self._buffer_lock:
+            self.last_flush = time.time()
+            if not self._buffer and not self._latest_dirty:
+                return 0
+            # 取出缓冲后立即释放锁，提交期间新数据继续写入缓冲
+            entries: List[Tuple[str, float, bytes]] = list(self._buffer)
+            self._buffer.clear()
+            latest = self._latest if self._latest_dirty else None
+            self._latest_dirty = False
+            
+        start_time = time.perf_counter()
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, timestamp, payload in entries:
+                pipe.setex(key, self.data_expire_time, payload)
+            if entries:
+                pipe.zadd(self.index_key, {key: timestamp for key, timestamp, _ in entries})
+                # 索引中过期数据键对应的成员一并清除
+                pipe.zremrangebyscore(self.index_key, '-inf', time.time() - self.data_expire_time)
+                pipe.expire(self.index_key, self.data_expire_time)
+            if latest is not None:
+                pipe.set(self.latest_key, latest)
+            pipe.execute()
+        except redis.RedisError:
+            # 放回缓冲头部等待重试，超出上限时丢弃最旧数据
+            with self._buffer_lock:
+                merged = entries + list(self._buffer)
+                overflow = max(len(merged) - self._buffer.maxlen, 0)
+                self._buffer = deque(merged[overflow:], maxlen=self._buffer.maxlen)
+                self._latest_dirty = self._latest_dirty or latest is not None
+                self.write_metrics['dropped'] += overflow
+                self.write_metrics['flush_errors'] += 1
+                self.write_metrics['round_trips'] += 1
+            return 0
+            
+        flush_time = (time.perf_counter() - start_time) * 1000
+        with self._buffer_lock:
+            self.write_metrics['round_trips'] += 1
+            self.write_metrics['flushes'] += 1
+            self.write_metrics['written'] += len(entries)
+            self.write_metrics['last_flush_size'] = len(entries)
+            self.write_metrics['last_flush_time'] = flush_time
+            self.write_metrics['max_flush_time'] = max(self.write_metrics['max_flush_time'], flush_time)
+            self._update_buffer_metrics()
+        return len(entries)
+        
+    def get_write_metrics(self) -> Dict[str, Any]:
+        """获取Redis写入缓冲的背压指标
+        
+        Returns:
+            Dict: 包含缓冲条数、写入/丢弃条数、提交次数、往返次数和提交耗时（毫秒）的字典
+        """
+        with self._buffer_lock:
+            metrics = dict(self.write_metrics)
+        metrics['background'] = self._flusher is not None
+        return metrics
+        
     def get_latest_data(self) -> Optional[Dict[str, Any]]:
         """获取最新的测试数据
         
         Returns:
             Dict: 最新的测试数据字典，如果没有数据返回None
         """
-        data = self.redis_client.get(f"perf_test:{self.test_id}:latest")
-        return json.loads(data) if data else None
+        if self._latest is not None:
+            return decode_sample(self._latest)
+        data = self.redis_client.get(self.latest_key)
+        return decode_sample(data) if data else None
         
     def get_data_range(self, start_time: float, end_time: float) -> List[Dict[str, Any]]:
         """获取指定时间范围内的测试数据
@@ -92,55 +334,80 @@ class PerformanceDataStorage:
         Returns:
             List[Dict]: 测试数据列表
         """
-        keys = self.redis_client.keys(f"perf_test:{self.test_id}:data:*")
-        data = []
+        self.flush()
+        keys = self.redis_client.zrangebyscore(self.index_key, start_time, end_time)
+        # 索引按时间戳排序，读取结果保持时间顺序
+        return [decode_sample(value) for _, value in self._fetch(keys) if value]
         
-        for key in keys:
-            timestamp = float(key.split(':')[-1])
-            if start_time <= timestamp <= end_time:
-                value = self.redis_client.get(key)
-                if value:
-                    data.append(json.loads(value))
-                    
-        return sorted(data, key=lambda x: x['timestamp'])
+    def _fetch(self, keys: List[str]) -> List[Tuple[str, Optional[bytes]]]:
+        """按 fetch_batch_size 分批 MGET 读取数据键
         
-    def _batch_write_to_mysql(self) -> None:
-        """批量将数据写入MySQL数据库"""
-        keys = self.redis_client.keys(f"perf_test:{self.test_id}:data:*")
-        if not keys:
-            return
+        Args:
+            keys: 数据键列表
             
-        # 获取所有数据
-        data_to_write = []
-        for key in keys:
-            value = self.redis_client.get(key)
-            if value:
-                data = json.loads(value)
-                data_to_write.append(data)
+        Returns:
+            List[Tuple[str, Optional[bytes]]]: (数据键, 数据) 列表，已过期的数据为None
+        """
+        result = []
+        for start in range(0, len(keys), self.fetch_batch_size):
+            batch = keys[start:start + self.fetch_batch_size]
+            result.extend(zip(batch, self.redis_client.mget(batch)))
+        return result
+        
+    def _batch_write_to_mysql(self) -> None:
+        """分块将数据写入MySQL数据库
+        
+        每次从时间索引头部读取 mysql_chunk_size 条数据，在独立事务中写入，
+        提交后再删除Redis中对应数据作为确认，内存占用与数据总量无关。
+        每条数据以Redis数据键作为唯一键写入，表结构及 (test_id, data_key) 唯一索引见 PerformanceTestData：
+        进程在写入后、确认前中断时，重新执行会忽略已写入的数据，不会重复写入。
+        """
+        self.flush()
+        # 这里根据实际的数据库表结构构造INSERT语句
+        sql = (
+            "INSERT IGNORE INTO performance_test_data (test_id, data_key, timestamp, data) "
+            "VALUES (%s, %s, %s, %s)"
+        )
+        
+        while True:
+            keys = self.redis_client.zrange(self.index_key, 0, self.mysql_chunk_size - 1)
+            if not keys:
+                break
                 
-        if not data_to_write:
-            return
-            
-        # 批量写入MySQL
-        with connection.cursor() as cursor:
-            # 这里根据实际的数据库表结构构造INSERT语句
-            sql = "INSERT INTO performance_test_data (test_id, timestamp, data) VALUES (%s, %s, %s)"
-            values = [
-                (self.test_id, data['timestamp'], json.dumps(data))
-                for data in data_to_write
-            ]
-            cursor.executemany(sql, values)
+            values = []
+            for key, value in self._fetch(keys):
+                if value:
+                    data = decode_sample(value)
+                    data_key = key.decode() if isinstance(key, bytes) else key
+                    values.append((self.test_id, data_key, data['timestamp'], value))
+                    
+            if values:
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.executemany(sql, values)
+                        
+            # 确认分块：删除已写入的Redis数据及其索引
+            self._delete_keys(keys)
             
-        # 删除已写入的Redis数据
-        self.redis_client.delete(*keys)
+    def _delete_keys(self, keys: List[str]) -> None:
+        """分批删除数据键并从时间索引中移除"""
+        for start in range(0, len(keys), self.fetch_batch_size):
+            batch = keys[start:start + self.fetch_batch_size]
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.delete(*batch)
+            pipe.zrem(self.index_key, *batch)
+            pipe.execute()
         
     def cleanup(self) -> None:
         """清理测试数据
         
-        在测试结束时调用，确保所有数据都已写入MySQL
+        在测试结束时调用，先等待后台刷写线程提交剩余缓冲，确保所有数据都已写入MySQL
         """
+        self.stop_flusher()
+        self._write_rollups()
         self._batch_write_to_mysql()
-        # 清理Redis中的所有相关数据
-        keys = self.redis_client.keys(f"perf_test:{self.test_id}:*")
+        # 清理Redis中的所有相关数据，数据键均通过索引定位
+        keys = self.redis_client.zrange(self.index_key, 0, -1)
         if keys:
-            self.redis_client.delete(*keys)
+            self._delete_keys(keys)
+        self.redis_client.delete(self.index_key, self.latest_key)
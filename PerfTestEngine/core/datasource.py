@@ -27,6 +27,26 @@ class DataSource(ABC):
         self._cache_size = 1000  # 默认缓存大小
         self._cache_hits = 0
         self._cache_misses = 0
+        # 数据分片 (序号, 分片数)，多进程/分布式执行时各执行节点使用不相交的数据
+        self.shard_index = 0
+        self.shard_count = 1
+    
+    def shard(self, index: int, count: int) -> 'DataSource':
+        """设置数据分片，子类按分片过滤数据
+        
+        Args:
+            index: 分片序号，从0开始
+            count: 分片总数
+            
+        Returns:
+            DataSource: 数据源实例本身
+        """
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f'无效的数据分片: {index}/{count}')
+        self.shard_index = index
+        self.shard_count = count
+        self.clear_cache()
+        return self
     
     def _get_cache_key(self, **kwargs) -> str:
         """生成缓存键
@@ -192,11 +212,19 @@ class CSVDataSource(DataSource):
         with open(self.file_path, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
             data = list(reader)
-            while True:
-                for row in data:
-                    yield {var_name: row[col_name] 
-                          for var_name, col_name in self.variable_mapping.items()}
+        # 行数不少于分片数时按行号取模分片，否则所有分片共享全部数据
+        if len(data) >= self.shard_count:
+            data = data[self.shard_index::self.shard_count]
+        while True:
+            for row in data:
+                yield {var_name: row[col_name] 
+                      for var_name, col_name in self.variable_mapping.items()}
                     
+    def shard(self, index: int, count: int) -> 'DataSource':
+        super().shard(index, count)
+        self._data_iterator = self._load_data()
+        return self
+        
     def get_data(self) -> Dict[str, Any]:
         cache_key = self._get_cache_key()
         cached_data = self._get_from_cache(cache_key)
@@ -220,10 +248,16 @@ class PoolDataSource(DataSource):
         if cached_data:
             return cached_data
             
-        data = {var_name: random.choice(values) 
+        data = {var_name: random.choice(self._shard_values(values)) 
                 for var_name, values in self.data_pool.items()}
         self._add_to_cache(cache_key, data)
         return data
+        
+    def _shard_values(self, values: list) -> list:
+        """按分片过滤取值列表，取值数少于分片数时不分片"""
+        if len(values) >= self.shard_count:
+            return values[self.shard_index::self.shard_count]
+        return values
 
 class GeneratorDataSource(DataSource):
     """数据生成器"""
@@ -0,0 +1,492 @@
+"""分布式执行模块
+
+提供协调节点 + 执行节点的分布式压测能力，包括：
+- 协调节点按负载均衡策略拆分并发用户数，动态策略下节点饱和时重新分配
+- 执行节点在本地运行Locust用户并定期上报统计快照
+- 协调节点合并各节点的Locust统计和性能统计快照
+- 本机多进程执行节点，每个CPU核心一个进程，突破单进程gevent只能使用一个核心的限制
+
+协调节点与执行节点之间使用 multiprocessing.connection 通信，使用共享的认证密钥做双向认证。
+执行节点可以是本机进程，也可以是其他机器上通过 run_worker（manage.py run_performance_worker）启动的进程。
+
+协调节点的监听、收发均在原生线程中执行（见 native 模块），收到的上报转交给事件循环线程处理，
+连接的阻塞读写不会阻塞协调节点的事件循环。
+"""
+
+import os
+import socket
+import struct
+import time
+import multiprocessing
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, answer_challenge, deliver_challenge
+from typing import Dict, List, Optional, Tuple, Union
+from locust.stats import setup_distributed_stats_event_listeners
+from .balancer import LoadBalancerFactory
+from .health import StatsCollector
+from .native import LoopCaller, NativeSocket, NativeThread, allocate_lock, sleep as native_sleep
+from ..ApiTestEngine.core.cases import CaseRunLog
+
+def to_authkey(authkey: Union[str, bytes, None]) -> Optional[bytes]:
+    """将配置中的认证密钥转换为bytes"""
+    if isinstance(authkey, str):
+        return authkey.encode('utf-8') if authkey else None
+    return authkey or None
+
+def _set_recv_timeout(fileno: int, timeout: float) -> None:
+    """设置socket接收超时，0表示不超时
+
+    multiprocessing 连接以 os.read 读取，超时后抛出 BlockingIOError，用于限制握手等待时间。
+    """
+    sock = NativeSocket(fileno=fileno)
+    try:
+        sock.setsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVTIMEO,
+            struct.pack('ll', int(timeout), int(timeout % 1 * 1000000))
+        )
+    finally:
+        sock.detach()
+
+class WorkerHandle:
+    """协调节点维护的执行节点连接及状态"""
+
+    def __init__(self, name: str, connection, index: int = 0):
+        self.name = name
+        self.connection = connection
+        # 连接顺序序号，用于数据源分片
+        self.index = index
+        self.user_count = 0
+        self.target_user_count = 0
+        self.last_report = time.time()
+        # 最近一次上报的节点负载（cpu_percent、loop_lag等）
+        self.load: Dict = {}
+        self.alive = True
+        self._send_lock = allocate_lock()
+
+    def send(self, message_type: str, data: Optional[Dict] = None) -> None:
+        with self._send_lock:
+            self.connection.send((message_type, data))
+
+class DistributedRunner:
+    """分布式执行协调器
+
+    对测试策略提供与 Locust LocalRunner 一致的 start/stop/quit/user_count 接口，
+    实际用户由各执行节点运行。执行节点每个上报周期通过 worker_report 事件上报
+    Locust统计和 perf_stats 性能统计快照，由事件监听器合并。
+    """
+
+    def __init__(self, environment, node_count: int, node_distribution: Optional[Dict] = None,
+                 bind_host: str = '127.0.0.1', bind_port: int = 0, authkey: Optional[bytes] = None,
+                 connect_timeout: float = 60, heartbeat_timeout: float = 30,
+                 load_balance_strategy: str = 'weight', balancer_options: Optional[Dict] = None,
+                 rebalance_interval: float = 5.0, handshake_timeout: float = 10):
+        """初始化协调器并开始监听执行节点连接
+
+        Args:
+            environment: Locust测试环境实例，用于合并统计和触发事件
+            node_count: 期望的执行节点数
+            node_distribution: 可选，节点分布配置，节点名称到权重的映射，未配置的节点权重为1
+            bind_host: 监听地址，远程执行节点需要监听 0.0.0.0 或本机对外地址
+            bind_port: 监听端口，0表示随机端口
+            authkey: 连接认证密钥，执行节点必须使用相同的密钥；未设置时随机生成，只能用于本机执行节点
+            connect_timeout: 等待执行节点连接的最长秒数
+            heartbeat_timeout: 执行节点超过该秒数未上报时视为失联
+            load_balance_strategy: 负载均衡策略，round_robin/weight/dynamic，见 LoadBalancerFactory
+            balancer_options: 可选，负载均衡策略参数
+            rebalance_interval: 运行过程中检查是否需要重新分配的间隔(秒)
+            handshake_timeout: 连接后完成认证并发送就绪消息的最长秒数
+        """
+        if node_count < 1:
+            raise ValueError('执行节点数必须大于0')
+        self.environment = environment
+        self.node_count = node_count
+        self.balancer = LoadBalancerFactory.create_balancer(
+            load_balance_strategy, node_distribution, **(balancer_options or {})
+        )
+        self.rebalance_interval = rebalance_interval
+        self.rebalance_history: List[Dict] = []
+        self.logger = CaseRunLog()
+        self.authkey = to_authkey(authkey) or os.urandom(16)
+        self.connect_timeout = connect_timeout
+        self.heartbeat_timeout = heartbeat_timeout
+        self.handshake_timeout = handshake_timeout
+        self._socket = NativeSocket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((bind_host, bind_port))
+        self._socket.listen(64)
+        self.address: Tuple[str, int] = self._socket.getsockname()[:2]
+        self.workers: Dict[str, WorkerHandle] = {}
+        self.target_user_count = 0
+        self.spawn_rate = 0
+        self._setup_data: Optional[Dict] = None
+        self._lock = allocate_lock()
+        self._closed = False
+        self._rebalance_thread: Optional[NativeThread] = None
+        # 上报在原生线程中接收，转交给事件循环线程触发 worker_report 事件
+        self._call_in_loop = LoopCaller()
+        setup_distributed_stats_event_listeners(environment.events, environment.stats)
+        self._accept_thread = NativeThread(self._accept_workers)
+        self._accept_thread.start()
+
+    def configure(self, setup_data: Dict) -> None:
+        """设置下发给执行节点的测试配置
+
+        Args:
+            setup_data: 执行节点调用 setup_worker 所需的参数（host、plan_data、execution_config、shard_key）
+        """
+        self._setup_data = setup_data
+        with self._lock:
+            workers = list(self.workers.values())
+        for worker in workers:
+            self._send_setup(worker)
+
+    def _send_setup(self, worker: WorkerHandle) -> None:
+        """向执行节点下发测试配置，附带该节点的数据分片 (序号, 分片数)"""
+        worker.send('setup', dict(self._setup_data, data_shard=(worker.index % self.node_count, self.node_count)))
+
+    def _accept_workers(self) -> None:
+        """接受执行节点连接，认证和就绪握手在每个连接的独立线程中进行，不阻塞后续连接"""
+        while not self._closed:
+            try:
+                sock, _ = self._socket.accept()
+            except OSError:
+                if self._closed:
+                    return
+                continue
+            NativeThread(self._serve_worker, (sock,)).start()
+
+    def _handshake(self, sock) -> Optional[Tuple[Connection, str]]:
+        """双向认证并接收就绪消息，超过 handshake_timeout 未完成时放弃该连接
+
+        Returns:
+            Optional[Tuple[Connection, str]]: 连接和执行节点名称，握手失败时返回None
+        """
+        sock.setblocking(True)
+        connection = Connection(sock.detach())
+        _set_recv_timeout(connection.fileno(), self.handshake_timeout)
+        try:
+            deliver_challenge(connection, self.authkey)
+            answer_challenge(connection, self.authkey)
+            message_type, data = connection.recv()
+        except (OSError, EOFError, AuthenticationError, ValueError) as e:
+            self._call_in_loop(self.logger.info_log, f'执行节点握手失败: {e}')
+            connection.close()
+            return None
+        if message_type != 'ready' or not data.get('name'):
+            connection.close()
+            return None
+        _set_recv_timeout(connection.fileno(), 0)
+        return connection, data['name']
+
+    def _serve_worker(self, sock) -> None:
+        """完成握手后登记执行节点，接收上报并转交事件循环线程触发 worker_report 事件"""
+        handshake = self._handshake(sock)
+        if handshake is None:
+            return
+        connection, name = handshake
+        with self._lock:
+            previous = self.workers.get(name)
+            index = previous.index if previous else self._free_index()
+            worker = WorkerHandle(name, connection, index)
+            self.workers[name] = worker
+        try:
+            if self._setup_data is not None:
+                self._send_setup(worker)
+            self._call_in_loop(self.logger.info_log, f'执行节点已连接: {name}')
+            while not self._closed:
+                message_type, data = connection.recv()
+                if message_type == 'report':
+                    self._call_in_loop(self._on_report, worker, data)
+                elif message_type == 'quit':
+                    break
+        except (OSError, EOFError):
+            pass
+        finally:
+            worker.alive = False
+            worker.user_count = 0
+
+    def _free_index(self) -> int:
+        """分配数据分片序号：优先复用已下线节点的序号，替补节点接管下线节点的数据分片
+
+        调用方需持有 self._lock。
+        """
+        used = {worker.index for worker in self.workers.values() if worker.alive}
+        index = 0
+        while index in used:
+            index += 1
+        return index
+
+    def _on_report(self, worker: WorkerHandle, data: Dict) -> None:
+        """处理执行节点上报，在事件循环线程中执行"""
+        if not worker.alive:
+            return
+        worker.user_count = data.get('user_count', 0)
+        worker.load = data.get('load') or worker.load
+        worker.last_report = time.time()
+        self.environment.events.worker_report.fire(client_id=worker.name, data=data)
+
+    def wait_for_workers(self, timeout: Optional[float] = None) -> None:
+        """等待足够数量的执行节点连接
+
+        Raises:
+            RuntimeError: 超时仍未连接足够节点时抛出
+        """
+        deadline = time.time() + (self.connect_timeout if timeout is None else timeout)
+        while len(self.alive_workers) < self.node_count:
+            if time.time() >= deadline:
+                raise RuntimeError(
+                    f'等待执行节点超时: 期望{self.node_count}个，已连接{len(self.alive_workers)}个，'
+                    f'协调节点地址 {self.address[0]}:{self.address[1]}'
+                )
+            time.sleep(0.1)
+
+    @property
+    def alive_workers(self) -> List[WorkerHandle]:
+        """在线的执行节点，按名称排序保证分配结果稳定"""
+        now = time.time()
+        with self._lock:
+            workers = list(self.workers.values())
+        return sorted(
+            (worker for worker in workers
+             if worker.alive and now - worker.last_report < self.heartbeat_timeout),
+            key=lambda worker: worker.name
+        )
+
+    def dispatch(self, allocation: Dict[str, int], spawn_rate: float) -> None:
+        """按分配结果向各执行节点下发用户数
+
+        Args:
+            allocation: 节点名称到用户数的映射
+            spawn_rate: 总用户生成速率，按用户数比例拆分到各节点
+        """
+        total = sum(allocation.values()) or 1
+        for name, user_count in allocation.items():
+            worker = self.workers[name]
+            worker.target_user_count = user_count
+            worker.send('start', {
+                'user_count': user_count,
+                'spawn_rate': max(spawn_rate * user_count / total, 1)
+            })
+
+    def start(self, user_count: int, spawn_rate: Optional[float] = None, **kwargs) -> None:
+        """按节点权重拆分用户数并下发到各执行节点
+
+        Args:
+            user_count: 总并发用户数
+            spawn_rate: 可选，总用户生成速率，默认一次性生成
+        """
+        self.wait_for_workers()
+        self.target_user_count = user_count
+        self.spawn_rate = spawn_rate or user_count
+        self.dispatch(self.balancer.allocate(user_count, self.alive_workers), self.spawn_rate)
+        if self._rebalance_thread is None:
+            self._rebalance_thread = NativeThread(self._rebalance_loop)
+            self._rebalance_thread.start()
+
+    def _rebalance_loop(self) -> None:
+        """运行过程中定期检查，节点下线或负载均衡策略判定节点饱和时重新分配用户"""
+        while not self._closed:
+            native_sleep(self.rebalance_interval)
+            if self._closed or self.target_user_count <= 0:
+                continue
+            workers = self.alive_workers
+            if not workers:
+                continue
+            alive = {worker.name for worker in workers}
+            with self._lock:
+                known = list(self.workers.values())
+            lost = [worker for worker in known
+                    if worker.target_user_count > 0 and worker.name not in alive]
+            if lost:
+                reason = f'节点下线: {", ".join(worker.name for worker in lost)}'
+            elif self.balancer.needs_rebalance(workers):
+                reason = '节点饱和: ' + ', '.join(
+                    f'{worker.name}(cpu={worker.load.get("cpu_percent")}%, lag={worker.load.get("loop_lag")}ms)'
+                    for worker in workers if worker.load
+                )
+            else:
+                continue
+            allocation = self.balancer.allocate(self.target_user_count, workers)
+            for worker in lost:
+                worker.target_user_count = 0
+            if all(self.workers[name].target_user_count == count for name, count in allocation.items()):
+                continue
+            try:
+                self.dispatch(allocation, self.spawn_rate)
+            except OSError:
+                # 下发时节点断开，下一轮检查按节点下线重新分配
+                continue
+            self.rebalance_history.append({'time': time.time(), 'reason': reason, 'allocation': allocation})
+            self._call_in_loop(self.logger.info_log, f'重新分配并发用户: {reason}, 分配结果={allocation}')
+
+    def stop(self) -> None:
+        """停止所有执行节点上的用户"""
+        self.target_user_count = 0
+        for worker in self.alive_workers:
+            worker.target_user_count = 0
+            worker.send('stop')
+
+    def quit(self, timeout: float = 5) -> None:
+        """通知所有执行节点退出，关闭监听并等待后台线程结束，重复调用无副作用
+
+        Args:
+            timeout: 等待监听线程和重新分配线程结束的最长秒数
+        """
+        if self._closed:
+            return
+        self._closed = True
+        with self._lock:
+            workers = list(self.workers.values())
+        for worker in workers:
+            try:
+                worker.send('quit')
+            except OSError:
+                pass
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        self._accept_thread.join(timeout)
+        if self._rebalance_thread is not None:
+            self._rebalance_thread.join(timeout)
+
+    def get_node_stats(self) -> List[Dict]:
+        """获取各执行节点的用户分配和负载"""
+        alive = {worker.name for worker in self.alive_workers}
+        with self._lock:
+            workers = list(self.workers.values())
+        return [{
+            'name': worker.name,
+            'alive': worker.name in alive,
+            'user_count': worker.user_count,
+            'target_user_count': worker.target_user_count,
+            'load': worker.load
+        } for worker in sorted(workers, key=lambda worker: worker.name)]
+
+    @property
+    def user_count(self) -> int:
+        """各执行节点最近上报的用户数之和"""
+        return sum(worker.user_count for worker in self.alive_workers)
+
+    @property
+    def stats(self):
+        """合并后的Locust统计"""
+        return self.environment.stats
+
+def run_worker(address: Tuple[str, int], authkey: Union[str, bytes], name: Optional[str] = None,
+               report_interval: float = 1.0) -> None:
+    """运行执行节点，连接协调节点并执行下发的命令，直到收到退出命令或连接断开
+
+    命令在主线程（事件循环线程）中以非阻塞方式轮询，轮询间隙让出事件循环给压测用户。
+
+    Args:
+        address: 协调节点监听地址
+        authkey: 连接认证密钥，与协调节点一致
+        name: 可选，节点名称，默认 主机名-进程号
+        report_interval: 统计快照上报间隔(秒)
+    """
+    from .engine import PerformanceTestEngine
+
+    name = name or f'{socket.gethostname()}-{os.getpid()}'
+    connection = Client(tuple(address), authkey=to_authkey(authkey))
+    connection.send(('ready', {'name': name}))
+    engine = PerformanceTestEngine()
+    monitor = StatsCollector()
+    monitor.start()
+    runner = None
+    last_report = 0.0
+    try:
+        while True:
+            while connection.poll(0):
+                message_type, data = connection.recv()
+                if message_type == 'setup':
+                    engine.setup_worker(**data)
+                    setup_distributed_stats_event_listeners(engine.env.events, engine.env.stats)
+                    runner = engine.env.create_local_runner()
+                    # 使用协调节点下发的告警阈值重新创建负载监控
+                    monitor.stop()
+                    monitor = StatsCollector(
+                        engine.env, thresholds=(data.get('execution_config') or {}).get('health_thresholds')
+                    )
+                    monitor.start()
+                elif message_type == 'start' and runner:
+                    engine.update_test_data()
+                    if data['user_count'] > 0:
+                        runner.start(user_count=data['user_count'], spawn_rate=data['spawn_rate'])
+                    else:
+                        runner.stop()
+                elif message_type == 'stop' and runner:
+                    runner.stop()
+                elif message_type == 'quit':
+                    return
+            if engine.env and time.time() - last_report >= report_interval:
+                last_report = time.time()
+                report = engine.get_worker_report(name)
+                report['load'] = monitor.collect()
+                connection.send(('report', report))
+            time.sleep(0.05)
+    except (OSError, EOFError):
+        pass
+    finally:
+        monitor.stop()
+        if runner:
+            runner.quit()
+        try:
+            connection.send(('quit', None))
+        except OSError:
+            pass
+        connection.close()
+
+def resolve_process_count(processes) -> int:
+    """解析本机执行进程数配置
+
+    Args:
+        processes: 进程数，'auto' 表示每个CPU核心一个进程
+
+    Returns:
+        int: 进程数，至少为1
+    """
+    if processes == 'auto':
+        if hasattr(os, 'sched_getaffinity'):
+            return max(len(os.sched_getaffinity(0)), 1)
+        return os.cpu_count() or 1
+    return max(int(processes or 1), 1)
+
+def _run_local_worker(address: Tuple[str, int], authkey: bytes, name: str, cpu: Optional[int]) -> None:
+    """本机执行节点进程入口，按需绑定到指定CPU核心"""
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError:
+            pass
+    run_worker(address, authkey, name)
+
+def spawn_local_workers(count: int, address: Tuple[str, int], authkey: bytes,
+                        name_prefix: str = 'local', pin_cpus: bool = False) -> List[multiprocessing.Process]:
+    """在本机启动执行节点进程
+
+    Args:
+        count: 进程数
+        address: 协调节点监听地址
+        authkey: 连接认证密钥
+        name_prefix: 节点名称前缀，节点名称为 前缀-序号
+        pin_cpus: 是否将每个进程绑定到一个CPU核心
+
+    Returns:
+        List[multiprocessing.Process]: 已启动的进程列表
+    """
+    cpus = sorted(os.sched_getaffinity(0)) if pin_cpus and hasattr(os, 'sched_getaffinity') else []
+    # 使用spawn启动全新的解释器：协调进程已被gevent补丁并运行监听线程，且可能是Celery的守护进程，
+    # fork会把这些状态复制到子进程
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for index in range(count):
+        process = context.Process(
+            target=_run_local_worker,
+            args=(address, authkey, f'{name_prefix}-{index}', cpus[index % len(cpus)] if cpus else None),
+            daemon=True
+        )
+        process.start()
+        processes.append(process)
+    return processes
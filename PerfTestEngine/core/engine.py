@@ -9,17 +9,26 @@
 
 import threading
 import logging
+import math
 import os
+import time
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
-from typing import Dict, List, Optional, Type
+from typing import Dict, List, Optional, Tuple, Type
 from locust import Environment
+from locust.stats import RequestStats
 from .test_user import PerformanceTestUser
-from .performance_stats import StatsCollector
-from .test_mode import StrategyFactory
+from .async_user import AsyncPerformanceTestUser
+from .performance_stats import PerformanceStatsCollector
+from .health import StatsCollector, DEFAULT_BOTTLENECK_TOLERANCE
+from .test_mode import StrategyFactory, ArrivalRateStrategy
 from .report import ReportGenerator
 from .datasource import DataSourceFactory
-from .plugin import PluginManager
+from .plugin import Plugin, PluginManager
+from .plan import TestPlan
+from .data_storage import PerformanceDataStorage
+from .scheduler import ThinkTimeScheduler
+from .distributed import DistributedRunner, resolve_process_count, spawn_local_workers
 from ..ApiTestEngine.core.cases import CaseRunLog
 
 class PerformanceTestEngine:
@@ -32,8 +41,12 @@ class PerformanceTestEngine:
     - 测试数据收集
     """
     
+    # 当前进程中运行的引擎，按测试标识（测试计划ID）索引
+    _running: Dict[str, 'PerformanceTestEngine'] = {}
+    
     def __init__(self):
         """初始化测试引擎"""
+        self.test_key = None
         self.env = None
         self.strategy = None
         self.stats_collector = None
@@ -45,6 +58,14 @@ class PerformanceTestEngine:
         self._config_lock = threading.Lock()
         self.plugin_manager = PluginManager()
         self.data_storage = None
+        self.execution_config = {}
+        self.engine_mode = 'sync'
+        self.corrected_stats = None
+        self.performance_stats = None
+        self.distributed_runner = None
+        self.worker_processes = []
+        # 时间桶批量写入函数，由调用方在 setup_test 前设置，如写入 PerformanceMetrics
+        self.rollup_writer = None
         
         # 初始化日志系统
         self.logger = CaseRunLog()
@@ -52,6 +73,32 @@ class PerformanceTestEngine:
         self.logger.info_log('性能测试引擎初始化完成')
 
 
+    @classmethod
+    def get_running(cls, test_key) -> Optional['PerformanceTestEngine']:
+        """查找运行中的引擎
+        
+        Args:
+            test_key: 测试标识，如测试计划ID
+            
+        Returns:
+            Optional[PerformanceTestEngine]: 运行中的引擎，测试未运行时返回None
+        """
+        return cls._running.get(str(test_key))
+        
+    def register_running(self, test_key) -> None:
+        """登记为运行中的引擎，实时数据推送和停止测试时通过 get_running 查找
+        
+        Args:
+            test_key: 测试标识，如测试计划ID
+        """
+        self.test_key = str(test_key)
+        PerformanceTestEngine._running[self.test_key] = self
+        
+    def unregister_running(self) -> None:
+        """取消运行中登记"""
+        if self.test_key is not None and PerformanceTestEngine._running.get(self.test_key) is self:
+            del PerformanceTestEngine._running[self.test_key]
+        
     def register_plugin(self, plugin_type: str, plugin_class: Type[Plugin]) -> None:
         """注册插件
         
@@ -62,34 +109,63 @@ class PerformanceTestEngine:
         self.logger.debug_log(f'注册插件: {plugin_type} - {plugin_class.__name__}')
         self.plugin_manager.register_plugin(plugin_type, plugin_class)
         
-    def setup_test(self, host: str, plan_data: Dict):
+    def setup_test(self, host: str, plan_data: Dict, execution_config: Optional[Dict] = None,
+                   distribution: Optional[Dict] = None):
         """配置测试环境
         
         Args:
             host: 目标主机地址
             plan_data: 测试计划配置数据
+            execution_config: 可选，执行配置（PerformanceConfig.execution_config），包括：
+                - engine_mode: sync（默认）或 async，async 不支持到达率模式
+                - flow_dispatch: sequential（默认，依次执行全部流程）或 weighted（按权重选择流程）
+                - think_time: 思考时间调度配置，见 ThinkTimeScheduler
+                - latency_correction: 是否额外记录从计划开始时间起算的校正延迟，async 不支持
+                - aggregation_period: 指标时间桶聚合周期，默认1s
+                - max_breakdown_entries: 分接口统计项数量上限，默认200
+                - processes: 本机执行进程数，'auto' 表示每个CPU核心一个进程，大于1时
+                  由本机协调节点拆分并发用户和数据源数据并合并统计
+                - pin_cpus: 本机多进程执行时是否将每个进程绑定到一个CPU核心
+                - health_thresholds: 压测机负载告警阈值，见 health.DEFAULT_THRESHOLDS
+                - bottleneck_tolerance: 允许的告警时长占测试时长的比例，超过时测量结果视为无效，默认0.05
+            distribution: 可选，分布式执行配置，包括：
+                - control_mode: single（默认）或 distributed
+                - node_count: 执行节点数
+                - node_distribution: 节点名称到权重的映射
+                - load_balance_strategy: 负载均衡策略，round_robin/weight（默认）/dynamic
+                - balancer_options: 负载均衡策略参数，如动态策略的 cpu_target、lag_target
+                - bind_host/bind_port: 协调节点监听地址，默认 127.0.0.1 随机端口
+                - local_workers: 是否在本机启动执行节点进程，默认False（由外部启动 run_worker）
+                - pin_cpus: 本机执行节点进程是否绑定CPU核心
         """
         self.logger.info_log(f'开始配置测试环境: {host}')
         with self._config_lock:
-            # 初始化数据存储
             test_id = str(int(time.time()))
-            self.data_storage = PerformanceDataStorage(test_id)
-            self.logger.debug_log('初始化数据存储管理器')
+            self._setup_environment(host, plan_data, execution_config, test_id)
             
-            # 解析测试计划
-            self.test_plan = TestPlan(plan_data)
-            self.logger.debug_log(f'测试计划配置: {plan_data}')
-            
-            # 创建测试环境
-            self.env = Environment(user_classes=[PerformanceTestUser])
-            self.env.host = host
+            # 初始化压测机自身负载监控
+            self.stats_collector = StatsCollector(
+                self.env, thresholds=self.execution_config.get('health_thresholds')
+            )
             
-            # 配置测试用户类
-            self.env.user_classes[0].test_flows = self.test_plan.flows
-            self.env.user_classes[0].global_variables = self.test_plan.variables
+            # 分布式执行：用户由执行节点运行，协调节点合并各节点上报的统计
+            distribution = distribution or {}
+            if distribution.get('control_mode') == 'distributed':
+                self._setup_distributed(host, plan_data, test_id, distribution)
+            elif self.execution_config.get('processes'):
+                # 本机多进程执行：gevent只能使用一个核心，每个核心启动一个执行节点进程
+                process_count = resolve_process_count(self.execution_config['processes'])
+                if process_count > 1:
+                    self._setup_distributed(host, plan_data, test_id, {
+                        'node_count': process_count,
+                        'local_workers': True,
+                        'pin_cpus': self.execution_config.get('pin_cpus', False)
+                    })
             
-            # 初始化数据收集器
-            self.stats_collector = StatsCollector(self.env)
+            # 初始化数据存储，在本机执行节点进程启动之后创建，数据库连接和写入线程不会带入子进程
+            self.data_storage = PerformanceDataStorage(test_id, rollup_writer=self.rollup_writer)
+            self.data_storage.start_flusher()
+            self.logger.debug_log('初始化数据存储管理器')
             
             # 初始化报告生成器
             if 'report_plugin' in plan_data:
@@ -102,23 +178,159 @@ class PerformanceTestEngine:
             self.report_generator.start_test()
             
             # 初始化数据源
-            if 'data_source' in plan_data:
-                source_config = plan_data['data_source']
-                if source_config['type'] in self.plugin_manager.get_plugin_names('datasource'):
-                    plugin = self.plugin_manager.get_plugin('datasource', source_config['type'])()
-                    plugin.initialize(source_config.get('config', {}))
-                    self.data_source = plugin
-                else:
-                    self.data_source = DataSourceFactory.create_data_source(
-                        source_type=source_config['type'],
-                        config=source_config['config']
-                    )
+            self._setup_data_source(plan_data)
+            
+    def _setup_distributed(self, host: str, plan_data: Dict, shard_key: str, distribution: Dict):
+        """创建分布式执行协调器，并按需在本机启动执行节点
+        
+        Args:
+            host: 目标主机地址
+            plan_data: 测试计划配置数据
+            shard_key: 数据分片键
+            distribution: 分布式执行配置
+        """
+        node_count = distribution.get('node_count', 1)
+        if not distribution.get('authkey') and not distribution.get('local_workers'):
+            raise ValueError('分布式执行需要配置认证密钥(authkey)，远程执行节点使用相同密钥连接')
+        self.distributed_runner = DistributedRunner(
+            self.env,
+            node_count=node_count,
+            node_distribution=distribution.get('node_distribution'),
+            load_balance_strategy=distribution.get('load_balance_strategy', 'weight'),
+            balancer_options=distribution.get('balancer_options'),
+            bind_host=distribution.get('bind_host', '127.0.0.1'),
+            bind_port=distribution.get('bind_port', 0),
+            authkey=distribution.get('authkey')
+        )
+        self.distributed_runner.configure({
+            'host': host,
+            'plan_data': plan_data,
+            'execution_config': self.execution_config,
+            'shard_key': shard_key
+        })
+        self.env.events.worker_report.add_listener(self._on_worker_report)
+        self.logger.info_log(
+            f'分布式执行协调节点已启动: 地址={self.distributed_runner.address[0]}:{self.distributed_runner.address[1]}, '
+            f'节点数={node_count}'
+        )
+        if distribution.get('local_workers'):
+            self.worker_processes = spawn_local_workers(
+                node_count, self.distributed_runner.address, self.distributed_runner.authkey,
+                pin_cpus=distribution.get('pin_cpus', False)
+            )
+            self.logger.info_log(f'启动本机执行节点进程: {node_count}个')
             
+    def setup_worker(self, host: str, plan_data: Dict, execution_config: Optional[Dict] = None,
+                     shard_key: str = 'default', data_shard: Optional[Tuple[int, int]] = None):
+        """配置执行节点的测试环境
+        
+        执行节点只运行用户并收集统计，不初始化数据存储和报告，统计通过 get_worker_report 上报。
+        
+        Args:
+            host: 目标主机地址
+            plan_data: 测试计划配置数据
+            execution_config: 可选，执行配置，见 setup_test
+            shard_key: 数据分片键
+            data_shard: 可选，数据源分片 (序号, 分片数)
+        """
+        self.logger.info_log(f'配置执行节点测试环境: {host}')
+        with self._config_lock:
+            self._setup_environment(host, plan_data, execution_config, shard_key)
+            self._setup_data_source(plan_data, data_shard)
+            
+    def update_test_data(self) -> None:
+        """从数据源获取新的测试数据并更新用户全局变量"""
+        if self.data_source and self.env:
+            data = self.data_source.get_data()
+            if data:
+                self.env.user_classes[0].global_variables.update(data)
+                
+    def _setup_data_source(self, plan_data: Dict, data_shard: Optional[Tuple[int, int]] = None) -> None:
+        """初始化数据源
+        
+        Args:
+            plan_data: 测试计划配置数据
+            data_shard: 可选，数据源分片 (序号, 分片数)
+        """
+        if 'data_source' not in plan_data:
+            return
+        source_config = plan_data['data_source']
+        if source_config['type'] in self.plugin_manager.get_plugin_names('datasource'):
+            plugin = self.plugin_manager.get_plugin('datasource', source_config['type'])()
+            plugin.initialize(source_config.get('config', {}))
+            self.data_source = plugin
+        else:
+            self.data_source = DataSourceFactory.create_data_source(
+                source_type=source_config['type'],
+                config=source_config['config']
+            )
+        if data_shard and hasattr(self.data_source, 'shard'):
+            self.data_source.shard(*data_shard)
+            self.logger.debug_log(f'数据源分片: {data_shard[0]}/{data_shard[1]}')
+            
+    def get_worker_report(self, client_id: str) -> Dict:
+        """生成执行节点上报数据
+        
+        包含Locust统计（由 report_to_master 事件监听器填充）、当前用户数和性能统计快照。
+        
+        Args:
+            client_id: 执行节点名称
+        """
+        data = {}
+        self.env.events.report_to_master.fire(client_id=client_id, data=data)
+        user_count = self.env.runner.user_count if self.env.runner else 0
+        self.performance_stats.update_concurrent_users(user_count)
+        data['user_count'] = user_count
+        data['perf_stats'] = self.performance_stats.to_snapshot()
+        return data
+        
+    def _setup_environment(self, host: str, plan_data: Dict, execution_config: Optional[Dict],
+                           shard_key: str):
+        """解析测试计划，创建Locust测试环境并配置测试用户类和性能统计
+        
+        Args:
+            host: 目标主机地址
+            plan_data: 测试计划配置数据
+            execution_config: 可选，执行配置
+            shard_key: 数据分片键
+        """
+        # 解析测试计划
+        self.test_plan = TestPlan(plan_data)
+        self.logger.debug_log(f'测试计划配置: {plan_data}')
+        
+        # 创建测试环境
+        self.execution_config = execution_config or {}
+        user_class = self._get_user_class(self.execution_config)
+        self.env = Environment(user_classes=[user_class])
+        self.env.host = host
+        
+        # 配置测试用户类
+        self.env.user_classes[0].test_flows = self.test_plan.flows
+        self.env.user_classes[0].global_variables = self.test_plan.variables
+        self.env.user_classes[0].flow_table = self.test_plan.flow_table
+        self.env.user_classes[0].flow_dispatch = self.execution_config.get('flow_dispatch', 'sequential')
+        self.env.user_classes[0].think_time_scheduler = ThinkTimeScheduler.from_config(
+            self.execution_config.get('think_time')
+        )
+        
+        # 延迟校正：另外记录从计划开始时间起算的延迟，消除协调遗漏
+        self.corrected_stats = RequestStats() if self.execution_config.get('latency_correction') else None
+        self.env.user_classes[0].corrected_stats = self.corrected_stats
+        
+        # 订阅请求事件，按时间桶和接口维度聚合性能数据
+        self.performance_stats = PerformanceStatsCollector(
+            shard_key=shard_key,
+            aggregation_period=self.execution_config.get('aggregation_period', '1s'),
+            max_breakdown_entries=self.execution_config.get('max_breakdown_entries', 200)
+        )
+        self.env.events.request_success.add_listener(self._on_request_success)
+        self.env.events.request_failure.add_listener(self._on_request_failure)
+        
     def start_test(self, test_mode: str, config: Dict):
         """启动性能测试
         
         Args:
-            test_mode: 测试模式（concurrent/step/error_rate）
+            test_mode: 测试模式（concurrent/step/error_rate/constant_arrival_rate/ramping_arrival_rate/adaptive）
             config: 测试配置参数
         """
         self.logger.info_log(f'开始执行性能测试: 模式={test_mode}')
@@ -129,9 +341,22 @@ class PerformanceTestEngine:
                 self.logger.error_log('测试环境未初始化')
                 raise RuntimeError('测试环境未初始化')
                 
+            # 异步模式下每个Locust用户驱动多个协程虚拟用户
+            if self.engine_mode == 'async':
+                config = self._scale_async_config(config)
+                
             # 创建并执行测试策略
             self.strategy = StrategyFactory.create_strategy(test_mode, self.env)
             self.logger.info_log(f'创建测试策略: {test_mode}')
+            if self.engine_mode == 'async' and isinstance(self.strategy, ArrivalRateStrategy) \
+                    and self.strategy.is_open_model(config):
+                # 到达率模式按迭代门控放行每次迭代，异步用户一次驱动多个协程迭代，无法逐个放行
+                raise ValueError(f'异步执行模式不支持到达率模式: {test_mode}')
+            if self.distributed_runner:
+                if isinstance(self.strategy, ArrivalRateStrategy) and self.strategy.is_open_model(config):
+                    raise ValueError(f'分布式执行不支持到达率模式: {test_mode}')
+                self.strategy.runner_factory = lambda: self.distributed_runner
+                self.logger.info_log('测试策略使用分布式执行协调器')
             
             # 启动性能监控
             self._start_monitoring()
@@ -145,9 +370,13 @@ class PerformanceTestEngine:
         """停止性能测试"""
         self.logger.info_log('停止性能测试')
         with self._config_lock:
-            if self.strategy and self.strategy.runner:
-                self.strategy.runner.stop()
-                self.logger.info_log('停止测试策略执行')
+            try:
+                if self.strategy and self.strategy.runner:
+                    self.strategy.runner.stop()
+                    self.logger.info_log('停止测试策略执行')
+            finally:
+                # 停止用户失败时也要关闭协调节点，否则监听端口和执行节点不会释放
+                self._stop_distributed()
                 
             # 停止性能监控
             self._stop_monitoring()
@@ -161,7 +390,25 @@ class PerformanceTestEngine:
             if self.data_storage:
                 self.data_storage.cleanup()
                 self.logger.info_log('清理测试数据存储')
+                
+            self.unregister_running()
 
+    def _stop_distributed(self):
+        """关闭分布式执行协调节点，通知执行节点退出并等待本机执行节点进程结束"""
+        if not self.distributed_runner and not self.worker_processes:
+            return
+        if self.distributed_runner:
+            self.distributed_runner.quit()
+            self.distributed_runner = None
+        for process in self.worker_processes:
+            process.join(timeout=5)
+            # 未在超时内响应 quit 的执行节点（如卡在请求中）强制结束，避免残留解释器进程
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=5)
+        self.worker_processes = []
+        self.logger.info_log('分布式执行节点已退出')
+        
     def get_test_stats(self) -> Dict:
         """获取测试统计数据"""
         if not self.env or not self.strategy or not self.strategy.runner:
@@ -175,16 +422,70 @@ class PerformanceTestEngine:
             'median_response_time': self.env.stats.total.median_response_time,
             'percentile_95': self.env.stats.total.get_response_time_percentile(0.95),
             'percentile_99': self.env.stats.total.get_response_time_percentile(0.99),
-            'error_types': self._get_error_types(),
+            'error_types': self._get_error_types() if not self.performance_stats else {
+                group['fingerprint']: group for group in self.performance_stats.get_error_groups()
+            },
             'user_count': self.strategy.runner.user_count,
         }
         
-        # 存储数据到Redis
+        # 分接口统计
+        if self.performance_stats:
+            stats['breakdown'] = self.performance_stats.get_breakdown()
+        
+        # 校正后的延迟统计，与原始统计并列
+        if self.corrected_stats:
+            corrected = self.corrected_stats.total
+            stats['corrected'] = {
+                'avg_response_time': corrected.avg_response_time,
+                'median_response_time': corrected.median_response_time,
+                'percentile_95': corrected.get_response_time_percentile(0.95),
+                'percentile_99': corrected.get_response_time_percentile(0.99),
+                'max_response_time': corrected.max_response_time
+            }
+        
+        # 到达率模式下记录因用户池耗尽而丢弃的迭代
+        if hasattr(self.strategy, 'dropped_iterations'):
+            stats['dropped_iterations'] = self.strategy.dropped_iterations
+        
+        # 自适应模式的调整记录和最大可持续负载
+        if hasattr(self.strategy, 'adaptive_result'):
+            stats['adaptive'] = self.strategy.adaptive_result
+        
+        # 分布式执行时各执行节点的用户分配和负载
+        if self.distributed_runner:
+            stats['nodes'] = self.distributed_runner.get_node_stats()
+        
+        # 压测机自身负载告警，告警期间的响应时间可能包含压测机的排队延迟
+        stats['generator_health'] = self._get_generator_health()
+        
+        # 存储数据到Redis，写入经过缓冲批量提交
         if self.data_storage:
             self.data_storage.store_test_data(stats)
+            stats['storage'] = self.data_storage.get_write_metrics()
         
         # 更新报告数据
         self.report_generator.update_test_stats(stats)
+        if self.performance_stats:
+            self.report_generator.update_error_stats(list(stats['error_types'].values()))
+        return stats
+        
+    def get_test_stats_delta(self, since: int = 0) -> Dict:
+        """获取增量测试统计数据，供前端轮询使用
+
+        只返回 since 序号之后发生变化的数据，不写入Redis和报告。
+
+        Args:
+            since: 上一次查询返回的 sequence，首次查询传0
+        """
+        if not self.performance_stats or not self.strategy or not self.strategy.runner:
+            return {}
+        
+        self.performance_stats.update_concurrent_users(self.strategy.runner.user_count)
+        stats = self.performance_stats.get_delta(since)
+        stats['user_count'] = self.strategy.runner.user_count
+        if hasattr(self.strategy, 'dropped_iterations'):
+            stats['dropped_iterations'] = self.strategy.dropped_iterations
+        stats['generator_health'] = self._get_generator_health()
         return stats
         
     def get_system_stats(self) -> Dict:
@@ -196,20 +497,126 @@ class PerformanceTestEngine:
         self.report_generator.update_system_stats(stats)
         return stats
         
+    def _get_generator_health(self) -> Dict:
+        """汇总压测机自身负载告警，分布式执行时包含各执行节点的告警"""
+        if not self.stats_collector:
+            return {}
+        local = self.stats_collector.get_stats()
+        warnings = list(local['warnings'])
+        bottleneck_seconds = local['bottleneck_seconds']
+        if self.distributed_runner:
+            for node in self.distributed_runner.get_node_stats():
+                load = node['load']
+                warnings.extend(f"{node['name']}:{flag}" for flag in load.get('warnings', []))
+                bottleneck_seconds = max(bottleneck_seconds, load.get('bottleneck_seconds', 0))
+        return {
+            'warnings': warnings,
+            'generator_bottleneck': bool(warnings),
+            'bottleneck_seconds': bottleneck_seconds,
+            'tolerance': self.execution_config.get('bottleneck_tolerance', DEFAULT_BOTTLENECK_TOLERANCE)
+        }
+        
     def get_report(self) -> Dict:
         """获取测试报告"""
         return self.report_generator.generate_report()
         
+    def _on_request_success(self, request_type: str, name: str, response_time: float,
+                            response_length: int = 0, **kwargs):
+        """请求成功事件监听"""
+        self._update_user_count()
+        self.performance_stats.record_request(
+            response_time, True, response_length=response_length, name=name, method=request_type
+        )
+        
+    def _on_request_failure(self, request_type: str, name: str, response_time: float,
+                            exception: Exception = None, response_length: int = 0, **kwargs):
+        """请求失败事件监听"""
+        self._update_user_count()
+        response = getattr(exception, 'response', None)
+        error_data = {
+            'message': str(exception) if exception else '',
+            'status_code': getattr(response, 'status_code', None),
+            'name': name,
+            'method': request_type
+        }
+        self.performance_stats.record_request(
+            response_time, False, error_type=type(exception).__name__ if exception else 'Unknown',
+            error_data=error_data, response_length=response_length, name=name, method=request_type
+        )
+        
+    def _on_worker_report(self, client_id: str, data: Dict, **kwargs):
+        """执行节点上报事件监听，合并节点的性能统计快照"""
+        if 'perf_stats' in data:
+            self.performance_stats.merge_node_snapshot(client_id, data['perf_stats'])
+            
+    def _update_user_count(self):
+        """同步当前并发用户数，用于时间桶记录"""
+        if self.strategy and self.strategy.runner:
+            self.performance_stats.update_concurrent_users(self.strategy.runner.user_count)
+            
+    def _get_user_class(self, execution_config: Dict) -> Type:
+        """根据执行配置选择测试用户类
+        
+        Args:
+            execution_config: 执行配置
+            
+        Returns:
+            Type: 测试用户类
+        """
+        self.engine_mode = execution_config.get('engine_mode', 'sync')
+        if self.engine_mode == 'sync':
+            return PerformanceTestUser
+        if self.engine_mode == 'async':
+            if execution_config.get('latency_correction'):
+                # 延迟校正按每次迭代的计划开始时间计算，异步虚拟用户不跟踪计划开始时间，不记录校正延迟
+                raise ValueError('异步执行模式不支持延迟校正')
+            user_class = AsyncPerformanceTestUser
+            user_class.coroutines_per_user = execution_config.get('coroutines_per_user', 10)
+            user_class.pool_size = execution_config.get('pool_size', 100)
+            user_class.request_timeout = execution_config.get('request_timeout', 30)
+            self.logger.info_log(
+                f'使用异步执行模式: 每用户协程数={user_class.coroutines_per_user}, '
+                f'进程连接池大小={user_class.pool_size}'
+            )
+            return user_class
+        raise ValueError(f'不支持的执行模式: {self.engine_mode}')
+        
+    def _scale_async_config(self, config: Dict) -> Dict:
+        """将虚拟用户数换算为异步模式下的Locust用户数
+        
+        用户数和用户生成速率按每个Locust用户驱动的协程数换算；ramp_up 为加压时长，保持不变，
+        由换算后的用户数和 ramp_up 计算的生成速率随之换算，加压时长与同步模式一致。
+        
+        Args:
+            config: 测试配置参数
+            
+        Returns:
+            Dict: 换算后的测试配置参数
+        """
+        per_user = AsyncPerformanceTestUser.coroutines_per_user
+        scaled = dict(config)
+        for field in ('vus', 'user_count', 'step_users', 'pre_allocated_vus', 'initial_users', 'min_users'):
+            if scaled.get(field):
+                scaled[field] = max(1, math.ceil(scaled[field] / per_user))
+        if scaled.get('spawn_rate'):
+            scaled['spawn_rate'] = scaled['spawn_rate'] / per_user
+        return scaled
+        
     def _start_monitoring(self):
         """启动性能监控线程"""
         if self.stats_collector and not self._monitor_thread:
             self._stop_monitor = False
             self._monitor_thread = threading.Thread(
                 target=self.stats_collector.start_collecting,
-                args=(lambda: self._stop_monitor,)
+                args=(lambda: self._stop_monitor, self._store_rollups)
             )
             self._monitor_thread.start()
             
+    def _store_rollups(self):
+        """取出新关闭的时间桶交给数据存储批量写入，避免时间桶在内存中累积到测试结束"""
+        if self.data_storage and self.data_storage.rollup_writer:
+            self.data_storage.store_rollups(self.performance_stats.drain_rollups())
+            
     def _stop_monitoring(self):
         """停止性能监控线程"""
         if self._monitor_thread:
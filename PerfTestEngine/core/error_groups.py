@@ -0,0 +1,226 @@
+"""错误分组模块
+
+按错误指纹对失败请求进行分组统计，包括：
+- 基于异常类型、状态码和模板化错误信息生成指纹
+- 每组计数及首次/最近出现时间
+- 每组固定数量的蓄水池采样示例
+- 分组数量上限，保证内存有界
+"""
+
+import hashlib
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+OVERFLOW_FINGERPRINT = '__other__'
+
+# 错误信息中的动态内容，按顺序替换为占位符
+_MESSAGE_PATTERNS = [
+    (re.compile(r'https?://[^\s\'"]+'), '<url>'),
+    (re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'), '<uuid>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b'), '<hex>'),
+    (re.compile(r'\b[0-9a-fA-F]{16,}\b'), '<hash>'),
+    (re.compile(r'\'[^\']*\'|"[^"]*"'), '<str>'),
+    (re.compile(r'\d+(\.\d+)?'), '<num>'),
+]
+
+def template_message(message: str, max_length: int = 200) -> str:
+    """将错误信息模板化，去除数字、UUID、URL、引号内容等动态部分
+
+    Args:
+        message: 原始错误信息
+        max_length: 模板最大长度
+
+    Returns:
+        str: 模板化后的错误信息
+    """
+    template = message or ''
+    for pattern, placeholder in _MESSAGE_PATTERNS:
+        template = pattern.sub(placeholder, template)
+    return template[:max_length]
+
+def error_fingerprint(error_type: str, status_code: Optional[int], message_template: str) -> str:
+    """生成错误指纹
+
+    Args:
+        error_type: 异常类型名称
+        status_code: 响应状态码
+        message_template: 模板化后的错误信息
+
+    Returns:
+        str: 错误指纹
+    """
+    raw = f'{error_type}|{status_code or ""}|{message_template}'
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()[:16]
+
+class ErrorGroup:
+    """单个错误分组"""
+
+    def __init__(self, fingerprint: str, error_type: str, status_code: Optional[int],
+                 message_template: str, sample_size: int):
+        self.fingerprint = fingerprint
+        self.error_type = error_type
+        self.status_code = status_code
+        self.message_template = message_template
+        self.sample_size = sample_size
+        self.count = 0
+        self.first_seen: Optional[float] = None
+        self.last_seen: Optional[float] = None
+        self.last_seq = 0
+        self.samples: List[Dict[str, Any]] = []
+
+    def record(self, timestamp: float, sample: Dict[str, Any], seq: int = 0) -> None:
+        """记录一次错误，按蓄水池算法保留 sample_size 条示例"""
+        self.count += 1
+        self.last_seq = seq
+        if self.first_seen is None:
+            self.first_seen = timestamp
+        self.last_seen = timestamp
+        if len(self.samples) < self.sample_size:
+            self.samples.append(sample)
+        else:
+            index = random.randrange(self.count)
+            if index < self.sample_size:
+                self.samples[index] = sample
+
+    def merge(self, data: Dict[str, Any], seq: int = 0) -> None:
+        """合并其他节点导出的同指纹分组，示例只补足到 sample_size 条"""
+        self.count += data['count']
+        self.last_seq = seq
+        if data['first_seen'] is not None and (self.first_seen is None or data['first_seen'] < self.first_seen):
+            self.first_seen = data['first_seen']
+        if data['last_seen'] is not None and (self.last_seen is None or data['last_seen'] > self.last_seen):
+            self.last_seen = data['last_seen']
+        for sample in data['examples'][:self.sample_size - len(self.samples)]:
+            self.samples.append(sample)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'fingerprint': self.fingerprint,
+            'error_type': self.error_type,
+            'status_code': self.status_code,
+            'message': self.message_template,
+            'count': self.count,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'seq': self.last_seq,
+            'examples': list(self.samples)
+        }
+
+class ErrorAggregator:
+    """错误分组聚合器
+
+    分组数量达到上限后，新指纹统一计入 __other__ 溢出分组。
+    """
+
+    def __init__(self, max_groups: int = 100, sample_size: int = 5):
+        """初始化错误分组聚合器
+
+        Args:
+            max_groups: 分组数量上限（不含溢出分组）
+            sample_size: 每组保留的示例数
+        """
+        self.max_groups = max_groups
+        self.sample_size = sample_size
+        self.groups: Dict[str, ErrorGroup] = {}
+        self.total = 0
+
+    def record(self, error_type: str, message: str = '', status_code: Optional[int] = None,
+               error_data: Optional[Dict[str, Any]] = None, timestamp: Optional[float] = None,
+               seq: int = 0) -> str:
+        """记录一次错误
+
+        Args:
+            error_type: 异常类型名称
+            message: 原始错误信息
+            status_code: 可选，响应状态码
+            error_data: 可选，错误详细信息，作为采样示例保存
+            timestamp: 可选，错误发生时间戳
+            seq: 可选，变更序号，用于增量查询
+
+        Returns:
+            str: 错误所属分组的指纹
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        message_template = template_message(message)
+        fingerprint = error_fingerprint(error_type, status_code, message_template)
+        group = self.groups.get(fingerprint)
+        if group is None:
+            if len(self.groups) >= self.max_groups:
+                fingerprint = OVERFLOW_FINGERPRINT
+                group = self.groups.get(fingerprint)
+                if group is None:
+                    group = self.groups[fingerprint] = ErrorGroup(
+                        fingerprint, 'Other', None, '超出分组上限的其他错误', self.sample_size
+                    )
+            else:
+                group = self.groups[fingerprint] = ErrorGroup(
+                    fingerprint, error_type, status_code, message_template, self.sample_size
+                )
+        sample = dict(error_data or {})
+        sample.setdefault('message', message)
+        sample.setdefault('timestamp', timestamp)
+        group.record(timestamp, sample, seq)
+        self.total += 1
+        return fingerprint
+
+    def merge(self, groups: List[Dict[str, Any]], seq: int = 0) -> None:
+        """合并其他聚合器 snapshot 导出的分组，用于汇总多个执行节点的错误
+
+        Args:
+            groups: snapshot 输出的分组列表
+            seq: 可选，变更序号，用于增量查询
+        """
+        for data in groups:
+            fingerprint = data['fingerprint']
+            group = self.groups.get(fingerprint)
+            if group is None:
+                if len(self.groups) >= self.max_groups and fingerprint != OVERFLOW_FINGERPRINT:
+                    fingerprint = OVERFLOW_FINGERPRINT
+                    group = self.groups.get(fingerprint)
+                if group is None:
+                    group = self.groups[fingerprint] = ErrorGroup(
+                        fingerprint, data['error_type'], data['status_code'], data['message'], self.sample_size
+                    )
+            group.merge(data, seq)
+            self.total += data['count']
+
+    def snapshot(self, since: Optional[float] = None, since_seq: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取错误分组统计
+
+        Args:
+            since: 可选，只返回最近出现时间晚于该时间戳的分组
+            since_seq: 可选，只返回变更序号大于该值的分组
+
+        Returns:
+            List[Dict]: 错误分组列表，按出现次数降序排列
+        """
+        groups = self.groups.values()
+        if since is not None:
+            groups = [group for group in groups if group.last_seen > since]
+        if since_seq is not None:
+            groups = [group for group in groups if group.last_seq > since_seq]
+        return [group.to_dict() for group in sorted(groups, key=lambda group: group.count, reverse=True)]
+
+    def to_error_records(self) -> List[Dict[str, Any]]:
+        """转换为 PerformanceError 记录所需的字段
+
+        Returns:
+            List[Dict]: 包含 timestamp、error_data、count 的字典列表
+        """
+        records = []
+        for group in self.snapshot():
+            records.append({
+                'timestamp': int(group['first_seen']),
+                'count': group['count'],
+                'error_data': {
+                    'fingerprint': group['fingerprint'],
+                    'error_type': group['error_type'],
+                    'status_code': group['status_code'],
+                    'error_message': group['message'],
+                    'last_seen': group['last_seen'],
+                    'examples': group['examples']
+                }
+            })
+        return records
@@ -0,0 +1,263 @@
+"""压测机自身负载监控模块
+
+采集压测进程自身的负载指标，用于判断压测机是否成为瓶颈，包括：
+- 进程CPU使用率（按单核计算，gevent只使用一个核心）
+- 事件循环调度延迟：探针greenlet周期休眠，实际唤醒时间与预期的差值
+- 打开的socket数和文件描述符使用率
+- 进程内存占用
+指标持续超过阈值时给出告警标记，表示期间的响应时间可能包含压测机自身的排队延迟。
+"""
+
+import os
+import time
+from typing import Callable, Dict, List, Optional
+import gevent
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# 默认告警阈值
+DEFAULT_THRESHOLDS = {
+    'cpu_percent': 90.0,     # 进程CPU使用率(%)
+    'loop_lag': 50.0,        # 平均事件循环延迟(ms)
+    'fd_usage': 0.9,         # 文件描述符使用率
+    'memory_percent': 90.0,  # 进程内存占物理内存比例(%)
+}
+
+# 默认允许的告警时长占比，超过该比例时测量结果视为无效
+DEFAULT_BOTTLENECK_TOLERANCE = 0.05
+
+# 告警标记对应的指标
+WARNING_FLAGS = {
+    'cpu_saturated': 'cpu_percent',
+    'event_loop_lag': 'loop_lag',
+    'fd_exhaustion': 'fd_usage',
+    'memory_pressure': 'memory_percent',
+}
+
+class LoadProbe:
+    """压测进程负载探针
+
+    CPU使用率由两次采样间的进程CPU时间与墙钟时间之比得出；事件循环延迟由后台greenlet
+    每 interval 秒休眠一次测得，greenlet被其他任务阻塞越久，唤醒越晚。
+    每次 sample 返回上次采样以来窗口内的数据。
+    """
+
+    def __init__(self, interval: float = 0.1):
+        """初始化负载探针
+
+        Args:
+            interval: 事件循环延迟探测间隔(秒)
+        """
+        self.interval = interval
+        self._greenlet: Optional[gevent.Greenlet] = None
+        self._last_cpu = time.process_time()
+        self._last_wall = time.perf_counter()
+        self._lag_total = 0.0
+        self._lag_count = 0
+        self._lag_max = 0.0
+
+    def start(self) -> None:
+        """启动事件循环延迟探测"""
+        if self._greenlet is None:
+            self._last_cpu = time.process_time()
+            self._last_wall = time.perf_counter()
+            self._greenlet = gevent.spawn(self._measure_lag)
+
+    def stop(self) -> None:
+        """停止事件循环延迟探测"""
+        if self._greenlet is not None:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+
+    def _measure_lag(self) -> None:
+        while True:
+            start = time.perf_counter()
+            gevent.sleep(self.interval)
+            lag = max(time.perf_counter() - start - self.interval, 0) * 1000
+            self._lag_total += lag
+            self._lag_count += 1
+            if lag > self._lag_max:
+                self._lag_max = lag
+
+    def sample(self) -> Dict[str, float]:
+        """采样并重置窗口
+
+        Returns:
+            Dict: cpu_percent（进程CPU使用率%）、loop_lag（平均事件循环延迟ms）、
+                loop_lag_max（最大事件循环延迟ms）
+        """
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        elapsed = wall - self._last_wall
+        cpu_percent = (cpu - self._last_cpu) / elapsed * 100 if elapsed > 0 else 0.0
+        self._last_cpu = cpu
+        self._last_wall = wall
+
+        loop_lag = self._lag_total / self._lag_count if self._lag_count else 0.0
+        loop_lag_max = self._lag_max
+        self._lag_total = 0.0
+        self._lag_count = 0
+        self._lag_max = 0.0
+        return {
+            'cpu_percent': round(cpu_percent, 1),
+            'loop_lag': round(loop_lag, 2),
+            'loop_lag_max': round(loop_lag_max, 2)
+        }
+
+def _count_open_files() -> Dict[str, Optional[int]]:
+    """统计打开的文件描述符和socket数，不支持 /proc 的平台返回None
+
+    socket数取自 /proc/self/net/sockstat 的已用socket总数（所在网络命名空间范围），
+    避免每次采样对所有文件描述符做 readlink
+    """
+    try:
+        open_fds = len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return {'open_fds': None, 'open_sockets': None}
+    open_sockets = None
+    try:
+        with open('/proc/self/net/sockstat') as f:
+            for line in f:
+                if line.startswith('sockets:'):
+                    fields = line.split()
+                    open_sockets = int(fields[fields.index('used') + 1])
+                    break
+    except (OSError, ValueError, IndexError):
+        pass
+    return {'open_fds': open_fds, 'open_sockets': open_sockets}
+
+def _memory_rss() -> Optional[int]:
+    """进程常驻内存(字节)，不支持 /proc 的平台退回峰值常驻内存"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return None
+
+class StatsCollector:
+    """压测机自身负载监控
+
+    由引擎的监控线程调用 start_collecting 周期采样，也可以在上报时直接调用 collect。
+    指标连续 sustain 次超过阈值时标记告警，告警期间的采样时长累计为 bottleneck_seconds。
+    """
+
+    def __init__(self, env=None, interval: float = 1.0, thresholds: Optional[Dict] = None,
+                 sustain: int = 3):
+        """初始化负载监控
+
+        Args:
+            env: 可选，Locust测试环境实例，用于记录采样时的用户数
+            interval: 采样间隔(秒)
+            thresholds: 可选，告警阈值，覆盖 DEFAULT_THRESHOLDS 中的同名项
+            sustain: 连续超过阈值多少次后标记告警
+        """
+        self.env = env
+        self.interval = interval
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self.sustain = sustain
+        self.probe = LoadProbe()
+        self.fd_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0] if resource is not None else None
+        try:
+            self.memory_total = os.sysconf('SC_PHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+        except (ValueError, OSError, AttributeError):
+            self.memory_total = None
+        self.latest: Dict = {}
+        self.warning_events: List[Dict] = []
+        self.bottleneck_seconds = 0.0
+        self._exceeded = {flag: 0 for flag in WARNING_FLAGS}
+        self._active: List[str] = []
+        self._last_collect = None
+
+    def start(self) -> None:
+        """启动事件循环延迟探测"""
+        self.probe.start()
+        self._last_collect = time.time()
+
+    def stop(self) -> None:
+        """停止事件循环延迟探测"""
+        self.probe.stop()
+
+    def start_collecting(self, should_stop: Callable[[], bool],
+                         on_collect: Optional[Callable[[], None]] = None) -> None:
+        """周期采样，直到 should_stop 返回True
+
+        Args:
+            should_stop: 返回是否停止采样的函数
+            on_collect: 可选，每次采样后调用，用于执行其他周期任务
+        """
+        self.start()
+        try:
+            while not should_stop():
+                time.sleep(self.interval)
+                self.collect()
+                if on_collect:
+                    on_collect()
+        finally:
+            self.stop()
+
+    def collect(self) -> Dict:
+        """采样一次负载指标并更新告警标记
+
+        Returns:
+            Dict: 采样结果，见 get_stats
+        """
+        now = time.time()
+        sample = self.probe.sample()
+        sample.update(_count_open_files())
+        memory_rss = _memory_rss()
+        sample['memory_rss'] = memory_rss
+        sample['fd_usage'] = (
+            round(sample['open_fds'] / self.fd_limit, 3)
+            if sample['open_fds'] is not None and self.fd_limit and self.fd_limit > 0 else None
+        )
+        sample['memory_percent'] = (
+            round(memory_rss / self.memory_total * 100, 1)
+            if memory_rss and self.memory_total else None
+        )
+        if self.env is not None and self.env.runner is not None:
+            sample['user_count'] = self.env.runner.user_count
+
+        active = []
+        for flag, metric in WARNING_FLAGS.items():
+            value = sample.get(metric)
+            if value is not None and value >= self.thresholds[metric]:
+                self._exceeded[flag] += 1
+            else:
+                self._exceeded[flag] = 0
+            if self._exceeded[flag] >= self.sustain:
+                active.append(flag)
+                if flag not in self._active:
+                    self.warning_events.append({'flag': flag, 'time': now, 'value': value})
+                    del self.warning_events[:-100]
+        if active and self._last_collect is not None:
+            self.bottleneck_seconds += now - self._last_collect
+        self._active = active
+        self._last_collect = now
+
+        sample['timestamp'] = now
+        self.latest = sample
+        return self.get_stats()
+
+    def get_stats(self) -> Dict:
+        """获取最近一次采样结果和告警标记
+
+        Returns:
+            Dict: 最近一次采样的指标，以及：
+                - warnings: 当前生效的告警标记
+                - generator_bottleneck: 压测机当前是否是瓶颈
+                - bottleneck_seconds: 累计处于告警状态的时长(秒)
+                - warning_events: 告警开始事件
+        """
+        return dict(
+            self.latest,
+            warnings=list(self._active),
+            generator_bottleneck=bool(self._active),
+            bottleneck_seconds=round(self.bottleneck_seconds, 1),
+            warning_events=list(self.warning_events)
+        )
@@ -0,0 +1,216 @@
+"""延迟直方图模块
+
+提供固定内存、可合并的对数分桶直方图，包括：
+- O(1) 记录响应时间
+- O(桶数) 查询任意百分位
+- 可配置的相对精度
+- 多个直方图合并与序列化
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional
+
+class LatencyHistogram:
+    """对数分桶延迟直方图
+
+    第 i 个桶覆盖 [min_value * base^i, min_value * base^(i+1))，base = 1 + 2 * precision，
+    百分位取桶的几何中点，相对误差不超过 precision。
+    小于 min_value 的值计入第0个桶，大于 max_value 的值计入最后一个桶，
+    最小值、最大值、总数和总和精确记录。
+    """
+
+    def __init__(self, precision: float = 0.01, min_value: float = 0.01, max_value: float = 3600000):
+        """初始化直方图
+
+        Args:
+            precision: 百分位相对误差，默认1%
+            min_value: 可区分的最小值（毫秒）
+            max_value: 可区分的最大值（毫秒），默认1小时
+        """
+        if not 0 < precision < 1:
+            raise ValueError('直方图精度必须在0到1之间')
+        if not 0 < min_value < max_value:
+            raise ValueError('直方图取值范围无效')
+        self.precision = precision
+        self.min_value = min_value
+        self.max_value = max_value
+        self._log_base = math.log(1 + 2 * precision)
+        self.bucket_count = int(math.log(max_value / min_value) / self._log_base) + 1
+        self.counts: List[int] = [0] * self.bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _bucket_index(self, value: float) -> int:
+        """计算值所在的桶下标"""
+        if value <= self.min_value:
+            return 0
+        index = int(math.log(value / self.min_value) / self._log_base)
+        return min(index, self.bucket_count - 1)
+
+    def _bucket_value(self, index: int) -> float:
+        """获取桶的代表值（几何中点）"""
+        return self.min_value * math.exp((index + 0.5) * self._log_base)
+
+    def record(self, value: float, count: int = 1) -> None:
+        """记录一个值
+
+        Args:
+            value: 响应时间（毫秒）
+            count: 记录次数
+        """
+        self.counts[self._bucket_index(value)] += count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        """平均值"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """查询百分位值
+
+        Args:
+            percent: 百分位，取值0到100
+
+        Returns:
+            float: 百分位对应的值，无数据时返回0
+        """
+        if not self.count:
+            return 0.0
+        if percent <= 0:
+            return self.min
+        if percent >= 100:
+            return self.max
+        rank = math.ceil(self.count * percent / 100)
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                # 代表值限制在精确记录的最小/最大值之间
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def percentiles(self, percents: Iterable[float]) -> Dict[float, float]:
+        """一次遍历查询多个百分位值
+
+        Args:
+            percents: 百分位列表，取值0到100
+
+        Returns:
+            Dict[float, float]: 百分位到值的映射
+        """
+        targets = sorted(percents)
+        result = {}
+        if not self.count:
+            return {percent: 0.0 for percent in targets}
+        position = 0
+        seen = 0
+        for percent in targets:
+            if percent <= 0:
+                result[percent] = self.min
+                continue
+            if percent >= 100:
+                result[percent] = self.max
+                continue
+            rank = math.ceil(self.count * percent / 100)
+            while position < self.bucket_count and seen + self.counts[position] < rank:
+                seen += self.counts[position]
+                position += 1
+            index = min(position, self.bucket_count - 1)
+            result[percent] = min(max(self._bucket_value(index), self.min), self.max)
+        return result
+
+    def _check_compatible(self, other: 'LatencyHistogram') -> None:
+        if (other.precision, other.min_value, other.max_value) != (self.precision, self.min_value, self.max_value):
+            raise ValueError('直方图配置不一致，无法合并')
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        """合并另一个相同配置的直方图
+
+        Args:
+            other: 待合并的直方图
+        """
+        self._check_compatible(other)
+        if not other.count:
+            return
+        counts = self.counts
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def summary(self, percents: Iterable[float] = (50, 90, 95, 99)) -> Dict[str, float]:
+        """生成响应时间统计摘要
+
+        Args:
+            percents: 需要输出的百分位列表
+
+        Returns:
+            Dict[str, float]: 包含min/max/avg/median及pXX的统计字典
+        """
+        values = self.percentiles(set(percents) | {50})
+        summary = {
+            'min': self.min or 0.0,
+            'max': self.max or 0.0,
+            'avg': self.mean,
+            'median': values[50]
+        }
+        for percent in percents:
+            summary[f'p{percent:g}'] = values[percent]
+        return summary
+
+    def to_dict(self) -> Dict:
+        """序列化为稀疏字典，只保留非空桶"""
+        return {
+            'precision': self.precision,
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'buckets': {str(index): count for index, count in enumerate(self.counts) if count}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        """从稀疏字典还原直方图
+
+        Args:
+            data: to_dict 生成的字典
+
+        Returns:
+            LatencyHistogram: 直方图实例
+        """
+        histogram = cls(data['precision'], data['min_value'], data['max_value'])
+        for index, count in data['buckets'].items():
+            histogram.counts[int(index)] = count
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+    def copy(self) -> 'LatencyHistogram':
+        """复制直方图"""
+        histogram = LatencyHistogram(self.precision, self.min_value, self.max_value)
+        histogram.merge(self)
+        return histogram
+
+    def reset(self) -> None:
+        """清空所有记录"""
+        self.counts = [0] * self.bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
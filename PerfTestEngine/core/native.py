@@ -0,0 +1,81 @@
+"""原生线程工具模块
+
+导入Locust时会对标准库执行gevent猴子补丁：threading.Thread 启动的是greenlet，线程锁换成了gevent锁，
+socket和 time.sleep 变为协作式。在greenlet中执行阻塞的C调用（mysqlclient查询、multiprocessing
+连接的 os.read 等）会阻塞整个事件循环，压测用户的请求随之排队，延迟计入测量结果。
+
+本模块提供未被补丁替换的原生线程、锁、socket和休眠，用于后台阻塞任务。使用约定：
+- 原生线程中不使用gevent对象（gevent锁、Event、协作式socket等）
+- 原生线程与事件循环之间只通过原生锁、简单标志位以及 LoopCaller 通信
+- 事件循环线程持有原生锁的时间必须很短
+"""
+
+import importlib
+import time
+from typing import Callable, Optional
+
+try:
+    import gevent
+    from gevent import monkey
+except ImportError:
+    gevent = None
+    monkey = None
+
+def get_original(module: str, name: str):
+    """获取未被gevent猴子补丁替换的标准库对象"""
+    if monkey is not None:
+        return monkey.get_original(module, name)
+    return getattr(importlib.import_module(module), name)
+
+start_new_thread = get_original('_thread', 'start_new_thread')
+get_ident = get_original('_thread', 'get_ident')
+allocate_lock = get_original('_thread', 'allocate_lock')
+sleep = get_original('time', 'sleep')
+NativeSocket = get_original('socket', 'socket')
+
+class NativeThread:
+    """原生线程，提供与 threading.Thread 一致的 start/join/is_alive 接口
+
+    线程随进程退出，相当于守护线程。
+    """
+
+    def __init__(self, target: Callable, args: tuple = (), name: Optional[str] = None):
+        self.target = target
+        self.args = args
+        self.name = name
+        self._started = False
+        self._finished = False
+
+    def start(self) -> None:
+        self._started = True
+        start_new_thread(self._run, ())
+
+    def _run(self) -> None:
+        try:
+            self.target(*self.args)
+        finally:
+            self._finished = True
+
+    def is_alive(self) -> bool:
+        return self._started and not self._finished
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """等待线程结束，在事件循环线程中调用时以协作式休眠轮询，不阻塞事件循环"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.is_alive() and (deadline is None or time.time() < deadline):
+            time.sleep(0.05)
+
+class LoopCaller:
+    """将原生线程中的调用转交给事件循环线程执行
+
+    在事件循环线程中创建；未使用gevent时直接在调用线程中执行。
+    """
+
+    def __init__(self):
+        self._loop = gevent.get_hub().loop if gevent is not None else None
+
+    def __call__(self, func: Callable, *args) -> None:
+        if self._loop is None:
+            func(*args)
+        else:
+            self._loop.run_callback_threadsafe(func, *args)
@@ -1,59 +1,114 @@
 import time
 import statistics
-from collections import defaultdict
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
+from .histogram import LatencyHistogram
+from .throughput import SlidingWindowCounter
+from .rollup import RollupAggregator
+from .breakdown import StatsBreakdown
+from .error_groups import ErrorAggregator
 
 class PerformanceStatsCollector:
     """性能测试数据收集器
     用于收集和统计性能测试过程中的各项指标，包括响应时间、错误率、系统资源使用等。
-    支持数据分片存储和聚合分析。
+    支持数据分片存储和聚合分析。响应时间记录在固定内存的对数分桶直方图中。
     """
-    def __init__(self, shard_key: str = 'default', aggregation_period: str = '1s'):
+    def __init__(self, shard_key: str = 'default', aggregation_period: str = '1s',
+                 histogram_precision: float = 0.01, percentiles: Tuple[float, ...] = (50, 90, 95, 99),
+                 rollup_periods: Tuple[str, ...] = ('1s', '10s', '1m'), max_breakdown_entries: int = 200):
+        """
+        Args:
+            shard_key: 数据分片键
+            aggregation_period: 聚合周期，趋势数据默认使用该周期的时间桶
+            histogram_precision: 响应时间百分位的相对误差
+            percentiles: get_statistics 输出的百分位列表
+            rollup_periods: 额外维护的时间桶聚合周期
+            max_breakdown_entries: 分接口统计项数量上限
+        """
         self.start_time = time.time()
+        # 变更序号，每次记录请求或关闭时间桶时递增，用于增量查询游标
+        self.sequence = 0
         self.total_requests = 0
         self.failed_requests = 0
-        self.response_times: List[float] = []
-        self.errors: Dict[str, Dict] = defaultdict(lambda: {'count': 0, 'data': []})
+        self.histogram_precision = histogram_precision
+        self.percentiles = percentiles
+        self.response_time_histogram = LatencyHistogram(precision=histogram_precision)
+        # 错误按指纹分组，每组只保留固定数量的采样示例
+        self.error_groups = ErrorAggregator(max_groups=100, sample_size=5)
         self.current_users = 0
         self.rps_data: List[float] = []
         self.cpu_usage: List[float] = []
         self.memory_usage: List[float] = []
         self.network_io: List[float] = []
         self._last_request_time = time.time()
-        self._request_count_window: List[float] = []
         self._window_size = 10  # 10秒滑动窗口
+        self._throughput = SlidingWindowCounter(window_size=self._window_size, resolution=1.0)
         self.shard_key = shard_key
         self.aggregation_period = aggregation_period
+        self.rollup_periods = rollup_periods
+        self.rollups = RollupAggregator(
+            periods=(aggregation_period,) + tuple(rollup_periods),
+            shard_key=shard_key,
+            precision=histogram_precision,
+            percentiles=percentiles,
+            sequence=self._next_sequence
+        )
+        self.max_breakdown_entries = max_breakdown_entries
+        self.breakdown = StatsBreakdown(max_entries=max_breakdown_entries)
+        # 分布式执行时各执行节点最近一次上报的累计快照
+        self._node_snapshots: Dict[str, Dict] = {}
+        self._nodes_dirty = False
 
     def record_request(self, response_time: float, is_success: bool,
-                      error_type: Optional[str] = None, error_data: Optional[Dict] = None) -> None:
+                      error_type: Optional[str] = None, error_data: Optional[Dict] = None,
+                      response_length: int = 0, name: Optional[str] = None, method: str = '') -> None:
         """记录请求数据
         Args:
             response_time: 响应时间（毫秒）
             is_success: 是否成功
             error_type: 错误类型（如果失败）
             error_data: 错误详细信息（如果失败）
+            response_length: 响应字节数
+            name: 请求名称（接口 / 业务流步骤），用于分接口统计
+            method: 请求方法或请求类型
         """
         self.total_requests += 1
         current_time = time.time()
+        seq = self._next_sequence()
         
         # 更新RPS计算窗口
-        self._request_count_window.append(current_time)
-        while self._request_count_window and \
-              current_time - self._request_count_window[0] > self._window_size:
-            self._request_count_window.pop(0)
+        self._throughput.record(now=current_time)
+        
+        # 更新时间桶聚合
+        self.rollups.record(current_time, response_time, is_success, response_length, self.current_users)
+        
+        # 更新分接口统计
+        if name is not None:
+            self.breakdown.record(method, name, response_time, is_success, response_length, seq)
         
         if is_success:
-            self.response_times.append(response_time)
+            self.response_time_histogram.record(response_time)
         else:
             self.failed_requests += 1
             if error_type:
-                self.errors[error_type]['count'] += 1
-                if error_data:
-                    self.errors[error_type]['data'].append(error_data)
+                error_data = error_data or {}
+                self.error_groups.record(
+                    error_type,
+                    message=error_data.get('message', ''),
+                    status_code=error_data.get('status_code'),
+                    error_data=error_data,
+                    timestamp=current_time,
+                    seq=seq
+                )
+
+    def _next_sequence(self) -> int:
+        """生成下一个变更序号"""
+        self.sequence += 1
+        return self.sequence
 
     def update_concurrent_users(self, count: int) -> None:
         """更新当前并发用户数"""
+        if count != self.current_users:
+            self._next_sequence()
         self.current_users = count
 
     def record_system_metrics(self, cpu: float, memory: float) -> None:
@@ -67,34 +122,190 @@ class PerformanceStatsCollector:
 
     def get_current_rps(self) -> float:
         """获取当前每秒请求数（RPS）"""
-        if not self._request_count_window:
-            return 0.0
-        window_duration = time.time() - self._request_count_window[0]
-        if window_duration <= 0:
-            return 0.0
-        return len(self._request_count_window) / min(window_duration, self._window_size)
+        return self._throughput.rate()
+
+    def get_rps_moving_average(self, seconds: float) -> float:
+        """获取最近 seconds 秒（不超过滑动窗口长度）的平均RPS"""
+        return self._throughput.moving_average(seconds)
+
+    def get_throughput_series(self) -> List[Tuple[float, float]]:
+        """获取滑动窗口内每秒吞吐量序列
+        Returns:
+            (时间戳, RPS) 列表，按时间升序
+        """
+        return self._throughput.series()
+
+    def get_response_time_percentile(self, percent: float) -> float:
+        """获取任意响应时间百分位
+        Args:
+            percent: 百分位，取值0到100
+        """
+        self._sync_nodes()
+        return self.response_time_histogram.percentile(percent)
+
+    def get_rollups(self, period: Optional[str] = None, since: Optional[int] = None) -> List[Dict]:
+        """获取已关闭的时间桶聚合数据，用于趋势图
+        Args:
+            period: 聚合周期，默认为 aggregation_period
+            since: 可选，只返回起始时间戳大于该值的时间桶
+        """
+        self.rollups.advance(time.time())
+        return self.rollups.get_history(period or self.aggregation_period, since)
+
+    def drain_rollups(self) -> List[Dict]:
+        """取出新关闭的时间桶，每个时间桶只返回一次，用于写入PerformanceMetrics"""
+        self.rollups.advance(time.time())
+        return self.rollups.drain()
+
+    def flush_rollups(self) -> List[Dict]:
+        """关闭所有开放的时间桶并取出未消费的结果，测试结束时用于写入PerformanceMetrics"""
+        return self.rollups.flush()
+
+    def get_breakdown(self, limit: Optional[int] = None) -> List[Dict]:
+        """获取分接口统计数据
+        Args:
+            limit: 可选，只返回请求数最多的前 limit 项
+        """
+        self._sync_nodes()
+        return self.breakdown.snapshot(self.percentiles, limit)
+
+    def get_error_groups(self, since: Optional[float] = None) -> List[Dict]:
+        """获取按指纹分组的错误统计
+        Args:
+            since: 可选，只返回最近出现时间晚于该时间戳的分组
+        """
+        self._sync_nodes()
+        return self.error_groups.snapshot(since)
+
+    def get_error_records(self) -> List[Dict]:
+        """获取用于写入 PerformanceError 的错误分组记录"""
+        self._sync_nodes()
+        return self.error_groups.to_error_records()
+
+    def to_snapshot(self) -> Dict:
+        """导出统计快照，执行节点定期上报给协调节点
+
+        计数、直方图、错误分组和分接口统计为累计值，时间桶为上次导出后新关闭的部分。
+        """
+        return {
+            "total_requests": self.total_requests,
+            "failed_requests": self.failed_requests,
+            "current_users": self.current_users,
+            "histogram": self.response_time_histogram.to_dict(),
+            "error_groups": self.error_groups.snapshot(),
+            "breakdown": self.breakdown.export(),
+            "rollups": self.drain_rollups()
+        }
+
+    def merge_node_snapshot(self, node: str, snapshot: Dict) -> None:
+        """合并执行节点上报的统计快照，协调节点使用
+
+        时间桶立即合并，累计数据保存后在读取时统一重新汇总。
+        Args:
+            node: 执行节点名称
+            snapshot: to_snapshot 输出的快照
+        """
+        previous = self._node_snapshots.get(node)
+        delta = snapshot["total_requests"] - (previous["total_requests"] if previous else 0)
+        if delta > 0:
+            self._throughput.record(delta)
+        for bucket in snapshot.get("rollups", ()):
+            self.rollups.merge(bucket)
+        self._node_snapshots[node] = snapshot
+        self._nodes_dirty = True
+
+    def _sync_nodes(self) -> None:
+        """按各执行节点的累计快照重新汇总统计数据，未变化的统计项保留原变更序号"""
+        if not self._nodes_dirty:
+            return
+        self._nodes_dirty = False
+        snapshots = list(self._node_snapshots.values())
+        total_requests = sum(snapshot["total_requests"] for snapshot in snapshots)
+        if total_requests != self.total_requests:
+            self._next_sequence()
+        self.total_requests = total_requests
+        self.failed_requests = sum(snapshot["failed_requests"] for snapshot in snapshots)
+        self.update_concurrent_users(sum(snapshot["current_users"] for snapshot in snapshots))
+
+        histogram = LatencyHistogram(precision=self.histogram_precision)
+        for snapshot in snapshots:
+            histogram.merge(LatencyHistogram.from_dict(snapshot["histogram"]))
+        self.response_time_histogram = histogram
+
+        seq = self.sequence + 1
+        error_groups = ErrorAggregator(self.error_groups.max_groups, self.error_groups.sample_size)
+        breakdown = StatsBreakdown(max_entries=self.max_breakdown_entries)
+        for snapshot in snapshots:
+            error_groups.merge(snapshot["error_groups"], seq)
+            breakdown.merge(snapshot["breakdown"], seq)
+        changed = False
+        for key, group in error_groups.groups.items():
+            old = self.error_groups.groups.get(key)
+            if old is not None and old.count == group.count:
+                group.last_seq = old.last_seq
+            else:
+                changed = True
+        for key, entry in breakdown.entries.items():
+            old = self.breakdown.entries.get(key)
+            if old is not None and old.count == entry.count:
+                entry.last_seq = old.last_seq
+            else:
+                changed = True
+        if changed:
+            self._next_sequence()
+        self.error_groups = error_groups
+        self.breakdown = breakdown
+
+    def get_delta(self, since: int = 0) -> Dict:
+        """获取指定序号之后的增量统计数据
+
+        只返回新关闭的时间桶、有变化的错误分组和分接口统计项，以及发生变化时的汇总计数，
+        调用方保存返回的 sequence 作为下一次查询的游标。
+        游标大于当前序号说明统计已被重置，此时返回全量数据并标记 reset。
+
+        Args:
+            since: 上一次查询返回的 sequence，首次查询传0
+        """
+        self._sync_nodes()
+        self.rollups.advance(time.time())
+        reset = since > self.sequence
+        if reset:
+            since = 0
+        delta = {
+            "sequence": self.sequence,
+            "reset": reset,
+            "rollups": self.rollups.get_history(self.aggregation_period, since_seq=since),
+            "error_groups": self.error_groups.snapshot(since_seq=since),
+            "breakdown": self.breakdown.snapshot(self.percentiles, since_seq=since)
+        }
+        if self.sequence > since:
+            delta["counters"] = {
+                "total_requests": self.total_requests,
+                "failed_requests": self.failed_requests,
+                "current_users": self.current_users,
+                "current_rps": self.get_current_rps(),
+                "response_time": self.response_time_histogram.summary(self.percentiles)
+                if self.response_time_histogram.count else {}
+            }
+        return delta
 
     def get_statistics(self) -> Dict[str, Union[float, int, Dict]]:
         """获取性能测试统计数据"""
+        self._sync_nodes()
         stats = {
             "total_requests": self.total_requests,
             "failed_requests": self.failed_requests,
             "current_users": self.current_users,
             "current_rps": self.get_current_rps(),
-            "error_types": dict(self.errors),
+            "throughput_series": self.get_throughput_series(),
+            "error_types": self.get_error_groups(),
+            "breakdown": self.get_breakdown(),
             "duration": time.time() - self.start_time
         }
 
         # 响应时间统计
-        if self.response_times:
-            stats["response_time"] = {
-                "min": min(self.response_times),
-                "max": max(self.response_times),
-                "avg": statistics.mean(self.response_times),
-                "median": statistics.median(self.response_times),
-                "p95": statistics.quantiles(self.response_times, n=20)[18],  # 95th percentile
-                "p99": statistics.quantiles(self.response_times, n=100)[98]  # 99th percentile
-            }
+        if self.response_time_histogram.count:
+            stats["response_time"] = self.response_time_histogram.summary(self.percentiles)
 
         # 系统资源使用统计
         if self.cpu_usage:
@@ -112,5 +323,7 @@ class PerformanceStatsCollector:
         return stats
 
     def reset(self) -> None:
-        """重置所有统计数据"""
-        self.__init__()
\ No newline at end of file
+        """重置所有统计数据，保留分片和直方图配置"""
+        self.__init__(self.shard_key, self.aggregation_period,
+                      self.histogram_precision, self.percentiles, self.rollup_periods,
+                      self.max_breakdown_entries)
\ No newline at end of file
@@ -5,10 +5,37 @@
 - 测试流程管理
 - 变量处理
 - 数据验证
+- 请求模板预编译
 """
 
+from types import CodeType
 from typing import Dict, List, Optional
 from collections import OrderedDict
+from functools import lru_cache
+from .request_template import RequestTemplate
+from .scheduler import AliasTable
+
+@lru_cache(maxsize=256)
+def compile_script(script: str) -> Optional[CodeType]:
+    """编译前置/后置脚本
+    
+    相同脚本内容只编译一次，最多缓存256个脚本，空脚本返回None。
+    
+    Args:
+        script: 脚本内容
+        
+    Returns:
+        CodeType: 编译后的代码对象
+        
+    Raises:
+        ValueError: 脚本存在语法错误时抛出
+    """
+    if not script or not script.strip():
+        return None
+    try:
+        return compile(script, '<perf_script>', 'exec')
+    except SyntaxError as e:
+        raise ValueError(f'脚本语法错误: {str(e)}')
 
 class TestPlan:
     """测试计划类
@@ -29,6 +56,8 @@ class TestPlan:
         self.description = plan_data.get('description', '')
         self.variables = plan_data.get('variables', {})
         self.flows = self._parse_flows(plan_data.get('flows', []))
+        # 按流程权重预构建别名表，供测试用户O(1)加权选择流程
+        self.flow_table = AliasTable([flow['weight'] for flow in self.flows]) if self.flows else None
         
     def _parse_flows(self, flows_data: List[Dict]) -> List[Dict]:
         """解析测试流程配置
@@ -47,18 +76,46 @@ class TestPlan:
                 'think_time': flow.get('think_time', 0),
                 'setup_script': flow.get('setup_script', ''),
                 'teardown_script': flow.get('teardown_script', ''),
-                'requests': self._parse_requests(flow.get('requests', [])),
-                'variables': flow.get('variables', {})
+                'setup_code': compile_script(flow.get('setup_script', '')),
+                'teardown_code': compile_script(flow.get('teardown_script', '')),
+                'requests': self._parse_requests(self._get_flow_steps(flow)),
+                'variables': flow.get('variables', {}),
+                # 单接口流程的请求模板，加载计划时编译一次
+                'template': RequestTemplate({
+                    'interface': flow.get('interface', {}),
+                    'headers': flow.get('headers', {}),
+                    'request': flow.get('request', {})
+                })
             }
             parsed_flows.append(parsed_flow)
         return parsed_flows
     
+    def _get_flow_steps(self, flow: Dict) -> List[Dict]:
+        """获取流程的有序步骤列表
+        
+        兼容 requests 列表、业务流 steps 列表，以及只包含单个 request 的流程。
+        
+        Args:
+            flow: 原始流程配置数据
+            
+        Returns:
+            原始步骤配置列表
+        """
+        steps = flow.get('requests') or flow.get('steps')
+        if steps:
+            return steps
+        request = flow.get('request')
+        if isinstance(request, dict) and 'path' in request:
+            return [{'name': flow.get('name', ''), 'request': request}]
+        return []
+    
     def _parse_requests(self, requests_data: List[Dict]) -> List[Dict]:
         """解析请求配置
         
-        支持两种数据格式：
+        支持三种数据格式：
         1. 性能测试原生格式
         2. 接口用例格式
+        3. 业务流步骤格式（PerfTestEngine.tasks 生成）
         
         Args:
             requests_data: 原始请求配置数据
@@ -86,6 +143,26 @@ class TestPlan:
                     'extract': req.get('extract', {}),
                     'validate': req.get('validate', [])
                 }
+            elif isinstance(req.get('request'), dict) and 'path' in req['request']:
+                # 业务流步骤格式，data 来源于用例的 json 请求体
+                request = req['request']
+                parsed_req = {
+                    'name': req.get('name', ''),
+                    'url': request.get('path', ''),
+                    'method': request.get('method', 'GET'),
+                    'headers': request.get('headers', {}),
+                    'params': request.get('params', {}),
+                    'data': {},
+                    'json': request.get('data', {}),
+                    'files': {},
+                    'timeout': req.get('timeout', 30),
+                    'allow_redirects': req.get('allow_redirects', True),
+                    'verify': req.get('verify', True),
+                    'setup_script': req.get('setup_script', ''),
+                    'teardown_script': req.get('teardown_script', ''),
+                    'extract': request.get('extract', {}),
+                    'validate': request.get('validate', [])
+                }
             else:
                 # 原生性能测试格式
                 parsed_req = {
@@ -105,9 +182,39 @@ class TestPlan:
                     'extract': req.get('extract', {}),
                     'validate': req.get('validate', [])
                 }
+            parsed_req['template'] = self._compile_request(parsed_req)
+            parsed_req['setup_code'] = compile_script(parsed_req['setup_script'])
+            parsed_req['teardown_code'] = compile_script(parsed_req['teardown_script'])
             parsed_requests.append(parsed_req)
         return parsed_requests
     
+    def _compile_request(self, parsed_req: Dict) -> RequestTemplate:
+        """编译请求模板
+        
+        统一编译为 interface/headers/request 结构，与单接口流程模板一致，
+        空的 params/data/json/files 不参与请求。
+        
+        Args:
+            parsed_req: 解析后的请求配置
+            
+        Returns:
+            RequestTemplate: 请求模板
+        """
+        request = {
+            'timeout': parsed_req['timeout'],
+            'allow_redirects': parsed_req['allow_redirects'],
+            'verify': parsed_req['verify']
+        }
+        for field in ('params', 'data', 'json', 'files'):
+            if parsed_req.get(field):
+                request[field] = parsed_req[field]
+        request.update(parsed_req.get('request') or {})
+        return RequestTemplate({
+            'interface': {'url': parsed_req['url'], 'method': parsed_req['method']},
+            'headers': parsed_req['headers'],
+            'request': request
+        })
+    
     def get_flow_by_name(self, name: str) -> Optional[Dict]:
         """根据名称获取流程配置
         
@@ -12,6 +12,7 @@
 from typing import Dict, List, Optional
 from datetime import datetime
 from .data_storage import PerformanceDataStorage
+from .health import DEFAULT_BOTTLENECK_TOLERANCE
 
 class ReportGenerator:
     """测试报告生成器"""
@@ -67,10 +68,23 @@ class ReportGenerator:
     def update_error_stats(self, errors: List[Dict]):
         """更新错误统计数据
         
+        支持两种数据：单条错误记录（每条计数加1），以及带 fingerprint 的错误分组
+        （PerformanceStatsCollector.get_error_groups 的结果，计数和示例按分组快照覆盖）。
+        
         Args:
             errors: 错误信息列表
         """
         for error in errors:
+            if 'fingerprint' in error:
+                self.error_stats[error['fingerprint']] = {
+                    'error_type': error['error_type'],
+                    'name': error['message'],
+                    'status_code': error.get('status_code'),
+                    'count': error['count'],
+                    'examples': error.get('examples', [])[:5]
+                }
+                continue
+                
             error_key = f"{error['error_type']}_{error['name']}"
             if error_key not in self.error_stats:
                 self.error_stats[error_key] = {
@@ -100,7 +114,15 @@ class ReportGenerator:
         total_requests = self.test_stats.get('num_requests', 0)
         total_failures = self.test_stats.get('num_failures', 0)
         
-        return {
+        # 压测机自身负载告警期间，响应时间可能包含压测机的排队延迟，
+        # 告警时长占比超过容忍比例时不作为有效测量
+        generator_health = self.test_stats.get('generator_health', {})
+        bottleneck_seconds = generator_health.get('bottleneck_seconds', 0)
+        bottleneck_ratio = bottleneck_seconds / duration if duration > 0 else 0
+        tolerance = generator_health.get('tolerance', DEFAULT_BOTTLENECK_TOLERANCE)
+        measurement_valid = bottleneck_ratio <= tolerance
+        
+        summary = {
             'test_info': {
                 'start_time': self.start_time.isoformat(),
                 'end_time': self.end_time.isoformat(),
@@ -129,8 +151,31 @@ class ReportGenerator:
                 'error_types': len(self.error_stats),
                 'error_details': self.error_stats
             },
-            'system_stats': self.system_stats
+            'breakdown': self.test_stats.get('breakdown', []),
+            'system_stats': self.system_stats,
+            'generator_health': {
+                'measurement_valid': measurement_valid,
+                'bottleneck_seconds': bottleneck_seconds,
+                'bottleneck_ratio': bottleneck_ratio,
+                'tolerance': tolerance,
+                'warnings': generator_health.get('warnings', [])
+            }
         }
+        if 'adaptive' in self.test_stats:
+            adaptive = self.test_stats['adaptive']
+            summary['adaptive'] = {
+                'control': adaptive['control'],
+                'targets': adaptive['targets'],
+                'max_sustainable_load': adaptive['max_sustainable_load'],
+                'max_sustainable_metrics': adaptive['max_sustainable_metrics'],
+                'adjustment_count': len(adaptive['adjustments'])
+            }
+        if not measurement_valid:
+            summary['response_time']['warning'] = (
+                f'压测机负载过高的时长为{bottleneck_seconds}秒（占{bottleneck_ratio:.1%}，超过{tolerance:.1%}），'
+                f'响应时间可能包含压测机自身的排队延迟'
+            )
+        return summary
         
     def generate_report(self) -> Dict:
         """生成完整测试报告
@@ -0,0 +1,136 @@
+"""请求模板编译模块
+
+将测试流程中的请求配置预编译为请求模板，包括：
+- 一次性扫描 ${{var}} 变量引用位置
+- 静态数据在迭代间共享
+- 每次迭代仅填充变量槽位
+"""
+
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+VARIABLE_PATTERN = re.compile(r'\$\{\{(.+?)\}\}')
+
+class RequestTemplate:
+    """请求模板类
+
+    在测试计划加载时编译一次，记录所有包含变量引用的槽位路径。
+    渲染时只复制槽位所在路径上的容器，其余静态数据直接复用。
+    """
+
+    def __init__(self, source: Dict[str, Any]):
+        """编译请求模板
+
+        Args:
+            source: 原始请求配置字典
+        """
+        self.source = source
+        self.slots: List[Tuple[Tuple, List[Tuple[bool, str]]]] = []
+        self.variables = set()
+        self._scan(source, ())
+
+        # 需要写时复制的容器路径，按深度排序保证父容器先复制
+        copy_paths = set()
+        for path, _ in self.slots:
+            for depth in range(1, len(path)):
+                copy_paths.add(path[:depth])
+        self._copy_paths = sorted(copy_paths, key=len)
+
+    @property
+    def is_static(self) -> bool:
+        """模板是否不包含任何变量引用"""
+        return not self.slots
+
+    def _scan(self, value: Any, path: Tuple) -> None:
+        """递归扫描变量引用槽位
+
+        Args:
+            value: 当前节点的值
+            path: 当前节点相对于根节点的路径
+        """
+        if isinstance(value, dict):
+            for key, item in value.items():
+                self._scan(item, path + (key,))
+        elif isinstance(value, list):
+            for index, item in enumerate(value):
+                self._scan(item, path + (index,))
+        elif isinstance(value, str) and VARIABLE_PATTERN.search(value):
+            self.slots.append((path, self._split(value)))
+
+    def _split(self, text: str) -> List[Tuple[bool, str]]:
+        """将字符串拆分为静态文本段和变量段
+
+        Args:
+            text: 包含变量引用的字符串
+
+        Returns:
+            List[Tuple[bool, str]]: (是否变量, 文本或变量名) 组成的片段列表
+        """
+        segments = []
+        position = 0
+        for match in VARIABLE_PATTERN.finditer(text):
+            if match.start() > position:
+                segments.append((False, text[position:match.start()]))
+            name = match.group(1).strip()
+            segments.append((True, name))
+            self.variables.add(name)
+            position = match.end()
+        if position < len(text):
+            segments.append((False, text[position:]))
+        return segments
+
+    @staticmethod
+    def _fill(segments: List[Tuple[bool, str]], resolve: Callable[[str], Any]) -> Any:
+        """填充单个槽位
+
+        槽位只包含一个变量引用时保留变量值的原始类型，否则拼接为字符串。
+
+        Args:
+            segments: 槽位片段列表
+            resolve: 变量取值函数
+
+        Returns:
+            Any: 填充后的值
+        """
+        if len(segments) == 1 and segments[0][0]:
+            name = segments[0][1]
+            value = resolve(name)
+            if value is None:
+                raise ValueError(f'变量引用错误: 变量{name}在当前运行环境中未找到')
+            return value
+
+        parts = []
+        for is_variable, text in segments:
+            if is_variable:
+                value = resolve(text)
+                if value is None:
+                    raise ValueError(f'变量引用错误: 变量{text}在当前运行环境中未找到')
+                parts.append(str(value))
+            else:
+                parts.append(text)
+        return ''.join(parts)
+
+    def render(self, resolve: Callable[[str], Any]) -> Dict[str, Any]:
+        """渲染请求数据
+
+        Args:
+            resolve: 变量取值函数，通常为VariableManager.get_variable
+
+        Returns:
+            Dict[str, Any]: 填充变量后的请求配置字典
+        """
+        root = dict(self.source)
+        if not self.slots:
+            return root
+
+        containers = {(): root}
+        for path in self._copy_paths:
+            parent = containers[path[:-1]]
+            child = parent[path[-1]]
+            child = dict(child) if isinstance(child, dict) else list(child)
+            parent[path[-1]] = child
+            containers[path] = child
+
+        for path, segments in self.slots:
+            containers[path[:-1]][path[-1]] = self._fill(segments, resolve)
+        return root
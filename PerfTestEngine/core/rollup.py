@@ -0,0 +1,243 @@
+"""指标时间桶聚合模块
+
+按固定时间周期（如1s、10s、1m）对请求数据进行滚动聚合，包括：
+- 请求数、错误数、响应字节数、并发用户数
+- 响应时间直方图
+- 时间桶关闭时一次性输出聚合结果
+- 合并多个执行节点输出的时间桶
+"""
+
+import re
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, Optional, Tuple
+from .histogram import LatencyHistogram
+
+PERIOD_PATTERN = re.compile(r'^(\d+)([smh])$')
+PERIOD_UNITS = {'s': 1, 'm': 60, 'h': 3600}
+
+def parse_period(period: str) -> int:
+    """解析聚合周期字符串
+
+    Args:
+        period: 聚合周期，如 1s、10s、1m、1h
+
+    Returns:
+        int: 周期秒数
+
+    Raises:
+        ValueError: 周期格式无效时抛出
+    """
+    match = PERIOD_PATTERN.match(period)
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f'无效的聚合周期: {period}')
+    return int(match.group(1)) * PERIOD_UNITS[match.group(2)]
+
+class RollupBucket:
+    """单个聚合时间桶"""
+
+    def __init__(self, start: int, period: str, precision: float):
+        """初始化时间桶
+
+        Args:
+            start: 时间桶起始时间戳（秒，按周期对齐）
+            period: 聚合周期
+            precision: 直方图精度
+        """
+        self.start = start
+        self.period = period
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.users = 0
+        self.histogram = LatencyHistogram(precision=precision)
+
+    def record(self, response_time: float, is_success: bool, response_length: int, users: int = 0) -> None:
+        self.count += 1
+        self.bytes += response_length
+        if users > self.users:
+            self.users = users
+        if is_success:
+            self.histogram.record(response_time)
+        else:
+            self.errors += 1
+
+    def merge(self, data: Dict) -> None:
+        """合并其他节点输出的同周期同起始时间的时间桶，并发用户数按节点累加"""
+        self.count += data['count']
+        self.errors += data['errors']
+        self.bytes += data['bytes']
+        self.users += data.get('users', 0)
+        self.histogram.merge(LatencyHistogram.from_dict(data['histogram']))
+
+    def to_dict(self, shard_key: str, seconds: int, percentiles: Iterable[float]) -> Dict:
+        """输出时间桶聚合结果
+
+        Args:
+            shard_key: 数据分片键
+            seconds: 周期秒数
+            percentiles: 需要输出的百分位列表
+        """
+        return {
+            'timestamp': self.start,
+            'shard_key': shard_key,
+            'aggregation_period': self.period,
+            'count': self.count,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'users': self.users,
+            'rps': self.count / seconds,
+            'error_rate': self.errors / self.count if self.count else 0,
+            'response_time': self.histogram.summary(percentiles) if self.histogram.count else {},
+            'histogram': self.histogram.to_dict()
+        }
+
+class RollupAggregator:
+    """多周期滚动聚合器
+
+    每个周期同时只维护一个开放的时间桶，记录时间越过桶结束时间时关闭该桶，
+    关闭的桶只输出一次到待消费队列，同时保留有限条数的历史供趋势图使用。
+    """
+
+    def __init__(self, periods: Iterable[str] = ('1s', '10s', '1m'), shard_key: str = 'default',
+                 precision: float = 0.01, percentiles: Iterable[float] = (50, 90, 95, 99),
+                 history_size: int = 3600, sequence: Optional[Callable[[], int]] = None,
+                 merge_grace: float = 5.0):
+        """初始化聚合器
+
+        Args:
+            periods: 聚合周期列表
+            shard_key: 数据分片键
+            precision: 直方图精度
+            percentiles: 时间桶输出的百分位列表
+            history_size: 每个周期保留的历史时间桶数
+            sequence: 可选，序号生成函数，时间桶关闭时调用并记录为 seq
+            merge_grace: 合并时间桶在结束后继续等待其他节点上报的秒数
+        """
+        self.periods = list(dict.fromkeys(periods))
+        self.seconds = {period: parse_period(period) for period in self.periods}
+        self.shard_key = shard_key
+        self.sequence = sequence
+        self.precision = precision
+        self.percentiles = tuple(percentiles)
+        self.merge_grace = merge_grace
+        self._open: Dict[str, Optional[RollupBucket]] = {period: None for period in self.periods}
+        self._merging: Dict[Tuple[str, int], RollupBucket] = {}
+        self._pending: List[Dict] = []
+        self.history: Dict[str, Deque[Dict]] = {
+            period: deque(maxlen=history_size) for period in self.periods
+        }
+
+    def _close(self, period: str) -> None:
+        bucket = self._open[period]
+        if bucket is None:
+            return
+        self._emit(bucket)
+        self._open[period] = None
+
+    def _emit(self, bucket: RollupBucket) -> None:
+        period = bucket.period
+        result = bucket.to_dict(self.shard_key, self.seconds[period], self.percentiles)
+        result['seq'] = self.sequence() if self.sequence else 0
+        self._pending.append(result)
+        self.history[period].append(result)
+
+    def record(self, timestamp: float, response_time: float, is_success: bool,
+               response_length: int = 0, users: int = 0) -> None:
+        """记录一次请求
+
+        Args:
+            timestamp: 请求完成时间戳（秒）
+            response_time: 响应时间（毫秒）
+            is_success: 是否成功
+            response_length: 响应字节数
+            users: 当前并发用户数，时间桶记录其中的最大值
+        """
+        for period in self.periods:
+            seconds = self.seconds[period]
+            start = int(timestamp // seconds) * seconds
+            bucket = self._open[period]
+            if bucket is not None and start > bucket.start:
+                self._close(period)
+                bucket = None
+            if bucket is None:
+                bucket = self._open[period] = RollupBucket(start, period, self.precision)
+            # 晚到的记录计入当前开放桶
+            bucket.record(response_time, is_success, response_length, users)
+
+    def advance(self, now: float) -> None:
+        """关闭所有结束时间不晚于 now 的时间桶
+
+        没有新请求时也需要定期调用，保证空闲期间时间桶能按时关闭。
+
+        Args:
+            now: 当前时间戳（秒）
+        """
+        for period in self.periods:
+            bucket = self._open[period]
+            if bucket is not None and bucket.start + self.seconds[period] <= now:
+                self._close(period)
+        if self._merging:
+            for key in sorted(self._merging, key=lambda key: key[1]):
+                period, start = key
+                if start + self.seconds[period] + self.merge_grace <= now:
+                    self._emit(self._merging.pop(key))
+
+    def merge(self, data: Dict) -> None:
+        """合并其他聚合器输出的已关闭时间桶
+
+        用于汇总多个执行节点的数据，同周期同起始时间的时间桶累加，
+        在时间桶结束 merge_grace 秒后由 advance 统一输出。
+
+        Args:
+            data: 其他聚合器 drain 输出的时间桶
+        """
+        period = data['aggregation_period']
+        if period not in self.seconds:
+            return
+        key = (period, data['timestamp'])
+        bucket = self._merging.get(key)
+        if bucket is None:
+            bucket = self._merging[key] = RollupBucket(data['timestamp'], period, self.precision)
+        bucket.merge(data)
+
+    def drain(self) -> List[Dict]:
+        """取出所有已关闭且尚未消费的时间桶
+
+        Returns:
+            List[Dict]: 时间桶聚合结果列表，按关闭顺序排列
+        """
+        pending, self._pending = self._pending, []
+        return pending
+
+    def flush(self) -> List[Dict]:
+        """关闭所有开放的时间桶并取出待消费结果，测试结束时调用"""
+        for period in self.periods:
+            self._close(period)
+        for key in sorted(self._merging, key=lambda key: key[1]):
+            self._emit(self._merging.pop(key))
+        return self.drain()
+
+    def get_history(self, period: str, since: Optional[int] = None,
+                    since_seq: Optional[int] = None) -> List[Dict]:
+        """获取指定周期的历史时间桶
+
+        Args:
+            period: 聚合周期
+            since: 可选，只返回起始时间戳大于该值的时间桶
+            since_seq: 可选，只返回关闭序号大于该值的时间桶
+
+        Returns:
+            List[Dict]: 时间桶聚合结果列表
+        """
+        history = self.history.get(period, ())
+        if since_seq is not None:
+            # 历史按关闭顺序排列，从尾部向前查找即可
+            result = []
+            for bucket in reversed(history):
+                if bucket['seq'] <= since_seq:
+                    break
+                result.append(bucket)
+            history = reversed(result)
+        if since is None:
+            return list(history)
+        return [bucket for bucket in history if bucket['timestamp'] > since]
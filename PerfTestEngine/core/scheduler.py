@@ -0,0 +1,195 @@
+"""流程调度模块
+
+提供测试用户执行流程时的调度功能，包括：
+- 基于别名表的加权流程选择
+- 思考时间调度（固定、均匀分布、节奏控制）
+- 开放模型下的迭代放行控制
+"""
+
+import random
+import time
+from typing import Any, Dict, List, Optional
+import gevent.queue
+
+class AliasTable:
+    """别名表加权随机选择器
+
+    使用Vose别名算法预处理权重，构建复杂度O(n)，每次选择复杂度O(1)。
+    """
+
+    def __init__(self, weights: List[float]):
+        """构建别名表
+
+        Args:
+            weights: 各选项的权重，必须为非负数且总和大于0
+
+        Raises:
+            ValueError: 权重为空、包含负数或总和为0时抛出
+        """
+        if not weights:
+            raise ValueError('权重列表不能为空')
+        if any(weight < 0 for weight in weights):
+            raise ValueError('权重不能为负数')
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError('权重总和必须大于0')
+
+        size = len(weights)
+        self.size = size
+        self.prob = [0.0] * size
+        self.alias = [0] * size
+
+        scaled = [weight * size / total for weight in weights]
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+
+        # 浮点误差导致的剩余项概率视为1
+        for index in small + large:
+            self.prob[index] = 1.0
+
+    def pick(self) -> int:
+        """按权重随机选择一个选项
+
+        Returns:
+            int: 选中选项的下标
+        """
+        value = random.random() * self.size
+        index = int(value)
+        if value - index < self.prob[index]:
+            return index
+        return self.alias[index]
+
+class ThinkTimeScheduler:
+    """思考时间调度器
+
+    支持三种调度方式：
+    - constant: 每次迭代后固定等待 value 秒
+    - uniform: 每次迭代后在 [min, max] 秒之间均匀随机等待
+    - pacing: 控制每次迭代的总耗时为 iteration_time 秒（或按 iteration_rate 次/秒换算），
+      迭代本身耗时超过目标时不再等待
+    """
+
+    TYPES = ('constant', 'uniform', 'pacing')
+
+    def __init__(self, config: Dict[str, Any]):
+        """初始化思考时间调度器
+
+        Args:
+            config: 调度配置，包含 type 及对应参数
+
+        Raises:
+            ValueError: 调度类型不支持或参数无效时抛出
+        """
+        self.type = config.get('type', 'constant')
+        if self.type not in self.TYPES:
+            raise ValueError(f'不支持的思考时间类型: {self.type}')
+
+        self.value = float(config.get('value', 0))
+        self.min = float(config.get('min', 0))
+        self.max = float(config.get('max', self.min))
+        if self.type == 'uniform' and self.max < self.min:
+            raise ValueError('思考时间上限不能小于下限')
+
+        self.iteration_time = 0.0
+        if self.type == 'pacing':
+            if config.get('iteration_rate'):
+                self.iteration_time = 1.0 / float(config['iteration_rate'])
+            else:
+                self.iteration_time = float(config.get('iteration_time', 0))
+            if self.iteration_time <= 0:
+                raise ValueError('节奏控制模式必须设置正数的 iteration_time 或 iteration_rate')
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional['ThinkTimeScheduler']:
+        """根据配置创建调度器
+
+        Args:
+            config: 调度配置，为空时返回None
+
+        Returns:
+            ThinkTimeScheduler: 调度器实例
+        """
+        if not config:
+            return None
+        return cls(config)
+
+    def next_wait(self, iteration_start: Optional[float] = None) -> float:
+        """计算下一次迭代前的等待时间
+
+        Args:
+            iteration_start: 本次迭代开始时间（time.perf_counter），节奏控制模式使用
+
+        Returns:
+            float: 等待秒数
+        """
+        if self.type == 'constant':
+            return self.value
+        if self.type == 'uniform':
+            return random.uniform(self.min, self.max)
+        if iteration_start is None:
+            return self.iteration_time
+        elapsed = time.perf_counter() - iteration_start
+        return max(0.0, self.iteration_time - elapsed)
+
+class IterationGate:
+    """迭代闸门
+
+    开放模型（到达率）压测中，调度方按目标到达率放行迭代，预分配的测试用户在闸门处等待。
+    放行时没有空闲用户则该次迭代记为丢弃，而不是排队延后执行。
+    """
+
+    def __init__(self):
+        """初始化迭代闸门"""
+        self._queue = gevent.queue.Queue()
+        self.idle_users = 0
+        self.scheduled_iterations = 0
+        self.dropped_iterations = 0
+        self.closed = False
+
+    def wait(self) -> Optional[float]:
+        """测试用户等待下一次迭代
+
+        Returns:
+            float: 本次迭代的计划开始时间（time.perf_counter），闸门关闭时返回None
+        """
+        if self.closed:
+            return None
+        self.idle_users += 1
+        try:
+            return self._queue.get()
+        finally:
+            self.idle_users -= 1
+
+    def release(self, intended_start: float) -> bool:
+        """放行一次迭代
+
+        Args:
+            intended_start: 迭代的计划开始时间（time.perf_counter）
+
+        Returns:
+            bool: 有空闲用户接收返回True，否则记为丢弃返回False
+        """
+        self.scheduled_iterations += 1
+        # 已放行但尚未被取走的迭代同样占用空闲用户
+        if self.idle_users - self._queue.qsize() <= 0:
+            self.dropped_iterations += 1
+            return False
+        self._queue.put(intended_start)
+        return True
+
+    def close(self) -> None:
+        """关闭闸门并唤醒所有等待中的用户"""
+        self.closed = True
+        for _ in range(self.idle_users):
+            self._queue.put(None)
@@ -4,15 +4,26 @@
 - 并发模式：固定并发用户数
 - 阶梯模式：逐步增加并发用户数
 - 错误率模式：基于错误率动态调整并发用户数
+- 固定到达率模式：按固定速率放行迭代（开放模型）
+- 阶梯到达率模式：按阶段线性调整到达率（开放模型）
+- 自适应模式：闭环调节用户数或到达率，保持目标响应时间、吞吐量或错误率
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import Dict, List, Optional
 import time
 import logging
+import gevent
 from locust import Environment
 from .datasource import DataSource
 from .case_run_log import CaseRunLog
+from .scheduler import IterationGate
+from .controller import CEILING_METRICS, create_controller, normalized_error
+from .histogram import LatencyHistogram
+from .validator import (
+    ConcurrentStrategyValidator, StepStrategyValidator, ErrorRateStrategyValidator,
+    ConstantArrivalRateStrategyValidator, RampingArrivalRateStrategyValidator, AdaptiveStrategyValidator
+)
 
 class TestStrategy(ABC):
     """测试执行策略基类
@@ -29,6 +40,8 @@ class TestStrategy(ABC):
         """
         self.env = env
         self.runner = None
+        # 可选，运行器工厂，分布式执行时返回协调器，默认创建本地运行器
+        self.runner_factory = None
         self.data_source = data_source
         self._current_data = None
         self.logger = CaseRunLog()
@@ -36,6 +49,12 @@ class TestStrategy(ABC):
         self._error_handlers = {}
         self._status_listeners = []
         
+    def create_runner(self):
+        """创建测试运行器"""
+        if self.runner_factory:
+            return self.runner_factory()
+        return self.env.create_local_runner()
+        
     def get_test_data(self) -> Dict:
         """获取测试数据
         
@@ -156,7 +175,7 @@ class ConcurrentStrategy(TestStrategy):
             validator = ConcurrentStrategyValidator()
             validator.validate(config)
             
-            self.runner = self.env.create_local_runner()
+            self.runner = self.create_runner()
             self.notify_status_change('starting', {'config': config})
         
         # 初始化测试数据
@@ -207,7 +226,7 @@ class StepStrategy(TestStrategy):
             validator = StepStrategyValidator()
             validator.validate(config)
             
-            self.runner = self.env.create_local_runner()
+            self.runner = self.create_runner()
             self.notify_status_change('starting', {'config': config})
             
             # 初始化测试数据
@@ -253,7 +272,7 @@ class ErrorRateStrategy(TestStrategy):
             validator = ErrorRateStrategyValidator()
             validator.validate(config)
             
-            self.runner = self.env.create_local_runner()
+            self.runner = self.create_runner()
             self.notify_status_change('starting', {'config': config})
             self.logger.info(f'开始执行错误率模式测试，目标错误率阈值: {config["error_threshold"]}')
             
@@ -288,16 +307,350 @@ class ErrorRateStrategy(TestStrategy):
             self.handle_error(e)
             raise
             
+class ArrivalRateStrategy(TestStrategy):
+    """到达率模式策略基类
+    
+    开放模型：按目标到达率调度迭代，而不是让固定数量的用户循环执行。
+    启动预分配数量的用户在迭代闸门处等待，调度时没有空闲用户的迭代记为丢弃并在
+    最大用户数内逐步扩容，服务端变慢时不会因用户被阻塞而隐式降低压力。
+    """
+    
+    def __init__(self, env: Environment, data_source: DataSource = None):
+        super().__init__(env, data_source)
+        self.gate = None
+        
+    @property
+    def dropped_iterations(self) -> int:
+        """因预分配用户耗尽而丢弃的迭代数"""
+        return self.gate.dropped_iterations if self.gate else 0
+        
+    def is_open_model(self, config: Dict) -> bool:
+        """该配置下是否按到达率调度迭代（依赖进程内的迭代闸门）"""
+        return True
+        
+    @abstractmethod
+    def get_rate(self, elapsed: float) -> float:
+        """获取指定时刻的目标到达率
+        
+        Args:
+            elapsed: 测试已运行秒数
+            
+        Returns:
+            float: 目标到达率(次/秒)
+        """
+        pass
+        
+    def run_arrivals(self, config: Dict, duration: float) -> None:
+        """按到达率调度迭代
+        
+        Args:
+            config: 测试配置参数字典
+            duration: 调度总时长(秒)
+        """
+        pre_allocated_vus = config.get('pre_allocated_vus', config['vus'])
+        max_vus = config['vus']
+        self.gate = IterationGate()
+        user_class = self.env.user_classes[0]
+        user_class.iteration_gate = self.gate
+        
+        self.runner = self.create_runner()
+        self.notify_status_change('starting', {'config': config})
+        self.get_test_data()
+        self.runner.start(user_count=pre_allocated_vus, spawn_rate=pre_allocated_vus)
+        
+        start_time = time.perf_counter()
+        next_arrival = start_time
+        last_grow = start_time
+        try:
+            while True:
+                elapsed = next_arrival - start_time
+                if elapsed >= duration:
+                    break
+                rate = self.get_rate(elapsed)
+                if rate <= 0:
+                    # 到达率为0的阶段按固定间隔重新检查
+                    next_arrival += 0.1
+                    continue
+                    
+                delay = next_arrival - time.perf_counter()
+                # 补发逾期的迭代时也让出执行权，否则调度循环会一直占用事件循环，用户无法执行被放行的迭代
+                gevent.sleep(max(delay, 0))
+                if not self.gate.release(next_arrival):
+                    # 预分配用户耗尽时在最大用户数内扩容，每秒最多扩容一次
+                    current_users = self.runner.user_count
+                    if current_users < max_vus and time.perf_counter() - last_grow >= 1:
+                        target_users = min(max_vus, current_users + max(1, current_users // 10))
+                        self.runner.start(user_count=target_users, spawn_rate=target_users - current_users)
+                        last_grow = time.perf_counter()
+                next_arrival += 1.0 / rate
+        finally:
+            self.gate.close()
+            user_class.iteration_gate = None
+            self.runner.stop()
+            self.logger.info(
+                f'到达率模式执行结束，计划迭代数: {self.gate.scheduled_iterations}，'
+                f'丢弃迭代数: {self.gate.dropped_iterations}'
+            )
+            
+class ConstantArrivalRateStrategy(ArrivalRateStrategy):
+    """固定到达率模式策略
+    
+    在整个测试过程中按固定速率放行迭代。
+    """
+    
+    def get_rate(self, elapsed: float) -> float:
+        return self._rate
+        
+    def execute(self, config: Dict) -> None:
+        """执行固定到达率模式测试
+        
+        Args:
+            config: 测试配置参数字典，必须包含以下字段：
+                - vus: 最大并发用户数
+                - rate: 目标到达率(次/秒)
+                - duration: 测试持续时间(秒)
+                - pre_allocated_vus: 可选，预分配用户数，默认等于vus
+        """
+        try:
+            validator = ConstantArrivalRateStrategyValidator()
+            validator.validate(config)
+            self._rate = config['rate']
+            self.run_arrivals(config, config['duration'])
+        except Exception as e:
+            self.logger.error(f'执行固定到达率模式测试失败: {str(e)}')
+            self.handle_error(e)
+            raise
+            
+class RampingArrivalRateStrategy(ArrivalRateStrategy):
+    """阶梯到达率模式策略
+    
+    按配置的阶段在持续时间内将到达率从上一阶段目标线性调整到本阶段目标。
+    """
+    
+    def get_rate(self, elapsed: float) -> float:
+        stage_start = 0
+        start_rate = self._start_rate
+        for stage in self._stages:
+            stage_end = stage_start + stage['duration']
+            if elapsed < stage_end:
+                progress = (elapsed - stage_start) / stage['duration']
+                return start_rate + (stage['target'] - start_rate) * progress
+            stage_start = stage_end
+            start_rate = stage['target']
+        return start_rate
+        
+    def execute(self, config: Dict) -> None:
+        """执行阶梯到达率模式测试
+        
+        Args:
+            config: 测试配置参数字典，必须包含以下字段：
+                - vus: 最大并发用户数
+                - stages: 阶段列表，每项包含 target(目标到达率) 和 duration(阶段时长)
+                - start_rate: 可选，初始到达率，默认0
+                - pre_allocated_vus: 可选，预分配用户数，默认等于vus
+        """
+        try:
+            validator = RampingArrivalRateStrategyValidator()
+            validator.validate(config)
+            self._start_rate = config.get('start_rate', 0)
+            self._stages: List[Dict] = config['stages']
+            duration = sum(stage['duration'] for stage in self._stages)
+            self.run_arrivals(config, duration)
+        except Exception as e:
+            self.logger.error(f'执行阶梯到达率模式测试失败: {str(e)}')
+            self.handle_error(e)
+            raise
+            
+class AdaptiveStrategy(ArrivalRateStrategy):
+    """自适应模式策略
+    
+    闭环控制负载以保持目标指标（如p95响应时间、RPS、错误率）。每个控制周期统计窗口内的指标，
+    由AIMD或PID控制器计算下一周期的用户数（封闭模型）或到达率（开放模型），
+    并记录上限指标（响应时间、错误率）全部满足时的最大负载，作为最大可持续负载；
+    只配置下限指标（rps）时负载不受约束，不计算最大可持续负载。
+    """
+    
+    def __init__(self, env: Environment, data_source: DataSource = None):
+        super().__init__(env, data_source)
+        self.controller = None
+        self.targets: Dict[str, float] = {}
+        self.control = 'users'
+        self.adjustments: List[Dict] = []
+        self.max_sustainable: Optional[Dict] = None
+        self._rate = 0.0
+        
+    def is_open_model(self, config: Dict) -> bool:
+        return config.get('control', 'users') == 'rate'
+        
+    def get_rate(self, elapsed: float) -> float:
+        return self._rate
+        
+    @property
+    def adaptive_result(self) -> Dict:
+        """自适应调节结果，包括每次调整记录和找到的最大可持续负载"""
+        return {
+            'control': self.control,
+            'targets': self.targets,
+            'current_load': self.controller.load if self.controller else None,
+            'max_sustainable_load': self.max_sustainable['load'] if self.max_sustainable else None,
+            'max_sustainable_metrics': self.max_sustainable['metrics'] if self.max_sustainable else None,
+            'adjustments': self.adjustments
+        }
+        
+    def execute(self, config: Dict) -> None:
+        """执行自适应模式测试
+        
+        Args:
+            config: 测试配置参数字典，必须包含以下字段：
+                - vus: 最大并发用户数
+                - duration: 测试持续时间(秒)
+                - target_metrics: 目标指标，指标名(p50/p90/p95/p99/avg_response_time/error_rate/rps)到目标值的映射
+                - control: 可选，users（默认，调节用户数）或 rate（调节到达率）
+                - algorithm: 可选，aimd（默认）或 pid
+                - interval: 可选，控制周期(秒)，默认5
+                - initial_users: 可选，初始用户数，默认为vus的10%
+                - initial_rate/max_rate: 调节到达率时的初始到达率和最大到达率(次/秒)
+                - controller: 可选，控制器参数，见 controller.create_controller
+        """
+        try:
+            validator = AdaptiveStrategyValidator()
+            validator.validate(config)
+            self.targets = config['target_metrics']
+            self.control = config.get('control', 'users')
+            algorithm = config.get('algorithm', 'aimd')
+            interval = config.get('interval', 5)
+            
+            if self.control == 'rate':
+                self.controller = create_controller(
+                    algorithm, config.get('initial_rate', config['max_rate'] * 0.1),
+                    config.get('min_rate', 0.1), config['max_rate'], config.get('controller')
+                )
+                self._rate = self.controller.load
+                control_loop = gevent.spawn(self._control_loop, config['duration'], interval)
+                try:
+                    self.run_arrivals(config, config['duration'])
+                finally:
+                    control_loop.kill()
+            else:
+                self.controller = create_controller(
+                    algorithm, config.get('initial_users', max(1, config['vus'] // 10)),
+                    config.get('min_users', 1), config['vus'], config.get('controller')
+                )
+                self.runner = self.create_runner()
+                self.notify_status_change('starting', {'config': config})
+                self.get_test_data()
+                users = int(round(self.controller.load))
+                self.runner.start(user_count=users, spawn_rate=users)
+                try:
+                    self._control_loop(config['duration'], interval)
+                finally:
+                    self.runner.stop()
+                    
+            self.logger.info(
+                f'自适应模式执行结束，最大可持续负载: {self.adaptive_result["max_sustainable_load"]}，'
+                f'调整次数: {len(self.adjustments)}'
+            )
+        except Exception as e:
+            self.logger.error(f'执行自适应模式测试失败: {str(e)}')
+            self.handle_error(e)
+            raise
+            
+    def _control_loop(self, duration: float, interval: float) -> None:
+        """按控制周期统计窗口指标并调整负载，直到达到测试持续时间"""
+        start_time = time.time()
+        while self.runner is None:
+            gevent.sleep(0.1)
+        window = self._snapshot()
+        ceilings = {metric: target for metric, target in self.targets.items() if metric in CEILING_METRICS}
+        while time.time() - start_time < duration:
+            gevent.sleep(min(interval, max(duration - (time.time() - start_time), 0.1)))
+            metrics = self._measure(window)
+            window = self._snapshot()
+            error = normalized_error(self.targets, metrics)
+            if error is None:
+                continue
+                
+            load = self.controller.load
+            # 上限指标在本周期有数据且全部满足目标时，当前负载才视为可持续
+            ceiling_error = normalized_error(ceilings, metrics) if ceilings else None
+            if ceiling_error is not None and ceiling_error >= -self.controller.tolerance and (
+                    not self.max_sustainable or load > self.max_sustainable['load']):
+                self.max_sustainable = {'load': load, 'metrics': metrics}
+                
+            new_load = self.controller.update(error, interval)
+            self._apply_load(new_load)
+            self.adjustments.append({
+                'time': time.time(),
+                'load': load,
+                'new_load': new_load,
+                'error': round(error, 4),
+                'metrics': metrics
+            })
+            self.logger.info(
+                f'自适应调整: {self.control} {load:.2f} -> {new_load:.2f}，误差 {error:.3f}，指标 {metrics}'
+            )
+            
+    def _apply_load(self, load: float) -> None:
+        """应用控制器输出的负载"""
+        if self.control == 'rate':
+            self._rate = load
+            return
+        users = int(round(load))
+        current_users = self.runner.user_count
+        if users != current_users:
+            self.runner.start(user_count=users, spawn_rate=max(abs(users - current_users), 1))
+            
+    def _snapshot(self) -> Dict:
+        """记录累计统计，用于计算下一个控制周期的窗口指标"""
+        total = self.runner.stats.total
+        return {
+            'time': time.time(),
+            'num_requests': total.num_requests,
+            'num_failures': total.num_failures,
+            'total_response_time': total.total_response_time,
+            'response_times': dict(total.response_times)
+        }
+        
+    def _measure(self, window: Dict) -> Dict[str, Optional[float]]:
+        """计算控制周期窗口内的指标
+        
+        吞吐量、错误率和平均响应时间由窗口前后的累计值相减得出；百分位由窗口前后的累计响应时间分布
+        相减得到窗口内的分布后计算，只包含本控制周期的请求。
+        """
+        current = self._snapshot()
+        elapsed = current['time'] - window['time']
+        requests = current['num_requests'] - window['num_requests']
+        metrics: Dict[str, Optional[float]] = {
+            'rps': requests / elapsed if elapsed > 0 else None,
+            'error_rate': (current['num_failures'] - window['num_failures']) / requests if requests else None,
+            'avg_response_time': (
+                (current['total_response_time'] - window['total_response_time']) / requests if requests else None
+            )
+        }
+        histogram = LatencyHistogram()
+        previous = window['response_times']
+        for response_time, count in current['response_times'].items():
+            count -= previous.get(response_time, 0)
+            if count > 0:
+                histogram.record(response_time, count)
+        values = histogram.percentiles((50, 90, 95, 99)) if histogram.count else {}
+        for metric, percent in (('p50', 50), ('p90', 90), ('p95', 95), ('p99', 99)):
+            metrics[metric] = values.get(percent)
+        return metrics
+        
 class StrategyFactory:
     """测试策略工厂类
     
-    用于根据策略类型创建对应的测试策略实例。支持并发模式、阶梯模式和错误率模式。
+    用于根据策略类型创建对应的测试策略实例。支持并发模式、阶梯模式、错误率模式、到达率模式和自适应模式。
     """
     
     _strategies = {
         'concurrent': ConcurrentStrategy,
         'step': StepStrategy,
-        'error_rate': ErrorRateStrategy
+        'error_rate': ErrorRateStrategy,
+        'constant_arrival_rate': ConstantArrivalRateStrategy,
+        'ramping_arrival_rate': RampingArrivalRateStrategy,
+        'adaptive': AdaptiveStrategy
     }
     
     @classmethod
@@ -305,7 +658,8 @@ class StrategyFactory:
         """创建测试策略实例
         
         Args:
-            strategy_type: 策略类型，可选值：'concurrent'、'step'、'error_rate'
+            strategy_type: 策略类型，可选值：'concurrent'、'step'、'error_rate'、
+                'constant_arrival_rate'、'ramping_arrival_rate'、'adaptive'
             env: Locust测试环境实例
             data_source: 可选，数据源实例，用于提供测试数据
             
@@ -7,13 +7,28 @@
 - 断言验证
 """
 
-from typing import Dict, List, Any, Optional
+from types import CodeType
+from typing import Dict, List, Any, Optional, Union
 from locust import User, task, between
+import gevent
 import requests
 import json
+import time
 from jsonpath import jsonpath
 import re
 from .test_variable import VariableManager
+from .request_template import RequestTemplate
+from .plan import compile_script
+from .scheduler import AliasTable, ThinkTimeScheduler, IterationGate
+
+def mark_reported(exception: Exception) -> Exception:
+    """标记异常已上报失败事件，外层处理时不再重复上报"""
+    exception._perf_reported = True
+    return exception
+
+def is_reported(exception: Exception) -> bool:
+    """异常是否已上报失败事件"""
+    return getattr(exception, '_perf_reported', False)
 
 class PerformanceTestUser(User):
     """性能测试用户类
@@ -29,33 +44,111 @@ class PerformanceTestUser(User):
     abstract = True
     test_flows: List[Dict] = []
     global_variables: Dict[str, Any] = {}
+    flow_dispatch: str = 'sequential'  # sequential: 依次执行全部流程; weighted: 每次迭代按权重选择一个流程
+    flow_table: Optional[AliasTable] = None
+    think_time_scheduler: Optional[ThinkTimeScheduler] = None
+    iteration_gate: Optional[IterationGate] = None  # 到达率模式下由策略设置
+    corrected_stats = None  # 开启延迟校正时由引擎设置的RequestStats，记录从计划开始时间起算的延迟
     
     def __init__(self, *args, **kwargs):
         """初始化测试用户"""
         super().__init__(*args, **kwargs)
         self.variable_manager = VariableManager()
         self.session = requests.Session()
+        self._script_namespace = self._build_script_namespace()
+        self._iteration_start = None
+        self._intended_start = None
+        self._iteration_lag = 0.0  # 本次迭代实际开始时间相对计划开始时间的延后(秒)
+        self._pending_lag = 0.0    # 尚未计入请求延迟的迭代延后(秒)
         
         # 初始化环境变量
         for name, value in self.global_variables.items():
             self.variable_manager.set_env_variable(name, value)
     
+    def wait_time(self) -> float:
+        """计算两次迭代之间的思考时间
+        
+        Returns:
+            float: 等待秒数
+        """
+        # 到达率模式下迭代节奏由闸门控制
+        if self.iteration_gate or not self.think_time_scheduler:
+            return 0
+        return self.think_time_scheduler.next_wait(self._iteration_start)
+    
+    def _select_flows(self) -> List[Dict]:
+        """选择本次迭代要执行的流程
+        
+        Returns:
+            List[Dict]: 流程配置列表
+        """
+        if self.flow_dispatch == 'weighted' and self.flow_table and len(self.test_flows) > 1:
+            return [self.test_flows[self.flow_table.pick()]]
+        return self.test_flows
+    
     @task
     def execute_test_flows(self):
         """执行测试流程"""
-        for flow in self.test_flows:
+        if self.iteration_gate:
+            self._intended_start = self.iteration_gate.wait()
+            if self._intended_start is None:
+                return
+        self._iteration_start = time.perf_counter()
+        self._update_intended_start()
+        for flow in self._select_flows():
             try:
                 self._execute_flow(flow)
             except Exception as e:
-                self.environment.events.request_failure.fire(
-                    request_type=flow.get('name', 'unknown'),
-                    name=str(e),
-                    response_time=0,
-                    exception=e
-                )
+                # 请求和流程事务的失败已在发生处上报，这里只上报流程脚本等其他失败
+                if not is_reported(e):
+                    self.environment.events.request_failure.fire(
+                        request_type='flow',
+                        name=flow.get('name', 'unknown'),
+                        response_time=0,
+                        exception=e
+                    )
             finally:
                 # 清理临时变量
                 self.variable_manager.clear_temp_variables()
+            
+            # 流程级思考时间
+            if flow.get('think_time'):
+                gevent.sleep(flow['think_time'])
+    
+    def _update_intended_start(self):
+        """计算本次迭代的计划开始时间和调度延后
+        
+        到达率模式使用闸门放行时间；节奏控制模式以上次计划开始时间加目标迭代时长推算，
+        迭代超时不会让后续计划时间顺延。其余模式计划开始时间即实际开始时间。
+        """
+        if self.iteration_gate:
+            pass
+        elif self.think_time_scheduler and self.think_time_scheduler.type == 'pacing':
+            if self._intended_start is None:
+                self._intended_start = self._iteration_start
+            else:
+                self._intended_start += self.think_time_scheduler.iteration_time
+        else:
+            self._intended_start = self._iteration_start
+        self._iteration_lag = max(0.0, self._iteration_start - self._intended_start)
+        self._pending_lag = self._iteration_lag
+    
+    def _record_corrected(self, request_type: str, name: str, response_time: float,
+                          response_length: int = 0, exception: Optional[Exception] = None):
+        """记录校正后的请求延迟
+        
+        Args:
+            request_type: 请求类型
+            name: 请求名称
+            response_time: 校正后的响应时间(毫秒)
+            response_length: 响应长度
+            exception: 可选，请求异常
+        """
+        if self.corrected_stats is None:
+            return
+        self.corrected_stats.log_request(request_type, name, response_time, response_length)
+        if exception is not None:
+            self.corrected_stats.log_error(request_type, name, exception)
     
     def _execute_flow(self, flow: Dict):
         """执行单个测试流程
@@ -63,16 +156,117 @@ class PerformanceTestUser(User):
         Args:
             flow: 测试流程配置
         """
-        # 执行前置脚本
-        if 'setup_script' in flow:
-            self._execute_script(flow['setup_script'])
+        # 执行前置脚本（优先使用TestPlan预编译的代码对象）
+        self._execute_script(flow.get('setup_code') or flow.get('setup_script'))
             
-        # 发送请求
-        response = self._send_request(flow)
+        # 多步骤流程按顺序执行全部步骤，否则发送单个请求
+        if flow.get('requests'):
+            response = self._execute_steps(flow)
+        else:
+            response = self._send_request(flow)
         
         # 执行后置脚本
-        if 'teardown_script' in flow:
-            self._execute_script(flow['teardown_script'], response)
+        self._execute_script(flow.get('teardown_code') or flow.get('teardown_script'), response)
+    
+    def _execute_steps(self, flow: Dict) -> requests.Response:
+        """按顺序执行流程中的所有步骤
+        
+        每个步骤作为独立的请求条目上报，步骤间通过提取的临时变量传递数据，
+        整个流程作为一个事务（request_type 为 flow）再上报一次总耗时。
+        任一步骤失败（请求、脚本或变量提取）时事务都上报失败；请求失败已由步骤上报，
+        外层不再重复上报该请求。
+        
+        Args:
+            flow: 测试流程配置
+            
+        Returns:
+            requests.Response: 最后一个步骤的响应对象
+        """
+        response = None
+        response_length = 0
+        start_time = time.perf_counter()
+        
+        try:
+            for step in flow['requests']:
+                self._execute_script(step.get('setup_code') or step.get('setup_script'))
+                response = self._send_request(step)
+                response_length += len(response.content)
+                self._extract_variables(step.get('extract'), response)
+                self._execute_script(step.get('teardown_code') or step.get('teardown_script'), response)
+        except Exception as e:
+            elapsed = time.perf_counter() - start_time
+            self.environment.events.request_failure.fire(
+                request_type='flow',
+                name=flow.get('name', 'unknown'),
+                response_time=int(elapsed * 1000),
+                exception=e
+            )
+            self._record_corrected('flow', flow.get('name', 'unknown'),
+                                   int((elapsed + self._iteration_lag) * 1000), exception=e)
+            raise mark_reported(e)
+            
+        elapsed = time.perf_counter() - start_time
+        self.environment.events.request_success.fire(
+            request_type='flow',
+            name=flow.get('name', 'unknown'),
+            response_time=int(elapsed * 1000),
+            response_length=response_length
+        )
+        self._record_corrected('flow', flow.get('name', 'unknown'),
+                               int((elapsed + self._iteration_lag) * 1000), response_length)
+        return response
+    
+    def _extract_variables(self, extract: Any, response: requests.Response):
+        """从响应中提取变量并保存为临时变量
+        
+        以 $ 开头的表达式按 jsonpath 从响应JSON中提取，其余按正则从响应文本中提取。
+        
+        Args:
+            extract: 提取配置，{变量名: 表达式} 字典或 [变量名, 表达式] 列表
+            response: 请求响应对象
+        """
+        if not extract:
+            return
+        items = extract.items() if isinstance(extract, dict) else extract
+        for name, expression in items:
+            self.variable_manager.set_temp_variable(name, self._extract_value(expression, response))
+    
+    def _validate_response(self, validate: Any, response: requests.Response):
+        """按断言配置校验响应
+        
+        Args:
+            validate: 断言配置，[表达式, 比较方式, 预期结果] 列表，比较方式支持 相等/包含；
+                表达式为 status_code 时取响应状态码，其余与变量提取的表达式规则相同
+            response: 请求响应对象
+            
+        Raises:
+            AssertionError: 断言不通过时抛出
+            ValueError: 比较方式不支持时抛出
+        """
+        for expression, method, expected in validate or []:
+            actual = self._extract_value(expression, response)
+            if method == '相等':
+                passed = expected == actual
+            elif method == '包含':
+                passed = actual is not None and expected in actual
+            else:
+                raise ValueError(f'断言比较方法{method}不支持')
+            if not passed:
+                raise AssertionError(f'断言失败: {expression} {method} {expected!r}，实际结果: {actual!r}')
+    
+    @staticmethod
+    def _extract_value(expression: str, response: requests.Response) -> Any:
+        """按表达式从响应中取值，未匹配时返回None
+        
+        status_code 取响应状态码，以 $ 开头的表达式按 jsonpath 从响应JSON中提取，其余按正则从响应文本中提取。
+        """
+        if expression == 'status_code':
+            return response.status_code
+        if expression.startswith('$'):
+            result = jsonpath(response.json(), expression)
+            return result[0] if result else None
+        match = re.search(expression, response.text)
+        return match.group(1) if match else None
     
     def _send_request(self, flow: Dict) -> requests.Response:
         """发送HTTP请求
@@ -84,25 +278,36 @@ class PerformanceTestUser(User):
             requests.Response: 请求响应对象
         """
         request_data = self._prepare_request_data(flow)
-        start_time = self.environment.runner.time()
+        name = flow.get('name', request_data['url'])
+        # 迭代的调度延后只计入本次迭代的第一个请求
+        lag, self._pending_lag = self._pending_lag, 0.0
+        start_time = time.perf_counter()
         
         try:
             response = self.session.request(**request_data)
+            elapsed = time.perf_counter() - start_time
+            # 断言不通过时该请求记为失败
+            self._validate_response(flow.get('validate') or (flow.get('request') or {}).get('validate'), response)
             self.environment.events.request_success.fire(
                 request_type=request_data['method'],
-                name=flow.get('name', request_data['url']),
-                response_time=int((self.environment.runner.time() - start_time) * 1000),
+                name=name,
+                response_time=int(elapsed * 1000),
                 response_length=len(response.content)
             )
+            self._record_corrected(request_data['method'], name,
+                                   int((elapsed + lag) * 1000), len(response.content))
             return response
         except Exception as e:
+            elapsed = time.perf_counter() - start_time
             self.environment.events.request_failure.fire(
                 request_type=request_data['method'],
-                name=flow.get('name', request_data['url']),
-                response_time=int((self.environment.runner.time() - start_time) * 1000),
+                name=name,
+                response_time=int(elapsed * 1000),
                 exception=e
             )
-            raise
+            self._record_corrected(request_data['method'], name,
+                                   int((elapsed + lag) * 1000), exception=e)
+            raise mark_reported(e)
     
     def _prepare_request_data(self, flow: Dict) -> Dict:
         """准备请求数据
@@ -113,10 +318,18 @@ class PerformanceTestUser(User):
         Returns:
             Dict: 请求参数字典
         """
-        # 解析变量引用
-        interface = self.variable_manager.parse_variable_references(flow.get('interface', {}))
-        headers = self.variable_manager.parse_variable_references(flow.get('headers', {}))
-        request = self.variable_manager.parse_variable_references(flow.get('request', {}))
+        # 按预编译模板填充变量槽位，未经TestPlan编译的流程在此补充编译
+        template = flow.get('template')
+        if template is None:
+            template = flow['template'] = RequestTemplate({
+                'interface': flow.get('interface', {}),
+                'headers': flow.get('headers', {}),
+                'request': flow.get('request', {})
+            })
+        rendered = template.render(self.variable_manager.get_variable)
+        interface = rendered['interface']
+        headers = rendered['headers']
+        request = rendered['request']
         
         # 组装请求数据
         request_data = {
@@ -132,23 +345,16 @@ class PerformanceTestUser(User):
             
         return request_data
     
-    def _execute_script(self, script: str, response: Optional[requests.Response] = None):
-        """执行脚本
+    def _build_script_namespace(self) -> Dict[str, Any]:
+        """构建脚本可用的工具函数命名空间
         
-        Args:
-            script: 脚本内容
-            response: 可选，请求响应对象
+        每个用户只构建一次，执行脚本时复用。
+        
+        Returns:
+            Dict[str, Any]: 脚本全局命名空间
         """
-        # 定义脚本中可用的工具函数
-        def set_env_var(name: str, value: Any):
-            self.variable_manager.set_env_variable(name, value)
-            
-        def set_temp_var(name: str, value: Any):
-            self.variable_manager.set_temp_variable(name, value)
-            
-        def get_var(name: str) -> Any:
-            return self.variable_manager.get_variable(name)
-            
+        variable_manager = self.variable_manager
+        
         def extract_by_jsonpath(obj: Any, path: str) -> Any:
             result = jsonpath(obj, path)
             return result[0] if result else None
@@ -157,15 +363,32 @@ class PerformanceTestUser(User):
             match = re.search(pattern, text)
             return match.group(1) if match else None
             
-        # 执行脚本
+        return {
+            'set_env_var': variable_manager.set_env_variable,
+            'set_temp_var': variable_manager.set_temp_variable,
+            'get_var': variable_manager.get_variable,
+            'extract_by_jsonpath': extract_by_jsonpath,
+            'extract_by_regex': extract_by_regex
+        }
+    
+    def _execute_script(self, script: Union[str, CodeType, None], response: Optional[requests.Response] = None):
+        """执行脚本
+        
+        Args:
+            script: 预编译的代码对象或脚本内容，为空时不执行
+            response: 可选，请求响应对象
+        """
+        if not script:
+            return
+        if isinstance(script, str):
+            script = compile_script(script)
+            if script is None:
+                return
+            
+        # 浅拷贝命名空间，避免脚本定义的变量在多次执行之间残留
+        namespace = dict(self._script_namespace)
+        namespace['response'] = response
         try:
-            exec(script, {
-                'response': response,
-                'set_env_var': set_env_var,
-                'set_temp_var': set_temp_var,
-                'get_var': get_var,
-                'extract_by_jsonpath': extract_by_jsonpath,
-                'extract_by_regex': extract_by_regex
-            })
+            exec(script, namespace)
         except Exception as e:
-            raise RuntimeError(f'脚本执行错误: {str(e)}')
\ No newline at end of file
+            raise RuntimeError(f'脚本执行错误: {str(e)}')
@@ -0,0 +1,108 @@
+"""吞吐量统计模块
+
+提供基于环形缓冲区的滑动窗口计数器，包括：
+- O(1) 记录请求
+- 固定内存的当前RPS和移动平均计算
+- 按时间片输出吞吐量序列
+"""
+
+import time
+from typing import List, Optional, Tuple
+
+class SlidingWindowCounter:
+    """滑动窗口计数器
+
+    将时间划分为 resolution 秒的时间片，环形缓冲区保存最近 window_size 秒内各时间片的计数。
+    时间片编号为 int(时间戳 / resolution)，槽位被新时间片复用时自动清零。
+    """
+
+    def __init__(self, window_size: float = 10, resolution: float = 1.0):
+        """初始化计数器
+
+        Args:
+            window_size: 窗口长度（秒）
+            resolution: 时间片长度（秒）
+        """
+        if resolution <= 0 or window_size < resolution:
+            raise ValueError('窗口长度必须不小于时间片长度且时间片长度为正数')
+        self.window_size = window_size
+        self.resolution = resolution
+        self.slot_count = int(round(window_size / resolution))
+        self._counts: List[int] = [0] * self.slot_count
+        self._slot_ids: List[int] = [-1] * self.slot_count
+        self._first_slot: Optional[int] = None
+
+    def _slot_id(self, now: float) -> int:
+        return int(now / self.resolution)
+
+    def record(self, count: int = 1, now: Optional[float] = None) -> None:
+        """记录请求
+
+        Args:
+            count: 请求数
+            now: 可选，记录时间戳，默认当前时间
+        """
+        slot_id = self._slot_id(time.time() if now is None else now)
+        position = slot_id % self.slot_count
+        if self._slot_ids[position] != slot_id:
+            self._slot_ids[position] = slot_id
+            self._counts[position] = 0
+        self._counts[position] += count
+        if self._first_slot is None:
+            self._first_slot = slot_id
+
+    def _sum(self, slots: int, now: float) -> Tuple[int, float]:
+        """统计最近 slots 个时间片（含当前时间片）的请求总数和覆盖时长"""
+        current = self._slot_id(now)
+        oldest = current - slots + 1
+        total = 0
+        for position in range(self.slot_count):
+            slot_id = self._slot_ids[position]
+            if oldest <= slot_id <= current:
+                total += self._counts[position]
+        if self._first_slot is None:
+            return 0, 0.0
+        # 覆盖时长不早于首次记录时间，当前时间片按已经过的部分计算
+        start = max(oldest, self._first_slot) * self.resolution
+        return total, max(now - start, 0.0)
+
+    def rate(self, now: Optional[float] = None) -> float:
+        """获取整个窗口内的平均每秒请求数（当前RPS）
+
+        Args:
+            now: 可选，计算时间戳，默认当前时间
+        """
+        return self.moving_average(self.window_size, now)
+
+    def moving_average(self, seconds: float, now: Optional[float] = None) -> float:
+        """获取最近 seconds 秒内的平均每秒请求数
+
+        Args:
+            seconds: 平均时长（秒），不超过窗口长度
+            now: 可选，计算时间戳，默认当前时间
+        """
+        now = time.time() if now is None else now
+        slots = max(1, min(self.slot_count, int(round(seconds / self.resolution))))
+        total, duration = self._sum(slots, now)
+        if duration <= 0:
+            return 0.0
+        return total / duration
+
+    def series(self, now: Optional[float] = None) -> List[Tuple[float, float]]:
+        """获取窗口内已结束时间片的吞吐量序列
+
+        Args:
+            now: 可选，计算时间戳，默认当前时间
+
+        Returns:
+            List[Tuple[float, float]]: (时间片起始时间戳, 每秒请求数) 列表，按时间升序
+        """
+        current = self._slot_id(time.time() if now is None else now)
+        result = []
+        for slot_id in range(current - self.slot_count + 1, current):
+            if self._first_slot is None or slot_id < self._first_slot:
+                continue
+            position = slot_id % self.slot_count
+            count = self._counts[position] if self._slot_ids[position] == slot_id else 0
+            result.append((slot_id * self.resolution, count / self.resolution))
+        return result
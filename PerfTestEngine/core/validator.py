@@ -8,6 +8,7 @@
 
 from typing import Dict, Any
 from abc import ABC, abstractmethod
+from .controller import TARGET_METRICS
 
 class ConfigValidator(ABC):
     """配置验证器基类
@@ -124,6 +125,146 @@ class ErrorRateStrategyValidator(ConfigValidator):
         if 'duration' in config and (not isinstance(config['duration'], (int, float)) or config['duration'] <= 0):
             raise ValueError('测试总持续时间必须是正数')
             
+class ConstantArrivalRateStrategyValidator(ConfigValidator):
+    """固定到达率模式配置验证器"""
+    
+    def validate(self, config: Dict[str, Any]) -> None:
+        """验证固定到达率模式配置
+        
+        Args:
+            config: 配置字典，必须包含以下字段：
+                - vus: 最大并发用户数
+                - rate: 目标到达率(次/秒)
+                - duration: 测试持续时间(秒)
+                - pre_allocated_vus: 可选，预分配用户数
+                
+        Raises:
+            ValueError: 当配置无效时抛出
+        """
+        for field in ['vus', 'rate', 'duration']:
+            if field not in config:
+                raise ValueError(f'固定到达率模式配置缺少必需参数：{field}')
+                
+        if not isinstance(config['vus'], int) or config['vus'] <= 0:
+            raise ValueError('最大并发用户数必须是正整数')
+            
+        if not isinstance(config['rate'], (int, float)) or config['rate'] <= 0:
+            raise ValueError('目标到达率必须是正数')
+            
+        if not isinstance(config['duration'], (int, float)) or config['duration'] <= 0:
+            raise ValueError('测试持续时间必须是正数')
+            
+        _validate_pre_allocated_vus(config)
+        
+class RampingArrivalRateStrategyValidator(ConfigValidator):
+    """阶梯到达率模式配置验证器"""
+    
+    def validate(self, config: Dict[str, Any]) -> None:
+        """验证阶梯到达率模式配置
+        
+        Args:
+            config: 配置字典，必须包含以下字段：
+                - vus: 最大并发用户数
+                - stages: 阶段列表，每项包含 target 和 duration
+                - start_rate: 可选，初始到达率
+                - pre_allocated_vus: 可选，预分配用户数
+                
+        Raises:
+            ValueError: 当配置无效时抛出
+        """
+        for field in ['vus', 'stages']:
+            if field not in config:
+                raise ValueError(f'阶梯到达率模式配置缺少必需参数：{field}')
+                
+        if not isinstance(config['vus'], int) or config['vus'] <= 0:
+            raise ValueError('最大并发用户数必须是正整数')
+            
+        if not isinstance(config['stages'], list) or not config['stages']:
+            raise ValueError('阶段列表不能为空')
+            
+        for stage in config['stages']:
+            if not isinstance(stage.get('target'), (int, float)) or stage['target'] < 0:
+                raise ValueError('阶段目标到达率必须是非负数')
+            if not isinstance(stage.get('duration'), (int, float)) or stage['duration'] <= 0:
+                raise ValueError('阶段持续时间必须是正数')
+                
+        if 'start_rate' in config and (not isinstance(config['start_rate'], (int, float)) or config['start_rate'] < 0):
+            raise ValueError('初始到达率必须是非负数')
+            
+        _validate_pre_allocated_vus(config)
+        
+class AdaptiveStrategyValidator(ConfigValidator):
+    """自适应模式配置验证器"""
+    
+    def validate(self, config: Dict[str, Any]) -> None:
+        """验证自适应模式配置
+        
+        Args:
+            config: 配置字典，必须包含以下字段：
+                - vus: 最大并发用户数
+                - duration: 测试持续时间(秒)
+                - target_metrics: 目标指标，指标名到目标值的映射
+                - control: 可选，users 或 rate，为 rate 时必须包含 max_rate
+                - algorithm: 可选，aimd 或 pid
+                - interval: 可选，控制周期(秒)
+                - initial_users: 可选，初始用户数
+                
+        Raises:
+            ValueError: 当配置无效时抛出
+        """
+        for field in ['vus', 'duration', 'target_metrics']:
+            if field not in config:
+                raise ValueError(f'自适应模式配置缺少必需参数：{field}')
+                
+        if not isinstance(config['vus'], int) or config['vus'] <= 0:
+            raise ValueError('最大并发用户数必须是正整数')
+            
+        if not isinstance(config['duration'], (int, float)) or config['duration'] <= 0:
+            raise ValueError('测试持续时间必须是正数')
+            
+        targets = config['target_metrics']
+        if not isinstance(targets, dict) or not targets:
+            raise ValueError('目标指标不能为空')
+        for metric, target in targets.items():
+            if metric not in TARGET_METRICS:
+                raise ValueError(f'不支持的目标指标：{metric}，可选值：{", ".join(TARGET_METRICS)}')
+            if not isinstance(target, (int, float)) or target < 0:
+                raise ValueError(f'目标指标 {metric} 的目标值必须是非负数')
+                
+        if config.get('control', 'users') not in ('users', 'rate'):
+            raise ValueError('调节对象必须是 users 或 rate')
+            
+        if config.get('algorithm', 'aimd') not in ('aimd', 'pid'):
+            raise ValueError('控制算法必须是 aimd 或 pid')
+            
+        if 'interval' in config and (not isinstance(config['interval'], (int, float)) or config['interval'] <= 0):
+            raise ValueError('控制周期必须是正数')
+            
+        if 'initial_users' in config and (
+                not isinstance(config['initial_users'], int) or not 0 < config['initial_users'] <= config['vus']):
+            raise ValueError('初始用户数必须是不大于最大并发用户数的正整数')
+            
+        if config.get('control') == 'rate':
+            if not isinstance(config.get('max_rate'), (int, float)) or config['max_rate'] <= 0:
+                raise ValueError('调节到达率时必须设置正数的最大到达率：max_rate')
+            if 'initial_rate' in config and (
+                    not isinstance(config['initial_rate'], (int, float)) or config['initial_rate'] <= 0):
+                raise ValueError('初始到达率必须是正数')
+            _validate_pre_allocated_vus(config)
+        
+def _validate_pre_allocated_vus(config: Dict[str, Any]) -> None:
+    """验证到达率模式的预分配用户数
+    
+    Raises:
+        ValueError: 当配置无效时抛出
+    """
+    if 'pre_allocated_vus' not in config:
+        return
+    if not isinstance(config['pre_allocated_vus'], int) or config['pre_allocated_vus'] <= 0:
+        raise ValueError('预分配用户数必须是正整数')
+    if config['pre_allocated_vus'] > config['vus']:
+        raise ValueError('预分配用户数不能大于最大并发用户数')
+        
 class ValidatorFactory:
     """验证器工厂类
     
@@ -133,7 +274,10 @@ class ValidatorFactory:
     _validators = {
         'concurrent': ConcurrentStrategyValidator,
         'step': StepStrategyValidator,
-        'error_rate': ErrorRateStrategyValidator
+        'error_rate': ErrorRateStrategyValidator,
+        'constant_arrival_rate': ConstantArrivalRateStrategyValidator,
+        'ramping_arrival_rate': RampingArrivalRateStrategyValidator,
+        'adaptive': AdaptiveStrategyValidator
     }
     
     @classmethod
@@ -141,7 +285,8 @@ class ValidatorFactory:
         """创建验证器实例
         
         Args:
-            strategy_type: 策略类型，可选值：'concurrent'、'step'、'error_rate'
+            strategy_type: 策略类型，可选值：'concurrent'、'step'、'error_rate'、
+                'constant_arrival_rate'、'ramping_arrival_rate'、'adaptive'
             
         Returns:
             ConfigValidator: 验证器实例
@@ -7,8 +7,9 @@
 """
 
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
-from Performance.models import PerformanceTestPlan, PerformanceReport
+from Performance.models import PerformanceTestPlan, PerformanceReport, PerformanceError, PerformanceMetrics
 import time
 from .core import PerformanceTestEngine
 
@@ -24,6 +25,8 @@ def run_performance_test(env_id, plan_id, config_id=None):
     Returns:
         bool: 测试执行结果，成功返回True，失败返回False
     """
+    plan = None
+    engine = None
     try:
         plan = PerformanceTestPlan.objects.get(id=plan_id)
         
@@ -48,6 +51,10 @@ def run_performance_test(env_id, plan_id, config_id=None):
         
         # 初始化测试引擎
         engine = PerformanceTestEngine()
+        # 测试过程中已关闭的时间桶由数据存储定期批量写入，测试结束时再写入剩余部分
+        engine.rollup_writer = lambda buckets: PerformanceMetrics.objects.bulk_write(plan, buckets)
+        # 登记运行中的引擎，WebSocket推送按计划ID查找
+        engine.register_running(plan_id)
         
         # 获取业务流关联的测试用例
         test_flows = []
@@ -129,7 +136,19 @@ def run_performance_test(env_id, plan_id, config_id=None):
             global_variables=config.global_variables or {},
             think_time=config.think_time,  # 思考时间
             max_retries=config.max_retries,  # 最大重试次数
-            retry_interval=config.retry_interval  # 重试间隔
+            retry_interval=config.retry_interval,  # 重试间隔
+            execution_config=config.execution_config or {},  # 执行配置(engine_mode等)
+            distribution={  # 分布式执行配置
+                'control_mode': config.control_mode,
+                'node_count': config.node_count,
+                'node_distribution': config.node_distribution or {},
+                'load_balance_strategy': config.load_balance_strategy,
+                'local_workers': (config.execution_config or {}).get('local_workers', False),
+                # 协调节点监听地址和认证密钥，远程执行节点使用相同配置连接
+                'bind_host': settings.PERFORMANCE_TEST['LOCUST_MASTER_HOST'],
+                'bind_port': settings.PERFORMANCE_TEST['LOCUST_MASTER_PORT'],
+                'authkey': settings.PERFORMANCE_TEST.get('DISTRIBUTED_AUTHKEY')
+            }
         )
         
         # 根据测试模式配置参数
@@ -190,6 +209,26 @@ def run_performance_test(env_id, plan_id, config_id=None):
                 # 如果用户数收敛或达到最大时间，结束测试
                 if max_users - min_users <= 1 or (config.duration and time.time() - start_time >= config.duration):
                     break
+        elif config.test_mode == 'adaptive':
+            # 自适应模式: 闭环调节用户数或到达率，保持目标响应时间/吞吐量/错误率
+            if not config.adaptive_target:
+                raise ValueError('自适应模式参数不完整')
+            engine.start_test('adaptive', {
+                'vus': config.vus,            # 最大并发用户数
+                'duration': config.duration,  # 持续时间
+                **config.adaptive_target      # 目标指标和控制参数
+            })
+        elif config.test_mode in ('constant_arrival_rate', 'ramping_arrival_rate'):
+            # 到达率模式: 按目标到达率放行迭代，预分配用户耗尽时记录丢弃的迭代
+            if not config.arrival_rate_config:
+                raise ValueError('到达率模式参数不完整')
+            engine.start_test(config.test_mode, {
+                'vus': config.vus,            # 最大并发用户数
+                'duration': config.duration,  # 持续时间（阶梯到达率模式按阶段时长计算）
+                **config.arrival_rate_config  # 到达率/阶段列表和预分配用户数
+            })
+        else:
+            raise ValueError(f'不支持的压测模式: {config.test_mode}')
 
         # 收集测试数据
         stats = engine.get_test_stats()
@@ -218,6 +257,17 @@ def run_performance_test(env_id, plan_id, config_id=None):
                 'variables': error.get('variables')                   # 相关变量
             })
         
+        # 按错误指纹分组写入错误记录，每组只保存采样示例
+        if engine.performance_stats:
+            PerformanceError.objects.bulk_create([
+                PerformanceError(plan=plan, **record)
+                for record in engine.performance_stats.get_error_records()
+            ])
+        
+        # 批量写入时间桶指标数据
+        if engine.performance_stats:
+            PerformanceMetrics.objects.bulk_write(plan, engine.performance_stats.flush_rollups())
+        
         # 生成测试总结
         report.summary = {
             'total_requests': stats.get('num_requests', 0),          # 总请求数
@@ -243,6 +293,13 @@ def run_performance_test(env_id, plan_id, config_id=None):
             plan.status = 'failed'
             plan.save()
         return False
+    finally:
+        if engine:
+            # 无论测试成功与否都停止引擎：停止后台刷写线程并将剩余数据写入MySQL
+            try:
+                engine.stop_test()
+            finally:
+                engine.unregister_running()
 
 @shared_task
 def stop_performance_test(plan_id):
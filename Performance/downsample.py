@@ -0,0 +1,131 @@
+"""性能指标降采样模块
+
+为报告趋势图提供时间序列降采样，包括：
+- LTTB（Largest-Triangle-Three-Buckets）算法，保留曲线形状
+- 按时间槽的最小/最大值降采样，时间槽聚合由 PerformanceMetricsQuerySet.minmax 在数据库内完成
+- 按时间槽的汇总降采样，时间槽聚合由 PerformanceMetricsQuerySet.downsample 在数据库内完成
+"""
+
+from typing import Iterable, List, Sequence, Tuple
+
+# 支持降采样的指标列
+SERIES_FIELDS = (
+    'requests', 'errors', 'bytes', 'users', 'rps', 'error_rate', 'avg_response_time',
+    'min_response_time', 'max_response_time', 'p50', 'p90', 'p95', 'p99'
+)
+
+# 指标列到 PerformanceMetricsQuerySet.downsample 汇总结果列的映射
+AGGREGATE_COLUMNS = {
+    'requests': 'requests_sum',
+    'errors': 'errors_sum',
+    'bytes': 'bytes_sum',
+    'users': 'users_max',
+    'rps': 'rps_avg',
+    'error_rate': 'error_rate_avg',
+    'avg_response_time': 'avg_response_time_avg',
+    'min_response_time': 'min_response_time_min',
+    'max_response_time': 'max_response_time_max',
+    'p50': 'p50_max',
+    'p90': 'p90_max',
+    'p95': 'p95_max',
+    'p99': 'p99_max'
+}
+
+def lttb(points: Sequence[Tuple[float, float]], threshold: int) -> List[Tuple[float, float]]:
+    """使用LTTB算法将序列降采样到 threshold 个点
+
+    Args:
+        points: 按时间升序排列的 (时间戳, 值) 序列
+        threshold: 目标点数
+
+    Returns:
+        List[Tuple[float, float]]: 降采样后的序列，保留首尾点
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (count - 2) / (threshold - 2)
+    selected = 0
+    for index in range(threshold - 2):
+        # 下一个桶的平均点作为三角形的第三个顶点
+        next_start = int((index + 1) * bucket_size) + 1
+        next_end = min(int((index + 2) * bucket_size) + 1, count)
+        next_points = points[next_start:next_end]
+        avg_x = sum(point[0] for point in next_points) / len(next_points)
+        avg_y = sum(point[1] for point in next_points) / len(next_points)
+
+        # 当前桶中与上一个选中点、下一个桶平均点构成最大三角形面积的点
+        start = int(index * bucket_size) + 1
+        end = int((index + 1) * bucket_size) + 1
+        point_x, point_y = points[selected]
+        max_area = -1.0
+        for position in range(start, end):
+            x, y = points[position]
+            area = abs((point_x - avg_x) * (y - point_y) - (point_x - x) * (avg_y - point_y))
+            if area > max_area:
+                max_area = area
+                candidate = position
+        sampled.append(points[candidate])
+        selected = candidate
+
+    sampled.append(points[-1])
+    return sampled
+
+def lttb_series(queryset, fields: Iterable[str], threshold: int) -> dict:
+    """一次读取指标行，对每个指标分别做LTTB降采样
+
+    Args:
+        queryset: 已按时间升序排列的 PerformanceMetrics 查询集
+        fields: 指标列名列表
+        threshold: 每个指标的目标点数
+
+    Returns:
+        dict: 指标名到 [[时间戳, 值], ...] 的映射
+    """
+    fields = list(fields)
+    columns = {field: [] for field in fields}
+    for row in queryset.values_list('timestamp', *fields).iterator():
+        timestamp = row[0]
+        for field, value in zip(fields, row[1:]):
+            if value is not None:
+                columns[field].append((timestamp, value))
+    return {field: [list(point) for point in lttb(points, threshold)] for field, points in columns.items()}
+
+def minmax_series(rows, fields: Iterable[str]) -> dict:
+    """将 PerformanceMetricsQuerySet.minmax 的分组结果转换为各指标的序列
+
+    Args:
+        rows: PerformanceMetricsQuerySet.minmax 的查询结果
+        fields: 指标列名列表
+
+    Returns:
+        dict: 指标名到 [[时间槽起始时间戳, 最小值, 最大值], ...] 的映射
+    """
+    fields = list(fields)
+    series = {field: [] for field in fields}
+    for row in rows:
+        for field in fields:
+            if row[f'{field}_min'] is not None:
+                series[field].append([row['slot'], row[f'{field}_min'], row[f'{field}_max']])
+    return series
+
+def aggregate_series(rows, fields: Iterable[str]) -> dict:
+    """将 PerformanceMetricsQuerySet.downsample 的分组结果转换为各指标的序列
+
+    Args:
+        rows: PerformanceMetricsQuerySet.downsample 的查询结果
+        fields: 指标列名列表
+
+    Returns:
+        dict: 指标名到 [[时间槽起始时间戳, 汇总值], ...] 的映射
+    """
+    fields = list(fields)
+    series = {field: [] for field in fields}
+    for row in rows:
+        for field in fields:
+            value = row[AGGREGATE_COLUMNS[field]]
+            if value is not None:
+                series[field].append([row['slot'], value])
+    return series
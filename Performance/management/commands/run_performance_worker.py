@@ -0,0 +1,41 @@
+"""性能测试执行节点命令
+
+在压测机上启动分布式执行节点，连接协调节点（Celery执行性能测试任务的进程）并执行下发的用户：
+
+    python manage.py run_performance_worker --host 10.0.0.1 --port 5557 --authkey <密钥>
+
+地址和密钥默认取 settings.PERFORMANCE_TEST 中的 LOCUST_MASTER_HOST、LOCUST_MASTER_PORT 和 DISTRIBUTED_AUTHKEY。
+"""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from PerfTestEngine.core.distributed import run_worker
+
+class Command(BaseCommand):
+    help = '启动性能测试分布式执行节点'
+
+    def add_arguments(self, parser):
+        config = settings.PERFORMANCE_TEST
+        parser.add_argument('--host', default=config['LOCUST_MASTER_HOST'], help='协调节点地址')
+        parser.add_argument('--port', type=int, default=config['LOCUST_MASTER_PORT'], help='协调节点端口')
+        parser.add_argument('--authkey', default=config.get('DISTRIBUTED_AUTHKEY'), help='认证密钥')
+        parser.add_argument('--name', default=None, help='节点名称，对应节点分布配置中的名称，默认 主机名-进程号')
+        parser.add_argument('--report-interval', type=float, default=1.0, help='统计上报间隔(秒)')
+        parser.add_argument('--retry-interval', type=float, default=5.0, help='协调节点未就绪时的重连间隔(秒)')
+        parser.add_argument('--once', action='store_true', help='执行一次测试后退出，默认测试结束后等待下一次测试')
+
+    def handle(self, *args, **options):
+        if not options['authkey']:
+            raise CommandError('未配置认证密钥，请通过 --authkey 或 PERFORMANCE_DISTRIBUTED_AUTHKEY 设置')
+        address = (options['host'], options['port'])
+        self.stdout.write(f'执行节点启动，协调节点地址: {address[0]}:{address[1]}')
+        while True:
+            try:
+                run_worker(address, options['authkey'], options['name'], options['report_interval'])
+                self.stdout.write('测试结束，执行节点已断开')
+                if options['once']:
+                    return
+            except ConnectionRefusedError:
+                pass
+            time.sleep(options['retry_interval'])
@@ -0,0 +1,91 @@
+# Generated by Django 4.2 on 2026-10-17 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Performance', '0002_auto_20250213_2257'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='performancemetrics',
+            name='Performance_plan_id_813432_idx',
+        ),
+        migrations.RemoveField(
+            model_name='performancemetrics',
+            name='cpu_usage',
+        ),
+        migrations.RemoveField(
+            model_name='performancemetrics',
+            name='error_count',
+        ),
+        migrations.RemoveField(
+            model_name='performancemetrics',
+            name='memory_usage',
+        ),
+        migrations.RemoveField(
+            model_name='performancemetrics',
+            name='network_io',
+        ),
+        migrations.RemoveField(
+            model_name='performancemetrics',
+            name='response_time',
+        ),
+        migrations.AddField(
+            model_name='performancemetrics',
+            name='avg_response_time',
+            field=models.FloatField(blank=True, null=True, verbose_name='平均响应时间'),
+        ),
+        migrations.AddField(
+            model_name='performancemetrics',
+            name='bytes',
+            field=models.BigIntegerField(default=0, verbose_name='响应字节数'),
+        ),
+        migrations.AddField(
+            model_name='performancemetrics',
+            name='errors',
+            field=models.IntegerField(default=0, verbose_name='错误数'),
+        ),
+        migrations.AddField(
+            model_name='performancemetrics',
+            name='max_response_time',
+            field=models.FloatField(blank=True, null=True, verbose_name='最大响应时间'),
+        ),
+        migrations.AddField(
+            model_name='performancemetrics',
+            name='metrics_data',
+            field=models.JSONField(blank=True, help_text='包含响应时间直方图等不需要查询的指标', null=True, verbose_name='扩展指标数据'),
+        ),
+        migrations.AddField(
+            model_name='performancemetrics',
+            name='min_response_time',
+            field=models.FloatField(blank=True, null=True, verbose_name='最小响应时间'),
+        ),
+        migrations.AddField(
+            model_name='performancemetrics',
+            name='p99',
+            field=models.FloatField(blank=True, null=True, verbose_name='P99响应时间'),
+        ),
+        migrations.AddField(
+            model_name='performancemetrics',
+            name='requests',
+            field=models.IntegerField(default=0, verbose_name='请求数'),
+        ),
+        migrations.AddField(
+            model_name='performancemetrics',
+            name='users',
+            field=models.IntegerField(default=0, verbose_name='并发用户数'),
+        ),
+        migrations.AlterField(
+            model_name='performancemetrics',
+            name='rps',
+            field=models.FloatField(default=0, verbose_name='每秒请求数'),
+        ),
+        migrations.AddIndex(
+            model_name='performancemetrics',
+            index=models.Index(fields=['plan', 'aggregation_period', 'timestamp'], name='Performance_plan_id_d93d21_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-17 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Performance', '0003_performancemetrics_columns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='performanceconfig',
+            name='arrival_rate_config',
+            field=models.JSONField(blank=True, help_text='包含到达率(rate)或阶段列表(stages)、初始到达率、预分配用户数等', null=True, verbose_name='到达率模式参数'),
+        ),
+        migrations.AlterField(
+            model_name='performanceconfig',
+            name='test_mode',
+            field=models.CharField(choices=[('concurrent', '并发模式'), ('step', '阶梯模式'), ('error_rate', '错误率模式'), ('adaptive', '自适应模式'), ('constant_arrival_rate', '固定到达率模式'), ('ramping_arrival_rate', '阶梯到达率模式')], default='concurrent', max_length=30, verbose_name='压测模式'),
+        ),
+    ]
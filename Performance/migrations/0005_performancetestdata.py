@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-17 10:52
+
+from django.db import migrations, models
+
+TABLE = 'performance_test_data'
+UNIQUE_INDEX = 'performance_test_data_test_id_data_key_uniq'
+
+
+def create_or_upgrade_table(apps, schema_editor):
+    """创建 performance_test_data 表；旧版本手工创建的表补充 data_key 列和 (test_id, data_key) 唯一索引"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if TABLE not in connection.introspection.table_names(cursor):
+            schema_editor.execute(
+                f'CREATE TABLE {TABLE} ('
+                'id BIGINT AUTO_INCREMENT PRIMARY KEY, '
+                'test_id VARCHAR(64) NOT NULL, '
+                'data_key VARCHAR(191) NULL, '
+                'timestamp DATETIME(6) NOT NULL, '
+                'data LONGBLOB NOT NULL, '
+                f'UNIQUE KEY {UNIQUE_INDEX} (test_id, data_key)'
+                ') DEFAULT CHARSET=utf8mb4'
+            )
+            return
+        columns = {column.name for column in connection.introspection.get_table_description(cursor, TABLE)}
+        constraints = connection.introspection.get_constraints(cursor, TABLE)
+    if 'data_key' not in columns:
+        # 旧数据没有数据键，保留为NULL，唯一索引不约束NULL值
+        schema_editor.execute(f'ALTER TABLE {TABLE} ADD COLUMN data_key VARCHAR(191) NULL AFTER test_id')
+    # 编码后的采样数据为二进制，旧表的JSON/TEXT列改为 LONGBLOB，旧JSON文本仍可由 decode_sample 解码
+    schema_editor.execute(f'ALTER TABLE {TABLE} MODIFY data LONGBLOB NOT NULL')
+    if UNIQUE_INDEX not in constraints:
+        schema_editor.execute(f'ALTER TABLE {TABLE} ADD UNIQUE KEY {UNIQUE_INDEX} (test_id, data_key)')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Performance', '0004_performanceconfig_arrival_rate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceTestData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('test_id', models.CharField(max_length=64, verbose_name='测试标识')),
+                ('data_key', models.CharField(max_length=191, null=True, verbose_name='数据键')),
+                ('timestamp', models.DateTimeField(verbose_name='采样时间')),
+                ('data', models.BinaryField(help_text='codec 编码的采样数据，旧数据为JSON文本', verbose_name='采样数据')),
+            ],
+            options={
+                'verbose_name': '性能测试采样数据',
+                'verbose_name_plural': '性能测试采样数据',
+                'db_table': 'performance_test_data',
+                'managed': False,
+                'unique_together': {('test_id', 'data_key')},
+            },
+        ),
+        migrations.RunPython(create_or_upgrade_table, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
+from django.db.models.functions import Floor, NullIf
 from users.models import User
 from Testproject.models import TestProject
 from Scenes.models import TestScenes
@@ -39,11 +40,13 @@ class PerformanceConfig(models.Model):
         ('central', '集中模式'),  # 分布式执行
         ('distributed', '分布式模式')  # 多节点协同执行
     ], default='single', verbose_name='控制模式')
-    test_mode = models.CharField(max_length=20, choices=[
+    test_mode = models.CharField(max_length=30, choices=[
         ('concurrent', '并发模式'),  # 固定并发用户数
         ('step', '阶梯模式'),        # 逐步增加并发用户
         ('error_rate', '错误率模式'),  # 基于错误率的动态调整
-        ('adaptive', '自适应模式')    # 基于系统响应的自适应调整
+        ('adaptive', '自适应模式'),    # 基于系统响应的自适应调整
+        ('constant_arrival_rate', '固定到达率模式'),  # 按固定速率放行迭代
+        ('ramping_arrival_rate', '阶梯到达率模式')    # 按阶段调整到达率
     ], default='concurrent', verbose_name='压测模式')
     vus = models.IntegerField(verbose_name='并发用户数', validators=[MinValueValidator(1)])
     duration = models.IntegerField(verbose_name='持续时间(秒)', validators=[MinValueValidator(1)])
@@ -52,6 +55,8 @@ class PerformanceConfig(models.Model):
     step_time = models.IntegerField(null=True, blank=True, verbose_name='阶梯模式每阶梯持续时间', validators=[MinValueValidator(1)])
     error_threshold = models.FloatField(null=True, blank=True, verbose_name='错误率模式阈值', validators=[MinValueValidator(0.0)])
     adaptive_target = models.JSONField(null=True, blank=True, verbose_name='自适应模式目标参数')
+    arrival_rate_config = models.JSONField(null=True, blank=True, verbose_name='到达率模式参数',
+                                           help_text='包含到达率(rate)或阶段列表(stages)、初始到达率、预分配用户数等')
     env = models.ForeignKey('Testproject.TestEnv', on_delete=models.CASCADE, verbose_name='测试环境')
     protocol = models.CharField(max_length=20, choices=[
         ('http', 'HTTP/HTTPS'),
@@ -90,27 +95,150 @@ class PerformanceConfig(models.Model):
             raise ValidationError({'error_threshold': '错误率模式必须设置阈值'})
         if self.test_mode == 'adaptive' and not self.adaptive_target:
             raise ValidationError({'adaptive_target': '自适应模式必须设置目标参数'})
+        if self.test_mode in ('constant_arrival_rate', 'ramping_arrival_rate') and not self.arrival_rate_config:
+            raise ValidationError({'arrival_rate_config': '到达率模式必须设置到达率参数'})
 
     class Meta:
         verbose_name = '性能测试配置'
         verbose_name_plural = verbose_name
 
+class PerformanceMetricsQuerySet(models.QuerySet):
+    """性能指标查询集
+    提供时间范围查询、数据库内降采样和批量写入
+    """
+
+    def time_range(self, plan, aggregation_period='1s', start=None, end=None):
+        """按计划、聚合周期和时间范围筛选指标，按时间升序排列"""
+        queryset = self.filter(plan=plan, aggregation_period=aggregation_period)
+        if start is not None:
+            queryset = queryset.filter(timestamp__gte=start)
+        if end is not None:
+            queryset = queryset.filter(timestamp__lte=end)
+        return queryset.order_by('timestamp')
+
+    def _slots(self, interval):
+        """按 interval 秒的时间槽分组，slot 为时间槽起始时间戳"""
+        slot = models.ExpressionWrapper(
+            Floor(models.F('timestamp') / interval) * interval,
+            output_field=models.BigIntegerField()
+        )
+        # 清除原有排序，否则排序字段会加入 GROUP BY 导致无法按时间槽分组
+        return self.order_by().annotate(slot=slot).values('slot')
+
+    def downsample(self, interval):
+        """按 interval 秒分组在数据库内聚合，返回每组的汇总指标
+
+        请求数、错误数、字节数求和；平均响应时间按请求数加权平均，RPS为总请求数除以 interval，
+        错误率为总错误数除以总请求数；百分位和并发用户数取最大值
+        """
+        return self._slots(interval).annotate(
+            requests_sum=models.Sum('requests'),
+            errors_sum=models.Sum('errors'),
+            bytes_sum=models.Sum('bytes'),
+            rps_avg=models.ExpressionWrapper(
+                models.Sum('requests') * 1.0 / interval, output_field=models.FloatField()
+            ),
+            error_rate_avg=models.ExpressionWrapper(
+                models.Sum('errors') * 1.0 / NullIf(models.Sum('requests'), 0),
+                output_field=models.FloatField()
+            ),
+            avg_response_time_avg=models.ExpressionWrapper(
+                models.Sum(models.F('avg_response_time') * models.F('requests'), output_field=models.FloatField())
+                / NullIf(models.Sum('requests'), 0),
+                output_field=models.FloatField()
+            ),
+            min_response_time_min=models.Min('min_response_time'),
+            max_response_time_max=models.Max('max_response_time'),
+            p50_max=models.Max('p50'),
+            p90_max=models.Max('p90'),
+            p95_max=models.Max('p95'),
+            p99_max=models.Max('p99'),
+            users_max=models.Max('users')
+        ).order_by('slot')
+
+    def minmax(self, fields, interval):
+        """按 interval 秒分组在数据库内计算指定指标的最小值和最大值
+
+        每组结果包含 slot 以及各指标的 <指标>_min、<指标>_max 列
+        """
+        aggregates = {}
+        for field in fields:
+            aggregates[f'{field}_min'] = models.Min(field)
+            aggregates[f'{field}_max'] = models.Max(field)
+        return self._slots(interval).annotate(**aggregates).order_by('slot')
+
+    def bulk_write(self, plan, buckets, batch_size=1000):
+        """批量写入时间桶聚合结果
+
+        Args:
+            plan: 所属计划
+            buckets: 时间桶聚合结果列表（RollupAggregator 输出格式）
+            batch_size: 每批写入条数
+
+        Returns:
+            int: 写入条数
+        """
+        objs = [PerformanceMetrics.from_bucket(plan, bucket) for bucket in buckets]
+        self.bulk_create(objs, batch_size=batch_size)
+        return len(objs)
+
 class PerformanceMetrics(models.Model):
     """性能指标模型
-    用于存储性能测试过程中收集的各项性能指标数据
+    按时间桶存储性能测试过程中收集的各项性能指标，常用指标使用独立列以便在数据库内查询和聚合，
+    响应时间直方图等扩展数据存储在 metrics_data 中
     """
     plan = models.ForeignKey(PerformanceTestPlan, on_delete=models.CASCADE, related_name='metrics', verbose_name='所属计划')
     timestamp = models.BigIntegerField(verbose_name='时间戳')
-    metrics_data = models.JSONField(verbose_name='性能指标数据', help_text='包含响应时间、RPS、错误率、系统资源使用等指标')
     shard_key = models.CharField(max_length=50, verbose_name='数据分片键')
     aggregation_period = models.CharField(max_length=20, null=True, blank=True, verbose_name='聚合周期')
+    requests = models.IntegerField(default=0, verbose_name='请求数')
+    errors = models.IntegerField(default=0, verbose_name='错误数')
+    bytes = models.BigIntegerField(default=0, verbose_name='响应字节数')
+    users = models.IntegerField(default=0, verbose_name='并发用户数')
+    rps = models.FloatField(default=0, verbose_name='每秒请求数')
+    error_rate = models.FloatField(default=0, verbose_name='错误率')
+    avg_response_time = models.FloatField(null=True, blank=True, verbose_name='平均响应时间')
+    min_response_time = models.FloatField(null=True, blank=True, verbose_name='最小响应时间')
+    max_response_time = models.FloatField(null=True, blank=True, verbose_name='最大响应时间')
+    p50 = models.FloatField(null=True, blank=True, verbose_name='P50响应时间')
+    p90 = models.FloatField(null=True, blank=True, verbose_name='P90响应时间')
+    p95 = models.FloatField(null=True, blank=True, verbose_name='P95响应时间')
+    p99 = models.FloatField(null=True, blank=True, verbose_name='P99响应时间')
+    metrics_data = models.JSONField(null=True, blank=True, verbose_name='扩展指标数据', help_text='包含响应时间直方图等不需要查询的指标')
     created_time = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
 
+    objects = PerformanceMetricsQuerySet.as_manager()
+
+    @classmethod
+    def from_bucket(cls, plan, bucket):
+        """由时间桶聚合结果构造指标记录"""
+        response_time = bucket.get('response_time') or {}
+        return cls(
+            plan=plan,
+            timestamp=bucket['timestamp'],
+            shard_key=bucket.get('shard_key', 'default'),
+            aggregation_period=bucket.get('aggregation_period'),
+            requests=bucket.get('count', 0),
+            errors=bucket.get('errors', 0),
+            bytes=bucket.get('bytes', 0),
+            users=bucket.get('users', 0),
+            rps=bucket.get('rps', 0),
+            error_rate=bucket.get('error_rate', 0),
+            avg_response_time=response_time.get('avg'),
+            min_response_time=response_time.get('min'),
+            max_response_time=response_time.get('max'),
+            p50=response_time.get('median'),
+            p90=response_time.get('p90'),
+            p95=response_time.get('p95'),
+            p99=response_time.get('p99'),
+            metrics_data={'histogram': bucket['histogram']} if bucket.get('histogram') else None
+        )
+
     class Meta:
         verbose_name = '性能指标'
         verbose_name_plural = verbose_name
         indexes = [
-            models.Index(fields=['plan', 'timestamp']),
+            models.Index(fields=['plan', 'aggregation_period', 'timestamp']),
             models.Index(fields=['shard_key'])
         ]
 
@@ -131,6 +259,23 @@ class PerformanceError(models.Model):
             models.Index(fields=['plan', 'timestamp'])
         ]
 
+class PerformanceTestData(models.Model):
+    """性能测试原始采样数据模型
+    由 PerformanceDataStorage 在测试结束时从Redis分块写入（原生SQL，INSERT IGNORE），
+    表结构由迁移维护：以Redis数据键作为 (test_id, data_key) 唯一键，中断后重新写入不会产生重复数据
+    """
+    test_id = models.CharField(max_length=64, verbose_name='测试标识')
+    data_key = models.CharField(max_length=191, null=True, verbose_name='数据键')
+    timestamp = models.DateTimeField(verbose_name='采样时间')
+    data = models.BinaryField(verbose_name='采样数据', help_text='codec 编码的采样数据，旧数据为JSON文本')
+
+    class Meta:
+        managed = False
+        db_table = 'performance_test_data'
+        verbose_name = '性能测试采样数据'
+        verbose_name_plural = verbose_name
+        unique_together = [('test_id', 'data_key')]
+
 class PerformancePreset(models.Model):
     """性能测试预设配置模型
     用于存储可重用的性能测试配置模板
@@ -183,4 +328,20 @@ class PerformanceReport(models.Model):
     class Meta:
         verbose_name = '性能测试报告'
         verbose_name_plural = verbose_name
-        ordering = ['-created_time']
\ No newline at end of file
+        ordering = ['-created_time']
+
+    def get_run_window(self):
+        """获取本次测试的时间范围（秒级时间戳）
+
+        时间桶指标按计划存储，同一计划多次执行的指标需要按时间范围区分。
+        开始时间为报告创建时间，结束时间为同一计划下一份报告创建之前，最近一次测试没有结束时间。
+
+        Returns:
+            tuple: (开始时间戳, 结束时间戳或None)
+        """
+        start = int(self.created_time.timestamp())
+        next_report = PerformanceReport.objects.filter(
+            plan_id=self.plan_id, created_time__gt=self.created_time
+        ).order_by('created_time').first()
+        end = int(next_report.created_time.timestamp()) - 1 if next_report else None
+        return start, end
\ No newline at end of file
@@ -14,9 +14,9 @@ class PerformanceConfigSerializer(serializers.ModelSerializer):
 class PerformanceMetricsSerializer(serializers.ModelSerializer):
     class Meta:
         model = PerformanceMetrics
-        fields = ['timestamp', 'response_time', 'rps', 'error_count', 
-                 'error_rate', 'p50', 'p90', 'p95', 'cpu_usage', 
-                 'memory_usage', 'network_io', 'shard_key', 
+        fields = ['timestamp', 'requests', 'errors', 'bytes', 'users', 
+                 'rps', 'error_rate', 'avg_response_time', 'min_response_time', 
+                 'max_response_time', 'p50', 'p90', 'p95', 'p99', 'shard_key', 
                  'aggregation_period', 'created_time']
 
 class PerformanceErrorSerializer(serializers.ModelSerializer):
@@ -28,7 +28,6 @@ class PerformanceErrorSerializer(serializers.ModelSerializer):
 
 class PerformanceTestPlanSerializer(serializers.ModelSerializer):
     configs = PerformanceConfigSerializer(many=True, read_only=True)
-    metrics = PerformanceMetricsSerializer(many=True, read_only=True)
     errors = PerformanceErrorSerializer(many=True, read_only=True)
     creator = serializers.ReadOnlyField(source='creator.username')
     project_name = serializers.ReadOnlyField(source='project.name')
@@ -37,7 +36,7 @@ class PerformanceTestPlanSerializer(serializers.ModelSerializer):
         model = PerformanceTestPlan
         fields = ['id', 'name', 'description', 'project', 'project_name', 
                  'creator', 'created_time', 'updated_time', 'status', 
-                 'configs', 'metrics', 'errors']
+                 'configs', 'errors']
 
 class PerformancePresetSerializer(serializers.ModelSerializer):
     creator = serializers.ReadOnlyField(source='creator.username')
@@ -0,0 +1,736 @@
+"""性能测试分布式执行测试
+
+在本机启动多个执行节点进程连接协调节点，验证用户拆分、统计合并和节点下线后的重新分配。
+执行节点进程只模拟请求记录，不发起真实请求。
+"""
+
+import csv
+import json
+import math
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+import gevent
+from multiprocessing.connection import Client
+from unittest import mock
+from django.test import SimpleTestCase
+from locust import Environment
+from locust.event import Events
+from locust.stats import RequestStats, setup_distributed_stats_event_listeners
+from PerfTestEngine.core import distributed
+from PerfTestEngine.core.breakdown import OVERFLOW_NAME, StatsBreakdown, normalize_name
+from PerfTestEngine.core.codec import FLAG_ZLIB, decode_sample, encode_sample
+from PerfTestEngine.core.controller import AIMDController, PIDController, create_controller, normalized_error
+from PerfTestEngine.core.datasource import CSVDataSource, PoolDataSource
+from PerfTestEngine.core.distributed import DistributedRunner, resolve_process_count
+from PerfTestEngine.core.error_groups import OVERFLOW_FINGERPRINT, ErrorAggregator, template_message
+from PerfTestEngine.core.histogram import LatencyHistogram
+from PerfTestEngine.core.rollup import RollupAggregator, parse_period
+from PerfTestEngine.core.scheduler import AliasTable, IterationGate
+from PerfTestEngine.core.throughput import SlidingWindowCounter
+from PerfTestEngine.core.performance_stats import PerformanceStatsCollector
+
+AUTHKEY = b'performance-test'
+NODE_DISTRIBUTION = {'node-0': 1, 'node-1': 2, 'node-2': 3}
+REQUESTS_PER_USER = 10
+
+def _fake_worker(address, authkey, name, disconnect_after=None):
+    """模拟执行节点：收到 start 后每个用户记录 REQUESTS_PER_USER 个请求，每10个请求失败1个
+
+    Args:
+        disconnect_after: 可选，上报多少次后直接断开连接（不发送 quit），模拟节点异常下线
+    """
+    connection = Client(tuple(address), authkey=authkey)
+    connection.send(('ready', {'name': name}))
+    events = Events()
+    stats = RequestStats()
+    setup_distributed_stats_event_listeners(events, stats)
+    perf_stats = PerformanceStatsCollector()
+    user_count = 0
+    reports = 0
+    try:
+        while True:
+            while connection.poll(0):
+                message_type, data = connection.recv()
+                if message_type == 'start':
+                    user_count = data['user_count']
+                    for index in range(user_count * REQUESTS_PER_USER):
+                        failed = index % 10 == 0
+                        response_time = 10 + index % 50
+                        perf_stats.record_request(
+                            response_time, not failed, error_type='HTTPError' if failed else None,
+                            error_data={'status_code': 500} if failed else None, name='/api', method='GET'
+                        )
+                        stats.log_request('GET', '/api', response_time, 100)
+                        if failed:
+                            stats.log_error('GET', '/api', 'HTTPError 500')
+                elif message_type == 'quit':
+                    return
+            report = {}
+            events.report_to_master.fire(client_id=name, data=report)
+            report['user_count'] = user_count
+            report['perf_stats'] = perf_stats.to_snapshot()
+            connection.send(('report', report))
+            reports += 1
+            if disconnect_after is not None and reports >= disconnect_after:
+                return
+            time.sleep(0.1)
+    except (OSError, EOFError):
+        pass
+    finally:
+        connection.close()
+
+class DistributedRunnerTest(SimpleTestCase):
+    def setUp(self):
+        self.env = Environment()
+        self.runner = DistributedRunner(
+            self.env, node_count=len(NODE_DISTRIBUTION), node_distribution=NODE_DISTRIBUTION,
+            authkey=AUTHKEY, connect_timeout=30, heartbeat_timeout=2, rebalance_interval=0.2
+        )
+        self.merged = PerformanceStatsCollector()
+        self.env.events.worker_report.add_listener(
+            lambda client_id, data, **kwargs: self.merged.merge_node_snapshot(client_id, data['perf_stats'])
+        )
+        self.processes = []
+
+    def tearDown(self):
+        self.runner.quit()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def start_workers(self, disconnect_after=None):
+        context = multiprocessing.get_context('spawn')
+        for name in NODE_DISTRIBUTION:
+            process = context.Process(
+                target=_fake_worker,
+                args=(self.runner.address, AUTHKEY, name, (disconnect_after or {}).get(name)),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+    def wait_until(self, condition, timeout=20):
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() >= deadline:
+                self.fail('等待条件超时')
+            time.sleep(0.1)
+
+    def allocation(self):
+        return {worker.name: worker.target_user_count for worker in self.runner.alive_workers}
+
+    def test_users_split_by_node_distribution(self):
+        self.start_workers()
+        self.runner.start(60, 60)
+        self.assertEqual(self.allocation(), {'node-0': 10, 'node-1': 20, 'node-2': 30})
+        self.wait_until(lambda: self.runner.user_count == 60)
+
+    def test_merged_stats_equal_sum_of_nodes(self):
+        self.start_workers()
+        self.runner.start(60, 60)
+        expected_total = 60 * REQUESTS_PER_USER
+        self.wait_until(lambda: self.merged.get_statistics()['total_requests'] == expected_total)
+
+        expected_failed = sum(
+            len(range(0, users * REQUESTS_PER_USER, 10)) for users in self.allocation().values()
+        )
+        self.assertEqual(self.merged.failed_requests, expected_failed)
+        self.assertEqual(self.merged.response_time_histogram.count, expected_total)
+        self.assertEqual(
+            sum(group.count for group in self.merged.error_groups.groups.values()), expected_failed
+        )
+        self.wait_until(lambda: self.env.stats.total.num_requests == expected_total)
+        self.assertEqual(self.env.stats.total.num_failures, expected_failed)
+
+    def test_disconnected_worker_users_reassigned(self):
+        self.start_workers(disconnect_after={'node-2': 20})
+        self.runner.start(60, 60)
+        self.wait_until(lambda: [worker.name for worker in self.runner.alive_workers] == ['node-0', 'node-1'])
+        self.wait_until(lambda: self.allocation() == {'node-0': 20, 'node-1': 40})
+        self.assertEqual(self.runner.workers['node-2'].target_user_count, 0)
+        self.assertTrue(self.runner.rebalance_history)
+
+class LocalWorkerTest(SimpleTestCase):
+    def test_resolve_process_count(self):
+        self.assertEqual(resolve_process_count(4), 4)
+        self.assertEqual(resolve_process_count('3'), 3)
+        self.assertEqual(resolve_process_count(None), 1)
+        self.assertEqual(resolve_process_count(0), 1)
+        self.assertEqual(resolve_process_count(-2), 1)
+        with mock.patch.object(distributed.os, 'sched_getaffinity', return_value={0, 2, 5}, create=True):
+            self.assertEqual(resolve_process_count('auto'), 3)
+
+    def test_local_worker_pinned_to_cpu(self):
+        with mock.patch.object(distributed.os, 'sched_setaffinity', create=True) as setaffinity, \
+                mock.patch.object(distributed, 'run_worker') as run_worker:
+            distributed._run_local_worker(('127.0.0.1', 5557), AUTHKEY, 'local-0', 3)
+        setaffinity.assert_called_once_with(0, {3})
+        run_worker.assert_called_once_with(('127.0.0.1', 5557), AUTHKEY, 'local-0')
+
+    def test_local_worker_not_pinned_without_cpu(self):
+        with mock.patch.object(distributed.os, 'sched_setaffinity', create=True) as setaffinity, \
+                mock.patch.object(distributed, 'run_worker'):
+            distributed._run_local_worker(('127.0.0.1', 5557), AUTHKEY, 'local-0', None)
+        setaffinity.assert_not_called()
+
+    def spawn(self, count, pin_cpus):
+        context = mock.Mock()
+        with mock.patch.object(distributed.os, 'sched_getaffinity', return_value={4, 1}, create=True), \
+                mock.patch.object(distributed.multiprocessing, 'get_context', return_value=context):
+            processes = distributed.spawn_local_workers(count, ('127.0.0.1', 5557), AUTHKEY, pin_cpus=pin_cpus)
+        self.assertEqual(len(processes), count)
+        return [call.kwargs['args'] for call in context.Process.call_args_list]
+
+    def test_spawn_assigns_cpus_round_robin(self):
+        args = self.spawn(3, pin_cpus=True)
+        self.assertEqual([arg[2] for arg in args], ['local-0', 'local-1', 'local-2'])
+        self.assertEqual([arg[3] for arg in args], [1, 4, 1])
+
+    def test_spawn_without_pinning(self):
+        args = self.spawn(2, pin_cpus=False)
+        self.assertEqual([arg[3] for arg in args], [None, None])
+
+class DataSourceShardTest(SimpleTestCase):
+    def setUp(self):
+        handle, self.file_path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['username'])
+            writer.writerows([f'user{index}'] for index in range(10))
+
+    def tearDown(self):
+        os.remove(self.file_path)
+
+    def csv_rows(self, index, count):
+        source = CSVDataSource(self.file_path, {'name': 'username'}).shard(index, count)
+        # 迭代器循环读取，取一轮即为该分片的全部行
+        rows = len(range(index, 10, count))
+        return [next(source._data_iterator)['name'] for _ in range(rows)]
+
+    def test_csv_shards_partition_rows(self):
+        shards = [self.csv_rows(index, 3) for index in range(3)]
+        self.assertEqual(shards[0], ['user0', 'user3', 'user6', 'user9'])
+        self.assertEqual(shards[1], ['user1', 'user4', 'user7'])
+        self.assertEqual(shards[2], ['user2', 'user5', 'user8'])
+        self.assertEqual(sorted(sum(shards, []), key=lambda name: int(name[4:])),
+                         [f'user{index}' for index in range(10)])
+
+    def test_csv_shared_when_fewer_rows_than_shards(self):
+        source = CSVDataSource(self.file_path, {'name': 'username'}).shard(11, 12)
+        self.assertEqual([next(source._data_iterator)['name'] for _ in range(10)],
+                         [f'user{index}' for index in range(10)])
+
+    def test_pool_shards_partition_values(self):
+        values = list(range(10))
+        shards = [PoolDataSource({'id': values}).shard(index, 4)._shard_values(values) for index in range(4)]
+        for index, shard in enumerate(shards):
+            self.assertEqual(shard, values[index::4])
+        self.assertEqual(sorted(sum(shards, [])), values)
+        self.assertEqual(PoolDataSource({'id': values}).shard(1, 12)._shard_values(values), values)
+
+    def test_invalid_shard(self):
+        source = PoolDataSource({'id': [1]})
+        with self.assertRaises(ValueError):
+            source.shard(2, 2)
+        with self.assertRaises(ValueError):
+            source.shard(0, 0)
+
+class LatencyHistogramTest(SimpleTestCase):
+    def setUp(self):
+        generator = random.Random(8)
+        self.values = [generator.lognormvariate(4, 1.2) for _ in range(20000)]
+
+    def record_all(self, values, precision=0.01):
+        histogram = LatencyHistogram(precision=precision)
+        for value in values:
+            histogram.record(value)
+        return histogram
+
+    def test_percentile_relative_error_within_precision(self):
+        ordered = sorted(self.values)
+        for precision in (0.01, 0.05):
+            histogram = self.record_all(self.values, precision)
+            percents = (1, 25, 50, 90, 95, 99, 99.9)
+            batch = histogram.percentiles(percents)
+            for percent in percents:
+                # 按最近秩定义计算的精确百分位
+                exact = ordered[math.ceil(len(ordered) * percent / 100) - 1]
+                self.assertLessEqual(abs(histogram.percentile(percent) - exact) / exact, precision)
+                self.assertEqual(batch[percent], histogram.percentile(percent))
+
+    def test_exact_extremes_and_mean(self):
+        histogram = self.record_all(self.values)
+        self.assertEqual(histogram.count, len(self.values))
+        self.assertEqual(histogram.min, min(self.values))
+        self.assertEqual(histogram.max, max(self.values))
+        self.assertAlmostEqual(histogram.mean, sum(self.values) / len(self.values))
+        self.assertEqual(histogram.percentile(0), histogram.min)
+        self.assertEqual(histogram.percentile(100), histogram.max)
+
+    def test_out_of_range_values_clamped_to_recorded_extremes(self):
+        # 超出取值范围的值落在首尾桶，桶代表值限制在精确记录的最小/最大值之间
+        below = LatencyHistogram(min_value=1, max_value=1000)
+        below.record(0.001)
+        below.record(0.002)
+        self.assertEqual(below.percentile(50), 0.002)
+        above = LatencyHistogram(min_value=1, max_value=1000)
+        above.record(50000)
+        above.record(60000)
+        self.assertEqual(above.percentile(50), 50000)
+
+    def test_merge_equals_recording_all_values(self):
+        merged = self.record_all(self.values[:7000])
+        merged.merge(self.record_all(self.values[7000:]))
+        expected = self.record_all(self.values)
+        self.assertEqual(merged.counts, expected.counts)
+        self.assertEqual((merged.count, merged.min, merged.max), (expected.count, expected.min, expected.max))
+        self.assertEqual(merged.percentiles([50, 90, 99]), expected.percentiles([50, 90, 99]))
+        self.assertAlmostEqual(merged.mean, expected.mean)
+
+    def test_merge_rejects_different_configuration(self):
+        with self.assertRaises(ValueError):
+            LatencyHistogram(precision=0.01).merge(LatencyHistogram(precision=0.02))
+
+    def test_dict_round_trip(self):
+        histogram = self.record_all(self.values)
+        restored = LatencyHistogram.from_dict(histogram.to_dict())
+        self.assertEqual(restored.counts, histogram.counts)
+        self.assertEqual(restored.summary(), histogram.summary())
+
+    def test_empty_histogram(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(95), 0.0)
+        self.assertEqual(histogram.percentiles([50, 99]), {50: 0.0, 99: 0.0})
+
+class SlidingWindowCounterTest(SimpleTestCase):
+    def setUp(self):
+        # 5个1秒时间片的环形缓冲区，记录12秒使每个槽位都被复用
+        self.counter = SlidingWindowCounter(window_size=5, resolution=1)
+        for second in range(12):
+            self.counter.record(second + 1, now=second + 0.5)
+
+    def test_rate_after_ring_buffer_wraps(self):
+        # 窗口覆盖时间片7~11，计数为8~12，当前时间片只经过0.5秒
+        self.assertAlmostEqual(self.counter.rate(now=11.5), (8 + 9 + 10 + 11 + 12) / 4.5)
+        self.assertAlmostEqual(self.counter.moving_average(2, now=11.5), (11 + 12) / 1.5)
+
+    def test_series_skips_overwritten_slots(self):
+        self.assertEqual(self.counter.series(now=12.0), [(8, 9), (9, 10), (10, 11), (11, 12)])
+
+    def test_reused_slot_resets_count(self):
+        # 时间片12复用时间片7的槽位，不累加旧计数
+        self.counter.record(1, now=12.2)
+        self.assertEqual(self.counter.series(now=13.0), [(9, 10), (10, 11), (11, 12), (12, 1)])
+
+    def test_idle_window_is_empty(self):
+        self.assertEqual(self.counter.rate(now=30), 0.0)
+        self.assertEqual(self.counter.series(now=30), [(26, 0), (27, 0), (28, 0), (29, 0)])
+
+    def test_duration_starts_at_first_record(self):
+        counter = SlidingWindowCounter(window_size=10)
+        self.assertEqual(counter.rate(now=100), 0.0)
+        counter.record(10, now=100.2)
+        self.assertAlmostEqual(counter.rate(now=102.0), 10 / 2.0)
+        self.assertEqual(counter.series(now=102.0), [(100, 10), (101, 0)])
+
+    def test_invalid_window(self):
+        with self.assertRaises(ValueError):
+            SlidingWindowCounter(window_size=0.5, resolution=1)
+
+class RollupAggregatorTest(SimpleTestCase):
+    def summarize(self, buckets):
+        return [(bucket['aggregation_period'], bucket['timestamp'], bucket['count'], bucket['errors'])
+                for bucket in buckets]
+
+    def test_parse_period(self):
+        self.assertEqual([parse_period(period) for period in ('1s', '10s', '1m', '2h')], [1, 10, 60, 7200])
+        for period in ('0s', '1d', 's', '1.5s'):
+            with self.assertRaises(ValueError):
+                parse_period(period)
+
+    def test_bucket_boundaries(self):
+        aggregator = RollupAggregator(periods=('1s', '10s'))
+        aggregator.record(100.0, 10, True)
+        aggregator.record(100.999, 20, True)
+        self.assertEqual(aggregator.drain(), [])
+        # 起始时间等于桶结束时间的记录属于下一个桶，并关闭上一个桶
+        aggregator.record(101.0, 30, False)
+        self.assertEqual(self.summarize(aggregator.drain()), [('1s', 100, 2, 0)])
+
+        aggregator.record(109.999, 40, True)
+        aggregator.advance(109.999)
+        self.assertEqual(self.summarize(aggregator.drain()), [('1s', 101, 1, 1)])
+        aggregator.advance(110.0)
+        self.assertEqual(self.summarize(aggregator.drain()), [('1s', 109, 1, 0), ('10s', 100, 4, 1)])
+
+    def test_bucket_result(self):
+        aggregator = RollupAggregator(periods=('10s',), shard_key='node-0')
+        for index in range(20):
+            aggregator.record(200 + index * 0.5, 100, index % 4 != 0, response_length=10, users=index)
+        bucket, = aggregator.flush()
+        self.assertEqual(bucket['timestamp'], 200)
+        self.assertEqual(bucket['shard_key'], 'node-0')
+        self.assertEqual((bucket['count'], bucket['errors'], bucket['bytes'], bucket['users']), (20, 5, 200, 19))
+        self.assertEqual(bucket['rps'], 2.0)
+        self.assertEqual(bucket['error_rate'], 0.25)
+        self.assertEqual(bucket['response_time']['max'], 100)
+
+    def test_late_record_counts_in_open_bucket(self):
+        aggregator = RollupAggregator(periods=('1s',))
+        aggregator.record(101.2, 10, True)
+        aggregator.record(100.8, 10, True)
+        self.assertEqual(self.summarize(aggregator.flush()), [('1s', 101, 2, 0)])
+
+    def test_merge_waits_for_grace_period(self):
+        nodes = [RollupAggregator(periods=('1s',)) for _ in range(2)]
+        for node, count in zip(nodes, (3, 5)):
+            for _ in range(count):
+                node.record(100.5, 10, True, users=2)
+        merged = RollupAggregator(periods=('1s',), merge_grace=5)
+        for node in nodes:
+            for bucket in node.flush():
+                merged.merge(bucket)
+        merged.advance(105.9)
+        self.assertEqual(merged.drain(), [])
+        merged.advance(106.0)
+        bucket, = merged.drain()
+        self.assertEqual((bucket['timestamp'], bucket['count'], bucket['users']), (100, 8, 4))
+        self.assertEqual(bucket['histogram']['count'], 8)
+
+    def test_history_since_seq(self):
+        sequence = iter(range(1, 100))
+        aggregator = RollupAggregator(periods=('1s',), sequence=lambda: next(sequence))
+        for second in range(100, 104):
+            aggregator.record(second, 10, True)
+        aggregator.flush()
+        self.assertEqual([bucket['timestamp'] for bucket in aggregator.get_history('1s', since_seq=2)], [102, 103])
+        self.assertEqual([bucket['timestamp'] for bucket in aggregator.get_history('1s', since=101)], [102, 103])
+
+class StatsBreakdownTest(SimpleTestCase):
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name('/user/123?x=1'), '/user/{id}')
+        self.assertEqual(normalize_name('/order/6f1c2a3b-1d2e-4f5a-8b9c-0d1e2f3a4b5c/items#top'), '/order/{uuid}/items')
+        self.assertEqual(normalize_name('/file/0123456789abcdef0123'), '/file/{hash}')
+        self.assertEqual(normalize_name('/v2/users'), '/v2/users')
+        self.assertEqual(normalize_name('登录'), '登录')
+        self.assertEqual(normalize_name(''), 'unknown')
+
+    def test_path_parameters_share_entry(self):
+        breakdown = StatsBreakdown()
+        for user_id in range(50):
+            breakdown.record('GET', f'/user/{user_id}', 10, user_id % 10 != 0, response_length=5)
+        entry, = breakdown.snapshot()
+        self.assertEqual((entry['method'], entry['name']), ('GET', '/user/{id}'))
+        self.assertEqual((entry['count'], entry['errors'], entry['bytes']), (50, 5, 250))
+        self.assertEqual(entry['error_rate'], 0.1)
+
+    def test_entries_bounded_by_overflow(self):
+        breakdown = StatsBreakdown(max_entries=2)
+        for name in ('/a', '/b', '/c', '/d', '/a'):
+            breakdown.record('GET', name, 10, True)
+        counts = {name: entry.count for (_, name), entry in breakdown.entries.items()}
+        self.assertEqual(counts, {'/a': 2, '/b': 1, OVERFLOW_NAME: 2})
+
+    def test_snapshot_sorted_and_limited(self):
+        breakdown = StatsBreakdown()
+        for name, count in (('/a', 1), ('/b', 3), ('/c', 2)):
+            for _ in range(count):
+                breakdown.record('POST', name, 10, True)
+        self.assertEqual([entry['name'] for entry in breakdown.snapshot()], ['/b', '/c', '/a'])
+        self.assertEqual([entry['name'] for entry in breakdown.snapshot(limit=2)], ['/b', '/c'])
+
+    def test_merge_equals_sum_of_exports(self):
+        nodes = [StatsBreakdown(), StatsBreakdown()]
+        expected = StatsBreakdown()
+        for index in range(40):
+            name = f'/item/{index}' if index % 2 else '/login'
+            for breakdown in (nodes[index // 3 % 2], expected):
+                breakdown.record('GET', name, index + 1, index % 5 != 0, response_length=index)
+        merged = StatsBreakdown()
+        for node in nodes:
+            merged.merge(node.export())
+        self.assertEqual(merged.snapshot(), expected.snapshot())
+
+class ErrorAggregatorTest(SimpleTestCase):
+    def test_template_message(self):
+        self.assertEqual(
+            template_message("GET http://example.com/api/1 failed after 3 retries: 'token 42'"),
+            'GET <url> failed after <num> retries: <str>'
+        )
+        self.assertEqual(
+            template_message('order 6f1c2a3b-1d2e-4f5a-8b9c-0d1e2f3a4b5c at 0x7f3a not found'),
+            'order <uuid> at <hex> not found'
+        )
+        self.assertEqual(len(template_message('x' * 500)), 200)
+
+    def test_dynamic_values_share_fingerprint(self):
+        aggregator = ErrorAggregator()
+        first = aggregator.record('ReadTimeout', 'timed out after 30.5s', timestamp=100)
+        second = aggregator.record('ReadTimeout', 'timed out after 12s', timestamp=105)
+        self.assertEqual(first, second)
+        self.assertNotEqual(aggregator.record('HTTPError', '500 Server Error', status_code=500), first)
+        self.assertNotEqual(aggregator.record('HTTPError', '500 Server Error', status_code=502),
+                            aggregator.record('HTTPError', '500 Server Error', status_code=500))
+        group = aggregator.groups[first]
+        self.assertEqual((group.count, group.first_seen, group.last_seen), (2, 100, 105))
+
+    def test_samples_bounded(self):
+        aggregator = ErrorAggregator(sample_size=5)
+        for index in range(1000):
+            fingerprint = aggregator.record('HTTPError', f'request {index} failed', 500, {'index': index})
+        group = aggregator.groups[fingerprint]
+        self.assertEqual(group.count, 1000)
+        self.assertEqual(len(group.samples), 5)
+        self.assertEqual(len({sample['index'] for sample in group.samples}), 5)
+
+    def test_groups_bounded_by_overflow(self):
+        aggregator = ErrorAggregator(max_groups=2)
+        for error_type in ('A', 'B', 'C', 'D', 'A'):
+            aggregator.record(error_type, 'failed')
+        counts = {group['error_type']: group['count'] for group in aggregator.snapshot()}
+        self.assertEqual(counts, {'A': 2, 'B': 1, 'Other': 2})
+        self.assertIn(OVERFLOW_FINGERPRINT, aggregator.groups)
+        self.assertEqual(aggregator.total, 5)
+
+    def test_merge_node_snapshots(self):
+        nodes = [ErrorAggregator(), ErrorAggregator()]
+        nodes[0].record('HTTPError', 'status 500', 500, timestamp=100)
+        nodes[0].record('HTTPError', 'status 500', 500, timestamp=110)
+        nodes[1].record('HTTPError', 'status 500', 500, timestamp=90)
+        nodes[1].record('ConnectionError', 'refused', timestamp=95)
+        merged = ErrorAggregator(sample_size=2)
+        for node in nodes:
+            merged.merge(node.snapshot())
+        groups = {group['error_type']: group for group in merged.snapshot()}
+        self.assertEqual(groups['HTTPError']['count'], 3)
+        self.assertEqual((groups['HTTPError']['first_seen'], groups['HTTPError']['last_seen']), (90, 110))
+        self.assertEqual(len(groups['HTTPError']['examples']), 2)
+        self.assertEqual(groups['ConnectionError']['count'], 1)
+        self.assertEqual(merged.total, 4)
+
+    def test_error_records(self):
+        aggregator = ErrorAggregator()
+        aggregator.record('HTTPError', 'status 500', 500, {'url': '/api'}, timestamp=100.7)
+        record, = aggregator.to_error_records()
+        self.assertEqual((record['timestamp'], record['count']), (100, 1))
+        self.assertEqual(record['error_data']['examples'][0]['url'], '/api')
+
+class SampleCodecTest(SimpleTestCase):
+    def setUp(self):
+        self.sample = {
+            'timestamp': datetime(2025, 1, 2, 3, 4, 5, 500000).isoformat(),
+            'response_time': 12.5,
+            'success': True,
+            'name': '/api/login',
+            'error': None
+        }
+
+    def test_round_trip(self):
+        raw = encode_sample(self.sample)
+        self.assertIsInstance(raw, bytes)
+        self.assertFalse(raw[1] & FLAG_ZLIB)
+        self.assertEqual(decode_sample(raw), self.sample)
+
+    def test_large_sample_compressed(self):
+        self.sample['body'] = '性能测试' * 200
+        raw = encode_sample(self.sample)
+        self.assertTrue(raw[1] & FLAG_ZLIB)
+        self.assertLess(len(raw), len(json.dumps(self.sample).encode('utf-8')))
+        self.assertEqual(decode_sample(raw), self.sample)
+
+    def test_non_iso_timestamp_kept(self):
+        self.sample['timestamp'] = 'yesterday'
+        self.assertEqual(decode_sample(encode_sample(self.sample)), self.sample)
+
+    def test_legacy_json_decoded(self):
+        legacy = json.dumps(self.sample)
+        self.assertEqual(decode_sample(legacy), self.sample)
+        self.assertEqual(decode_sample(legacy.encode('utf-8')), self.sample)
+
+    def test_unsupported_version(self):
+        raw = bytearray(encode_sample(self.sample))
+        raw[0] = 99
+        with self.assertRaises(ValueError):
+            decode_sample(bytes(raw))
+
+class AliasTableTest(SimpleTestCase):
+    def pick_frequencies(self, weights, picks=100000):
+        random.seed(5)
+        table = AliasTable(weights)
+        counts = [0] * len(weights)
+        for _ in range(picks):
+            counts[table.pick()] += 1
+        return [count / picks for count in counts]
+
+    def test_distribution_matches_weights(self):
+        weights = [1, 2, 7, 0.5, 9.5]
+        total = sum(weights)
+        for frequency, weight in zip(self.pick_frequencies(weights), weights):
+            self.assertAlmostEqual(frequency, weight / total, delta=0.01)
+
+    def test_zero_weight_never_picked(self):
+        frequencies = self.pick_frequencies([0, 3, 0, 1])
+        self.assertEqual((frequencies[0], frequencies[2]), (0, 0))
+        self.assertAlmostEqual(frequencies[1], 0.75, delta=0.01)
+
+    def test_single_option(self):
+        self.assertEqual(self.pick_frequencies([4], picks=100), [1.0])
+
+    def test_invalid_weights(self):
+        for weights in ([], [1, -1], [0, 0]):
+            with self.assertRaises(ValueError):
+                AliasTable(weights)
+
+class IterationGateTest(SimpleTestCase):
+    def start_waiters(self, gate, count):
+        waiters = [gevent.spawn(gate.wait) for _ in range(count)]
+        gevent.sleep(0)
+        return waiters
+
+    def test_release_to_idle_users(self):
+        gate = IterationGate()
+        waiters = self.start_waiters(gate, 2)
+        self.assertEqual(gate.idle_users, 2)
+        self.assertTrue(gate.release(1.0))
+        self.assertTrue(gate.release(2.0))
+        gevent.joinall(waiters, timeout=1)
+        self.assertEqual(sorted(waiter.value for waiter in waiters), [1.0, 2.0])
+        self.assertEqual((gate.idle_users, gate.scheduled_iterations, gate.dropped_iterations), (0, 2, 0))
+
+    def test_drop_when_no_idle_user(self):
+        gate = IterationGate()
+        self.assertFalse(gate.release(1.0))
+        waiters = self.start_waiters(gate, 1)
+        # 已放行但尚未被取走的迭代占用空闲用户，同一用户不会被放行两次
+        self.assertTrue(gate.release(2.0))
+        self.assertFalse(gate.release(3.0))
+        gevent.joinall(waiters, timeout=1)
+        self.assertEqual(waiters[0].value, 2.0)
+        self.assertEqual((gate.scheduled_iterations, gate.dropped_iterations), (3, 2))
+
+    def test_close_wakes_waiting_users(self):
+        gate = IterationGate()
+        waiters = self.start_waiters(gate, 3)
+        gate.close()
+        gevent.joinall(waiters, timeout=1)
+        self.assertEqual([waiter.value for waiter in waiters], [None, None, None])
+        self.assertIsNone(gate.wait())
+
+class LoadControllerTest(SimpleTestCase):
+    @staticmethod
+    def p95(load):
+        """模拟被测系统：负载超过50后p95响应时间线性上升，目标150ms对应的负载为55"""
+        return 100 if load <= 50 else 100 + (load - 50) * 10
+
+    def run_controller(self, controller, cycles=80):
+        loads = []
+        for _ in range(cycles):
+            error = normalized_error({'p95': 150}, {'p95': self.p95(controller.load)})
+            loads.append(controller.update(error, 5))
+        return loads
+
+    def test_normalized_error_uses_most_constrained_target(self):
+        targets = {'p95': 200, 'error_rate': 0.01, 'rps': 100}
+        self.assertAlmostEqual(normalized_error(targets, {'p95': 100, 'rps': 90}), 0.1)
+        self.assertAlmostEqual(normalized_error(targets, {'p95': 300, 'rps': 90}), -0.5)
+        self.assertIsNone(normalized_error(targets, {'p99': 100}))
+        self.assertEqual(normalized_error({'error_rate': 0}, {'error_rate': 0.5}), -0.5)
+
+    def test_aimd_converges(self):
+        loads = self.run_controller(create_controller('aimd', 5, 1, 200))
+        for load in loads[-20:]:
+            self.assertLessEqual(abs(load - 55), 2)
+
+    def test_pid_converges(self):
+        loads = self.run_controller(create_controller('pid', 5, 1, 200))
+        for load in loads[-20:]:
+            self.assertLessEqual(abs(load - 55), 2)
+
+    def test_aimd_steps_and_clamping(self):
+        controller = AIMDController(10, minimum=2, maximum=100, increase=2, decrease=0.5)
+        self.assertEqual([controller.update(1, 5) for _ in range(4)], [20, 40, 80, 100])
+        self.assertEqual(controller.update(0.02, 5), 100)
+        self.assertEqual(controller.update(-1, 5), 50)
+        self.assertFalse(controller.in_slow_start)
+        self.assertEqual(controller.update(1, 5), 52)
+        for _ in range(10):
+            controller.update(-1, 5)
+        self.assertEqual(controller.load, 2)
+
+    def test_pid_step_and_bounds(self):
+        controller = PIDController(10, minimum=1, maximum=40, kp=5, ki=0, kd=0)
+        self.assertEqual(controller.update(1, 5), 15)
+        self.assertEqual(controller.update(-1, 5), 10.5)
+        for _ in range(20):
+            controller.update(1, 5)
+        self.assertEqual(controller.load, 40)
+        for _ in range(20):
+            controller.update(-1, 5)
+        self.assertEqual(controller.load, 1)
+
+    def test_pid_integral_limited(self):
+        controller = PIDController(10, minimum=1, maximum=1000, integral_limit=2)
+        for _ in range(10):
+            controller.update(1, 5)
+        self.assertEqual(controller.integral, 2)
+
+    def test_initial_load_clamped(self):
+        self.assertEqual(AIMDController(500, 1, 100).load, 100)
+        self.assertEqual(PIDController(0, 1, 100).load, 1)
+
+    def test_create_controller(self):
+        controller = create_controller('aimd', 10, 1, 100, {'increase': 5, 'tolerance': 0.1})
+        self.assertIsInstance(controller, AIMDController)
+        self.assertEqual((controller.increase, controller.tolerance), (5, 0.1))
+        with self.assertRaises(ValueError):
+            create_controller('bbr', 10, 1, 100)
+
+class SnapshotMergeTest(SimpleTestCase):
+    def record(self, collectors, index):
+        failed = index % 7 == 0
+        for collector in collectors:
+            collector.record_request(
+                5 + index % 40, not failed, error_type='HTTPError' if failed else None,
+                error_data={'status_code': 500 + index % 2, 'message': f'error {index}'} if failed else None,
+                response_length=100, name=f'/api/{index % 3}', method='GET'
+            )
+
+    def test_merged_snapshots_equal_sum_of_nodes(self):
+        nodes = [PerformanceStatsCollector(shard_key=f'node-{index}') for index in range(3)]
+        expected = PerformanceStatsCollector()
+        for index in range(300):
+            self.record([nodes[index % 3], expected], index)
+        merged = PerformanceStatsCollector()
+        for index, node in enumerate(nodes):
+            node.rollups.advance(time.time() + 120)
+            merged.merge_node_snapshot(f'node-{index}', node.to_snapshot())
+
+        statistics = merged.get_statistics()
+        self.assertEqual(statistics['total_requests'], 300)
+        self.assertEqual(merged.failed_requests, expected.failed_requests)
+        self.assertEqual(merged.response_time_histogram.counts, expected.response_time_histogram.counts)
+        self.assertEqual(statistics['response_time']['p95'], expected.get_statistics()['response_time']['p95'])
+        self.assertEqual(merged.breakdown.snapshot(), expected.breakdown.snapshot())
+        self.assertEqual(
+            {group['fingerprint']: group['count'] for group in merged.error_groups.snapshot()},
+            {group['fingerprint']: group['count'] for group in expected.error_groups.snapshot()}
+        )
+        buckets = [bucket for bucket in merged.flush_rollups() if bucket['aggregation_period'] == '1s']
+        self.assertEqual(sum(bucket['count'] for bucket in buckets), 300)
+
+    def test_repeated_snapshot_replaces_previous(self):
+        node = PerformanceStatsCollector()
+        merged = PerformanceStatsCollector()
+        for index in range(10):
+            self.record([node], index)
+        merged.merge_node_snapshot('node-0', node.to_snapshot())
+        for index in range(10, 15):
+            self.record([node], index)
+        merged.merge_node_snapshot('node-0', node.to_snapshot())
+        self.assertEqual(merged.get_statistics()['total_requests'], 15)
+        self.assertEqual(merged.response_time_histogram.count, node.response_time_histogram.count)
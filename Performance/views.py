@@ -3,8 +3,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
+from django.db.models import Max, Min
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import PerformanceTestPlan, PerformanceConfig, PerformancePreset, PerformanceReport
+import math
+from .models import PerformanceTestPlan, PerformanceConfig, PerformancePreset, PerformanceReport, PerformanceMetrics
+from .downsample import SERIES_FIELDS, aggregate_series, lttb_series, minmax_series
 from .serializer import (
     PerformanceTestPlanSerializer, PerformanceConfigSerializer,
     PerformancePresetSerializer, PerformanceReportSerializer
@@ -139,6 +142,57 @@ class PerformanceReportViewSet(viewsets.ModelViewSet):
         report = self.get_object()
         return Response(report.metrics)
 
+    @action(detail=True, methods=['get'], url_path='metrics/series')
+    def metrics_series(self, request, pk=None):
+        """获取降采样后的指标时间序列
+        
+        查询参数：
+        - start/end: 可选，时间戳范围（秒），默认为本报告对应的测试时间范围
+        - points: 目标点数，默认1000，最大5000
+        - period: 聚合周期，默认1s
+        - method: 降采样方式，lttb、minmax 或 aggregate（按时间槽汇总），默认 lttb
+        - fields: 逗号分隔的指标列，默认 rps,p50,p95,p99,error_rate,users
+        """
+        report = self.get_object()
+        params = request.query_params
+        try:
+            start = int(params['start']) if params.get('start') else None
+            end = int(params['end']) if params.get('end') else None
+            points = min(max(int(params.get('points', 1000)), 3), 5000)
+        except ValueError:
+            return Response({'error': 'start、end、points 必须为整数'}, status=status.HTTP_400_BAD_REQUEST)
+        method = params.get('method', 'lttb')
+        if method not in ('lttb', 'minmax', 'aggregate'):
+            return Response({'error': f'不支持的降采样方式: {method}'}, status=status.HTTP_400_BAD_REQUEST)
+        fields = [field for field in params.get('fields', 'rps,p50,p95,p99,error_rate,users').split(',') if field]
+        invalid = [field for field in fields if field not in SERIES_FIELDS]
+        if invalid:
+            return Response({'error': f'不支持的指标: {",".join(invalid)}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # 指标按计划存储，未指定范围时只取本次测试的时间桶，避免混入同一计划其他次执行的数据
+        run_start, run_end = report.get_run_window()
+        start = run_start if start is None else start
+        end = run_end if end is None else end
+        queryset = PerformanceMetrics.objects.time_range(report.plan, params.get('period', '1s'), start, end)
+        if method == 'lttb':
+            series = lttb_series(queryset, fields, points)
+        else:
+            # 时间范围未指定时按实际数据范围计算时间槽长度
+            if start is None or end is None:
+                bounds = queryset.aggregate(first=Min('timestamp'), last=Max('timestamp'))
+                start = bounds['first'] if start is None else start
+                end = bounds['last'] if end is None else end
+            interval = max(1, math.ceil(((end or 0) - (start or 0) + 1) / points))
+            if method == 'minmax':
+                series = minmax_series(queryset.minmax(fields, interval), fields)
+            else:
+                series = aggregate_series(queryset.downsample(interval), fields)
+        return Response({
+            'method': method,
+            'points': points,
+            'series': series
+        })
+
     @action(detail=True, methods=['get'])
     def errors(self, request, pk=None):
         report = self.get_object()
@@ -74,7 +74,9 @@ PERFORMANCE_TEST = {
     'MAX_WORKERS': 4,
     'DEFAULT_RUNTIME': 3600,  # 默认运行时间（秒）
     'DEFAULT_SPAWN_RATE': 10,  # 默认用户生成速率
-    'DEFAULT_WAIT_TIME': {"min": 1, "max": 5}  # 默认思考时间范围（秒）
+    'DEFAULT_WAIT_TIME': {"min": 1, "max": 5},  # 默认思考时间范围（秒）
+    # 分布式执行认证密钥，协调节点与执行节点(manage.py run_performance_worker)必须一致
+    'DISTRIBUTED_AUTHKEY': os.getenv('PERFORMANCE_DISTRIBUTED_AUTHKEY', ''),
 
 }
 # # 性能测试云服务器相关配置
@@ -85,7 +87,8 @@ PERFORMANCE_TEST = {
 #     'MAX_WORKERS': 8,  # 根据服务器CPU核心数调整
 #     'DEFAULT_RUNTIME': 3600,  # 默认运行时间（秒）
 #     'DEFAULT_SPAWN_RATE': 10,  # 默认用户生成速率
-#     'DEFAULT_WAIT_TIME': {"min": 1, "max": 5}  # 默认思考时间范围（秒）
+#     'DEFAULT_WAIT_TIME': {"min": 1, "max": 5},  # 默认思考时间范围（秒）
+#     'DISTRIBUTED_AUTHKEY': os.getenv('PERFORMANCE_DISTRIBUTED_AUTHKEY', ''),  # 分布式执行认证密钥
 # }
 
 